@@ -110,6 +110,10 @@ class ApiService {
         }
         
         return Transaction.fromJson(data);
+      } else if (response.statusCode == 202) {
+        // Queued for extraction on the server, wait for the ingestion job to finish
+        final data = json.decode(response.body);
+        return await _waitForReceiptJob(data['job_id'] as int);
       } else {
         throw ApiException(
           'Failed to upload receipt',
@@ -123,6 +127,39 @@ class ApiService {
     }
   }
 
+  /// GET /jobs/{id} - Poll a receipt ingestion job until it finishes
+  Future<Transaction> _waitForReceiptJob(
+    int jobId, {
+    Duration interval = const Duration(seconds: 1),
+    Duration timeout = const Duration(minutes: 2),
+  }) async {
+    final uri = Uri.parse('$baseUrl${AppConstants.jobsEndpoint}/$jobId');
+    final deadline = DateTime.now().add(timeout);
+
+    while (DateTime.now().isBefore(deadline)) {
+      final response = await http.get(uri, headers: _jsonHeaders);
+      if (response.statusCode != 200) {
+        throw ApiException(
+          'Failed to fetch receipt status',
+          statusCode: response.statusCode,
+          body: response.body,
+        );
+      }
+
+      final data = json.decode(response.body);
+      switch (data['status']) {
+        case 'succeeded':
+          return Transaction.fromJson(data['transaction']);
+        case 'skipped':
+          throw ApiException('Transaction already exists');
+        case 'failed':
+          throw ApiException(data['error'] ?? 'Failed to process receipt');
+      }
+      await Future.delayed(interval);
+    }
+    throw ApiException('Receipt is still processing, pull to refresh later');
+  }
+
   /// POST /transactions - Create transaction manually
   Future<({Transaction transaction, String message})> createTransaction(Transaction transaction) async {
     try {
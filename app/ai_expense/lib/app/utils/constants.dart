@@ -9,6 +9,7 @@ class AppConstants {
   // API Endpoints - Transactions
   static const String transactionsEndpoint = '/transactions';
   static const String uploadReceiptEndpoint = '/transactions/upload-receipt';
+  static const String jobsEndpoint = '/jobs'; // + /{id}
   static const String createTransactionEndpoint = '/transactions';
   static const String updateTransactionEndpoint = '/transactions'; // + /{id}
   static const String deleteTransactionEndpoint = '/transactions'; // + /{id}
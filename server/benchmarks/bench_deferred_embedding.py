@@ -0,0 +1,91 @@
+"""
+Benchmark: per-row cost of loading Transaction rows with and without the embedding.
+
+Runs the listing query both ways (default = embedding deferred, and with
+undefer(Transaction.embedding) which is what every query did before) and reports
+latency and Python allocations per row.
+
+With --seed N it inserts N synthetic rows inside a transaction that is rolled back at
+the end, so it can be pointed at an empty database without leaving anything behind.
+
+Usage:
+    DATABASE_URL=postgresql://... python -m benchmarks.bench_deferred_embedding --seed 5000 --rows 1000
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, undefer
+
+from src.models.event import Event  # noqa: F401  (registers the relationship target)
+from src.models.transaction import Transaction
+
+
+def seed(db, n):
+    rng = random.Random(42)
+    for start in range(0, n, 500):
+        db.add_all([
+            Transaction(
+                txn_type="DEBIT", amount=round(rng.uniform(10, 5000), 2), payee=f"Bench payee {i}",
+                category="Other", transaction_date=date(2026, 1, 1) - timedelta(days=i % 365),
+                source_app="Benchmark", embedding=[rng.uniform(-1, 1) for _ in range(3072)]
+            )
+            for i in range(start, min(start + 500, n))
+        ])
+        db.flush()
+
+
+def measure(db, rows, repeat, load_embedding):
+    query = db.query(Transaction).order_by(Transaction.transaction_date.desc(), Transaction.id.desc()).limit(rows)
+    if load_embedding:
+        query = query.options(undefer(Transaction.embedding))
+
+    latencies, peaks, fetched = [], [], 0
+    for _ in range(repeat):
+        db.expunge_all()
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = query.all()
+        latencies.append(time.perf_counter() - start)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        fetched = len(result)
+        del result
+    return fetched, statistics.median(latencies), statistics.median(peaks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000, help="Rows per listing query")
+    parser.add_argument("--seed", type=int, default=0, help="Synthetic rows to insert (rolled back afterwards)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    database_url = os.environ.get("BENCH_DATABASE_URL") or os.environ.get("DATABASE_URL")
+    if not database_url:
+        raise SystemExit("Set BENCH_DATABASE_URL (or DATABASE_URL)")
+
+    db = sessionmaker(bind=create_engine(database_url))()
+    try:
+        if args.seed:
+            print(f"Seeding {args.seed} synthetic rows (rolled back at exit)...")
+            seed(db, args.seed)
+
+        print(f"{'mode':<22}{'rows':>6}{'latency ms':>12}{'ms/row':>9}{'peak KB':>11}{'KB/row':>9}")
+        for label, load_embedding in (("embedding deferred", False), ("embedding loaded", True)):
+            fetched, latency, peak = measure(db, args.rows, args.repeat, load_embedding)
+            per_row = max(fetched, 1)
+            print(f"{label:<22}{fetched:>6}{latency * 1000:>12.1f}{latency * 1000 / per_row:>9.3f}"
+                  f"{peak / 1024:>11.0f}{peak / 1024 / per_row:>9.2f}")
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark: API calls and latency for concurrent single-text embeddings, with and without
+micro-batching (src/embedding_dispatcher.py).
+
+--callers concurrent tasks each embed --requests texts one at a time, as concurrent creates
+and searches do. By default the API is simulated with a fixed round trip (--latency-ms) so
+no key or quota is needed; --live calls Gemini instead.
+
+Usage:
+    python -m benchmarks.bench_embedding_batching --callers 64 --requests 20
+    GEMINI_API_KEY=... python -m benchmarks.bench_embedding_batching --live --callers 8 --requests 5
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from src.embedding_dispatcher import EmbeddingDispatcher
+from src.utils import run_blocking
+
+
+def simulated_api(latency):
+    def embed_batch(texts, task_type):
+        time.sleep(latency)
+        return [[0.0] * 8 for _ in texts]
+    return embed_batch
+
+
+async def run(dispatcher, callers, requests):
+    latencies = []
+
+    async def caller(worker):
+        for i in range(requests):
+            start = time.perf_counter()
+            await dispatcher.embed(f"Paid {worker * requests + i} to Merchant {worker}", "retrieval_document")
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(caller(worker) for worker in range(callers)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    stats = dispatcher.stats()
+    return {
+        "api_calls": stats["batches"],
+        "avg_batch_size": stats["avg_batch_size"],
+        "fill_ratio": stats["fill_ratio"],
+        "throughput_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--callers", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=20, help="Texts per caller")
+    parser.add_argument("--latency-ms", type=float, default=150, help="Simulated API round trip")
+    parser.add_argument("--window-ms", type=float, default=5)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--live", action="store_true", help="Call Gemini instead of the simulated API")
+    args = parser.parse_args()
+
+    if args.live:
+        from src.utils import _embed_texts as embed_batch
+    else:
+        embed_batch = simulated_api(args.latency_ms / 1000)
+
+    for label, window in (("unbatched", 0), (f"window {args.window_ms:g} ms", args.window_ms / 1000)):
+        dispatcher = EmbeddingDispatcher(embed_batch, max_batch_size=args.batch_size, flush_window=window,
+                                         run_blocking=run_blocking)
+        print(f"{label:>16}: {asyncio.run(run(dispatcher, args.callers, args.requests))}")
+
+
+if __name__ == "__main__":
+    main()
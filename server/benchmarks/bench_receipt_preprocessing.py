@@ -0,0 +1,106 @@
+"""
+Benchmark: bytes sent to Gemini and extraction latency with and without receipt preprocessing.
+
+Reads every image in --images (jpg/jpeg/png/webp/heic). Without --images it generates a
+synthetic sample set: phone screenshots as PNG and camera photos as 12 MP JPEG.
+
+By default only the local side is measured (bytes before/after, preprocessing time).
+With --extract it also calls Gemini for each image, once with the raw upload and once
+preprocessed, which needs GEMINI_API_KEY and costs API calls.
+
+Usage:
+    python -m benchmarks.bench_receipt_preprocessing --images ./sample_receipts --extract
+"""
+import argparse
+import io
+import random
+import statistics
+import time
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+from src.image_preprocessing import preprocess_receipt_image
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".heic", ".heif"}
+
+
+def synthetic_samples():
+    rng = random.Random(42)
+    samples = []
+    for i in range(3):
+        # UPI app screenshot: flat background, a few lines of text, big margins
+        img = Image.new("RGB", (1080, 2400), (245, 245, 245))
+        draw = ImageDraw.Draw(img)
+        for line in range(12):
+            draw.text((140, 700 + line * 60), f"Paid to Merchant {i} ref {rng.randrange(10 ** 12)}", fill="black")
+        out = io.BytesIO()
+        img.save(out, format="PNG")
+        samples.append((f"screenshot_{i}.png", out.getvalue()))
+
+        # Camera photo of a paper receipt: noisy 12 MP JPEG
+        photo = Image.effect_noise((4032, 3024), 40).convert("RGB")
+        draw = ImageDraw.Draw(photo)
+        for line in range(30):
+            draw.text((1200, 600 + line * 60), f"ITEM {line} ...... {rng.uniform(10, 999):.2f}", fill="black")
+        out = io.BytesIO()
+        photo.save(out, format="JPEG", quality=92)
+        samples.append((f"photo_{i}.jpg", out.getvalue()))
+    return samples
+
+
+def load_samples(directory):
+    return [(path.name, path.read_bytes()) for path in sorted(Path(directory).iterdir())
+            if path.suffix.lower() in IMAGE_SUFFIXES]
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", help="Directory of sample receipt images")
+    parser.add_argument("--extract", action="store_true", help="Also measure Gemini extraction latency")
+    args = parser.parse_args()
+
+    samples = load_samples(args.images) if args.images else synthetic_samples()
+    if not samples:
+        raise SystemExit("No images found")
+
+    if args.extract:
+        from src.utils import extract_data_from_image
+
+    header = f"{'image':<24}{'raw KB':>9}{'sent KB':>9}{'ratio':>7}{'prep ms':>9}"
+    if args.extract:
+        header += f"{'raw extract ms':>16}{'prep extract ms':>17}"
+    print(header)
+
+    raw_total, sent_total, raw_latencies, prep_latencies = 0, 0, [], []
+    for name, raw in samples:
+        (processed, _), prep_time = timed(preprocess_receipt_image, raw)
+        raw_total += len(raw)
+        sent_total += len(processed)
+        row = (f"{name[:23]:<24}{len(raw) / 1024:>9.0f}{len(processed) / 1024:>9.0f}"
+               f"{len(processed) / len(raw):>7.2f}{prep_time * 1000:>9.1f}")
+
+        if args.extract:
+            _, raw_latency = timed(extract_data_from_image, raw, preprocess=False)
+            # Includes the preprocessing time, that is what the request actually pays
+            _, prep_latency = timed(extract_data_from_image, raw)
+            raw_latencies.append(raw_latency)
+            prep_latencies.append(prep_latency)
+            row += f"{raw_latency * 1000:>16.0f}{prep_latency * 1000:>17.0f}"
+        print(row)
+
+    print(f"\nTotal: {raw_total / 1024:.0f} KB raw -> {sent_total / 1024:.0f} KB sent "
+          f"({sent_total / raw_total:.0%})")
+    if args.extract:
+        print(f"Median extraction latency: {statistics.median(raw_latencies) * 1000:.0f} ms raw, "
+              f"{statistics.median(prep_latencies) * 1000:.0f} ms preprocessed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Benchmark: exact scan vs HNSW / IVFFlat ANN search on 3072-dim embeddings.
+
+Loads N synthetic clustered embeddings into a scratch table, builds the same
+`embedding::halfvec(3072)` index used by migrations/0003 and reports recall@k and
+latency for the exact scan and for each ef_search / probes setting.
+
+Requires numpy and a PostgreSQL database with pgvector >= 0.7. Point it at a scratch
+database, it creates and drops its own table and never touches `transactions`.
+
+Usage:
+    DATABASE_URL=postgresql://... python -m benchmarks.bench_vector_ann --rows 100000 1000000
+    python -m benchmarks.bench_vector_ann --rows 100000 --index ivfflat --probes 1 10 40
+"""
+import argparse
+import io
+import os
+import statistics
+import time
+
+import numpy as np
+from sqlalchemy import create_engine, text
+
+TABLE = "bench_embeddings"
+DISTANCE = "embedding::halfvec({dim}) <-> CAST(:q AS halfvec({dim}))"
+
+
+def to_pg(vector):
+    return "[" + ",".join(f"{x:.6f}" for x in vector) + "]"
+
+
+def copy_rows(raw_conn, rows):
+    buffer = io.StringIO("".join(f"{to_pg(v)}\n" for v in rows))
+    cursor = raw_conn.cursor()
+    if hasattr(cursor, "copy_expert"):  # psycopg2
+        cursor.copy_expert(f"COPY {TABLE} (embedding) FROM STDIN", buffer)
+    else:  # psycopg 3
+        with cursor.copy(f"COPY {TABLE} (embedding) FROM STDIN") as copy:
+            copy.write(buffer.getvalue())
+    raw_conn.commit()
+
+
+def load(engine, n, dim, clusters, seed, chunk=5000):
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+        conn.execute(text(f"CREATE TABLE {TABLE} (id BIGSERIAL PRIMARY KEY, embedding vector({dim}))"))
+
+    rng = np.random.default_rng(seed)
+    centers_rng = np.random.default_rng(seed + 1)
+    centers = centers_rng.standard_normal((clusters, dim)).astype(np.float32)
+
+    raw = engine.raw_connection()
+    try:
+        for start in range(0, n, chunk):
+            size = min(chunk, n - start)
+            labels = rng.integers(0, clusters, size)
+            vectors = centers[labels] + 0.3 * rng.standard_normal((size, dim)).astype(np.float32)
+            copy_rows(raw, vectors / np.linalg.norm(vectors, axis=1, keepdims=True))
+            print(f"  loaded {start + size}/{n}", end="\r")
+    finally:
+        raw.close()
+    print()
+    return centers
+
+
+def build_index(engine, index, dim, lists):
+    with engine.begin() as conn:
+        conn.execute(text("SET maintenance_work_mem = '2GB'"))
+        if index == "hnsw":
+            conn.execute(text(
+                f"CREATE INDEX ON {TABLE} USING hnsw ((embedding::halfvec({dim})) halfvec_l2_ops) "
+                "WITH (m = 16, ef_construction = 64)"
+            ))
+        else:
+            conn.execute(text(
+                f"CREATE INDEX ON {TABLE} USING ivfflat ((embedding::halfvec({dim})) halfvec_l2_ops) "
+                f"WITH (lists = {lists})"
+            ))
+        conn.execute(text(f"ANALYZE {TABLE}"))
+
+
+def search(engine, queries, k, dim, settings):
+    sql = text(f"SELECT id FROM {TABLE} ORDER BY {DISTANCE.format(dim=dim)} LIMIT :k")
+    results, latencies = [], []
+    with engine.connect() as conn:
+        for name, value in settings.items():
+            conn.execute(text("SELECT set_config(:name, :value, false)"), {"name": name, "value": str(value)})
+        for q in queries:
+            start = time.perf_counter()
+            ids = [row.id for row in conn.execute(sql, {"q": to_pg(q), "k": k})]
+            latencies.append(time.perf_counter() - start)
+            results.append(ids)
+    return results, latencies
+
+
+def report(label, latencies, recall=None):
+    ordered = sorted(latencies)
+    p50 = statistics.median(ordered) * 1000
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000
+    recall_str = f"{recall:6.3f}" if recall is not None else "   1.0 (exact)"
+    print(f"  {label:<22} recall@k={recall_str}  p50={p50:8.2f} ms  p99={p99:8.2f} ms")
+
+
+def run(engine, n, args):
+    print(f"\n=== {n:,} rows, dim={args.dim}, index={args.index} ===")
+    centers = load(engine, n, args.dim, args.clusters, args.seed)
+
+    rng = np.random.default_rng(args.seed + 2)
+    labels = rng.integers(0, args.clusters, args.queries)
+    queries = centers[labels] + 0.3 * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+
+    # Exact scan (no index yet) is the ground truth
+    truth, latencies = search(engine, queries, args.k, args.dim, {"max_parallel_workers_per_gather": 0})
+    report("exact scan", latencies)
+
+    start = time.perf_counter()
+    build_index(engine, args.index, args.dim, args.lists or max(1, n // 1000))
+    print(f"  index build: {time.perf_counter() - start:.1f} s")
+
+    knob, values = ("hnsw.ef_search", args.ef_search) if args.index == "hnsw" else ("ivfflat.probes", args.probes)
+    for value in values:
+        found, latencies = search(engine, queries, args.k, args.dim, {knob: value})
+        recall = statistics.mean(len(set(f) & set(t)) / args.k for f, t in zip(found, truth))
+        report(f"{knob}={value}", latencies, recall)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=3072)
+    parser.add_argument("--index", choices=["hnsw", "ivfflat"], default="hnsw")
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[40, 100, 200, 400])
+    parser.add_argument("--probes", type=int, nargs="+", default=[1, 10, 40, 100])
+    parser.add_argument("--lists", type=int, default=None, help="IVFFlat lists (default rows / 1000)")
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch table afterwards")
+    args = parser.parse_args()
+
+    database_url = os.environ.get("BENCH_DATABASE_URL") or os.environ.get("DATABASE_URL")
+    if not database_url:
+        raise SystemExit("Set BENCH_DATABASE_URL (or DATABASE_URL) to a scratch PostgreSQL database")
+    engine = create_engine(database_url)
+
+    try:
+        for n in args.rows:
+            run(engine, n, args)
+    finally:
+        if not args.keep:
+            with engine.begin() as conn:
+                conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+-- Base schema for src/models as it existed before migrations were versioned.
+-- Uses IF NOT EXISTS so it is a no-op on databases created from the models directly.
+CREATE EXTENSION IF NOT EXISTS vector;
+
+CREATE TABLE IF NOT EXISTS events (
+    id SERIAL PRIMARY KEY,
+    event_name VARCHAR NOT NULL,
+    event_notes TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_events_id ON events (id);
+
+CREATE TABLE IF NOT EXISTS transactions (
+    id SERIAL PRIMARY KEY,
+    txn_type VARCHAR NOT NULL,
+    amount DOUBLE PRECISION NOT NULL,
+    payee VARCHAR,
+    category VARCHAR,
+    transaction_date DATE,
+    transaction_time VARCHAR,
+    source_app VARCHAR,
+    upi_transaction_id VARCHAR,
+    bank_account VARCHAR,
+    notes TEXT,
+    embedding vector(3072),
+    event_id INTEGER REFERENCES events (id)
+);
+CREATE INDEX IF NOT EXISTS ix_transactions_id ON transactions (id);
+CREATE UNIQUE INDEX IF NOT EXISTS ix_transactions_upi_transaction_id ON transactions (upi_transaction_id);
+
+CREATE TABLE IF NOT EXISTS splits (
+    id SERIAL PRIMARY KEY,
+    transaction_id INTEGER REFERENCES transactions (id),
+    amount DOUBLE PRECISION NOT NULL,
+    payee VARCHAR,
+    is_settled BOOLEAN,
+    notes TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_splits_id ON splits (id);
@@ -0,0 +1,8 @@
+-- Persistent tier of the content-addressed embedding cache (src/cache.py)
+CREATE TABLE IF NOT EXISTS embedding_cache (
+    key VARCHAR(64) PRIMARY KEY,
+    model VARCHAR NOT NULL,
+    task_type VARCHAR NOT NULL,
+    embedding vector(3072) NOT NULL,
+    created_at TIMESTAMP DEFAULT now()
+);
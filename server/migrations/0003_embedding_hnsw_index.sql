@@ -0,0 +1,9 @@
+-- Approximate nearest neighbour index for transaction embeddings.
+-- HNSW on plain `vector` is limited to 2000 dimensions, gemini-embedding-001 returns 3072,
+-- so the index is built on the half-precision cast (halfvec supports up to 4000, pgvector >= 0.7).
+-- Queries must use the same expression to hit the index:
+--   ORDER BY embedding::halfvec(3072) <-> CAST(:query_vector AS halfvec(3072))
+-- Recall is tuned per query with `hnsw.ef_search` (see VECTOR_EF_SEARCH).
+CREATE INDEX IF NOT EXISTS ix_transactions_embedding_hnsw
+    ON transactions USING hnsw ((embedding::halfvec(3072)) halfvec_l2_ops)
+    WITH (m = 16, ef_construction = 64);
@@ -0,0 +1,16 @@
+-- Indexes for the hot query predicates.
+-- Listings order by (transaction_date DESC NULLS LAST, id DESC), see LISTING_ORDER in
+-- src/routes/transactions.py. The same index serves date-range filters and keyset cursors.
+CREATE INDEX IF NOT EXISTS ix_transactions_date_id
+    ON transactions (transaction_date DESC NULLS LAST, id DESC);
+
+-- Event detail and the per-event aggregates
+CREATE INDEX IF NOT EXISTS ix_transactions_event_id ON transactions (event_id);
+
+-- selectinload(Transaction.splits) and split aggregates join on this
+CREATE INDEX IF NOT EXISTS ix_splits_transaction_id ON splits (transaction_id);
+
+-- Generated search SQL filters payee/category with leading-wildcard ILIKE, which b-trees can't serve
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS ix_transactions_payee_trgm ON transactions USING gin (payee gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_transactions_category_trgm ON transactions USING gin (category gin_trgm_ops);
@@ -0,0 +1,12 @@
+-- Content hashes of the uploaded receipt image, checked before any Gemini call.
+ALTER TABLE transactions ADD COLUMN IF NOT EXISTS image_sha256 VARCHAR(64);
+ALTER TABLE transactions ADD COLUMN IF NOT EXISTS image_phash VARCHAR(64);
+
+CREATE INDEX IF NOT EXISTS ix_transactions_image_sha256 ON transactions (image_sha256);
+
+-- The 256-bit perceptual hash is looked up by its four 64-bit bands (see PHASH_BANDS in
+-- src/image_preprocessing.py). Expressions must match phash_band() in src/models/transaction.py.
+CREATE INDEX IF NOT EXISTS ix_transactions_image_phash_b0 ON transactions (substr(image_phash, 1, 16));
+CREATE INDEX IF NOT EXISTS ix_transactions_image_phash_b1 ON transactions (substr(image_phash, 17, 16));
+CREATE INDEX IF NOT EXISTS ix_transactions_image_phash_b2 ON transactions (substr(image_phash, 33, 16));
+CREATE INDEX IF NOT EXISTS ix_transactions_image_phash_b3 ON transactions (substr(image_phash, 49, 16));
@@ -0,0 +1,17 @@
+-- Receipt uploads processed by the ingestion workers (src/worker.py), polled through GET /jobs/{id}.
+CREATE TABLE IF NOT EXISTS ingestion_jobs (
+    id SERIAL PRIMARY KEY,
+    status VARCHAR NOT NULL DEFAULT 'queued',
+    filename VARCHAR,
+    image BYTEA,
+    image_sha256 VARCHAR(64),
+    image_phash VARCHAR(64),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    transaction_id INTEGER REFERENCES transactions (id) ON DELETE SET NULL,
+    created_at TIMESTAMP DEFAULT now(),
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS ix_ingestion_jobs_id ON ingestion_jobs (id);
+CREATE INDEX IF NOT EXISTS ix_ingestion_jobs_status ON ingestion_jobs (status);
@@ -0,0 +1,32 @@
+-- Day-level spending totals per dimension, kept up to date by src/analytics.py and read by /analytics.
+-- Undated transactions are stored under day 1900-01-01 (UNDATED in src/analytics.py).
+CREATE TABLE IF NOT EXISTS spending_summaries (
+    dimension VARCHAR NOT NULL,
+    txn_type VARCHAR NOT NULL,
+    day DATE NOT NULL,
+    value VARCHAR NOT NULL,
+    week DATE NOT NULL,
+    month DATE NOT NULL,
+    total DOUBLE PRECISION NOT NULL DEFAULT 0,
+    txn_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (dimension, txn_type, day, value)
+);
+
+-- Backfill from the existing transactions. Weeks start on Monday, like date_trunc('week').
+INSERT INTO spending_summaries (dimension, txn_type, day, value, week, month, total, txn_count)
+SELECT dimension, txn_type, day, value,
+       CASE WHEN day = DATE '1900-01-01' THEN day ELSE date_trunc('week', day)::date END,
+       CASE WHEN day = DATE '1900-01-01' THEN day ELSE date_trunc('month', day)::date END,
+       SUM(amount), COUNT(*)
+FROM (
+    SELECT 'category' AS dimension, txn_type, COALESCE(transaction_date, DATE '1900-01-01') AS day,
+           COALESCE(category, '') AS value, amount FROM transactions
+    UNION ALL
+    SELECT 'payee', txn_type, COALESCE(transaction_date, DATE '1900-01-01'), COALESCE(payee, ''), amount
+    FROM transactions
+    UNION ALL
+    SELECT 'bank_account', txn_type, COALESCE(transaction_date, DATE '1900-01-01'), COALESCE(bank_account, ''), amount
+    FROM transactions
+) AS rows
+GROUP BY dimension, txn_type, day, value
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,17 @@
+-- Which model and narrative template produced each row's embedding (EMBEDDING_VERSION in
+-- src/utils.py). Rows with another version are re-embedded by `python -m src.reembed`.
+ALTER TABLE transactions ADD COLUMN IF NOT EXISTS embedding_version VARCHAR(64);
+
+-- Every existing embedding came from gemini-embedding-001 and the first narrative template
+UPDATE transactions SET embedding_version = 'gemini-embedding-001:narrative-v1'
+WHERE embedding IS NOT NULL AND embedding_version IS NULL;
+
+-- Progress of re-embedding runs, one row per target version, so an interrupted run resumes
+CREATE TABLE IF NOT EXISTS reembed_checkpoints (
+    version VARCHAR(64) PRIMARY KEY,
+    last_id INTEGER NOT NULL DEFAULT 0,
+    rows_done INTEGER NOT NULL DEFAULT 0,
+    started_at TIMESTAMP DEFAULT now(),
+    updated_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
@@ -0,0 +1,26 @@
+-- Full-text side of GET /transactions/search (src/search.py).
+-- narrative is the text that was embedded (rag_narrative() in src/utils.py), stored so the
+-- full-text index covers the same words as the vector. The application writes it together
+-- with the embedding; existing rows are filled in with the same template.
+ALTER TABLE transactions ADD COLUMN IF NOT EXISTS narrative TEXT;
+
+-- Concatenation rather than format(): the migration runner passes the file through the driver,
+-- which would treat format's placeholders as query parameters.
+UPDATE transactions SET narrative =
+    CASE WHEN txn_type = 'DEBIT' THEN 'Paid ' ELSE 'Received ' END
+    -- float8::text drops the ".0" that Python's str(float) keeps for whole amounts
+    || CASE WHEN amount = trunc(amount) AND abs(amount) < 1e15 THEN amount::text || '.0' ELSE amount::text END
+    || CASE WHEN txn_type = 'DEBIT' THEN ' to ' ELSE ' from ' END
+    || coalesce(payee, 'None')
+    || ' via ' || coalesce(bank_account, 'None')
+    || ' on ' || coalesce(transaction_date::text, 'None')
+    || ' at ' || coalesce(transaction_time, 'None')
+    || '. Additional notes: ' || coalesce(notes, 'None') || '.'
+WHERE narrative IS NULL;
+
+-- Category isn't part of the embedded text but is the most common search word, so it is indexed too.
+-- Adding a stored generated column rewrites the table once.
+ALTER TABLE transactions ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('english', coalesce(narrative, '') || ' ' || coalesce(category, ''))) STORED;
+
+CREATE INDEX IF NOT EXISTS ix_transactions_search_vector ON transactions USING gin (search_vector);
@@ -0,0 +1,91 @@
+"""Spending summaries behind GET /analytics, updated by deltas in the same transaction as each write."""
+from collections import defaultdict, namedtuple
+from datetime import date, timedelta
+from typing import Iterable
+
+from sqlalchemy import delete, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.spending_summary import SpendingSummary
+
+SUMMARY_DIMENSIONS = ("category", "payee", "bank_account")
+# Day bucket for transactions without a date. Excluded from day/week/month series.
+# Not date.min: asyncpg binds that as -infinity.
+UNDATED = date(1900, 1, 1)
+
+# The transaction fields the summaries depend on
+SummarySnapshot = namedtuple("SummarySnapshot", ["txn_type", "day", "amount"] + list(SUMMARY_DIMENSIONS))
+
+
+def snapshot(txn) -> SummarySnapshot:
+    """Captures the summarised fields of a transaction, e.g. before it is modified."""
+    return SummarySnapshot(
+        txn_type=txn.txn_type,
+        day=txn.transaction_date or UNDATED,
+        amount=float(txn.amount or 0),
+        category=txn.category or "",
+        payee=txn.payee or "",
+        bank_account=txn.bank_account or "",
+    )
+
+
+def week_start(day: date) -> date:
+    return day if day == UNDATED else day - timedelta(days=day.weekday())
+
+
+def month_start(day: date) -> date:
+    return day if day == UNDATED else day.replace(day=1)
+
+
+def _as_snapshots(items) -> list[SummarySnapshot]:
+    return [item if isinstance(item, SummarySnapshot) else snapshot(item) for item in items]
+
+
+def _deltas(added: Iterable[SummarySnapshot], removed: Iterable[SummarySnapshot]) -> dict:
+    deltas = defaultdict(lambda: [0.0, 0])
+    for sign, snapshots in ((1, added), (-1, removed)):
+        for snap in snapshots:
+            for dimension in SUMMARY_DIMENSIONS:
+                delta = deltas[(dimension, snap.txn_type, snap.day, getattr(snap, dimension))]
+                delta[0] += sign * snap.amount
+                delta[1] += sign
+    # An edit that doesn't touch the summarised fields nets out to nothing
+    return {key: delta for key, delta in deltas.items() if delta[0] != 0 or delta[1] != 0}
+
+
+async def record_summary_changes(db: AsyncSession, added: Iterable = (), removed: Iterable = ()):
+    """
+    Applies transactions (or SummarySnapshots) added to / removed from the table to the summaries.
+    An update is removed=[snapshot before], added=[txn]. Runs in the caller's transaction, uncommitted.
+    """
+    deltas = _deltas(_as_snapshots(added), _as_snapshots(removed))
+    if not deltas:
+        return
+
+    # Sorted so concurrent writers lock summary rows in the same order
+    rows = [
+        {"dimension": dimension, "txn_type": txn_type, "day": day, "value": value,
+         "week": week_start(day), "month": month_start(day), "total": total, "txn_count": count}
+        for (dimension, txn_type, day, value), (total, count) in sorted(deltas.items())
+    ]
+
+    dialect = (await db.connection()).dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    stmt = insert(SpendingSummary).values(rows)
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[SpendingSummary.dimension, SpendingSummary.txn_type, SpendingSummary.day, SpendingSummary.value],
+        set_={
+            "total": SpendingSummary.total + stmt.excluded.total,
+            "txn_count": SpendingSummary.txn_count + stmt.excluded.txn_count,
+        },
+    ))
+
+    # Drop buckets whose last transaction went away
+    emptied = [key for key, (_, count) in deltas.items() if count < 0]
+    if emptied:
+        await db.execute(delete(SpendingSummary).where(
+            tuple_(SpendingSummary.dimension, SpendingSummary.txn_type, SpendingSummary.day,
+                   SpendingSummary.value).in_(emptied),
+            SpendingSummary.txn_count <= 0,
+        ))
@@ -0,0 +1,254 @@
+import hashlib
+import os
+import threading
+from array import array
+from collections import OrderedDict
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from src.database import SessionLocal
+from src.logger import logger
+from src.models.embedding_cache import EmbeddingCacheEntry
+
+
+class LRUCache:
+    """Small thread-safe LRU cache used for the in-process cache tiers."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class EmbeddingCache:
+    """Embeddings keyed by sha256(model, task_type, text): an in-process LRU over the `embedding_cache` table."""
+
+    def __init__(self, maxsize=1024, session_factory=SessionLocal):
+        self.memory = LRUCache(maxsize)
+        self.session_factory = session_factory
+        self._lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "db_hits": 0, "misses": 0}
+
+    @staticmethod
+    def make_key(model, task_type, text):
+        return hashlib.sha256(f"{model}\x00{task_type}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def get(self, model, task_type, text):
+        key = self.make_key(model, task_type, text)
+
+        packed = self.memory.get(key)
+        if packed is not None:
+            self._count("memory_hits")
+            return packed.tolist()
+
+        embedding = self._db_get(key)
+        if embedding is not None:
+            self._count("db_hits")
+            self.memory.put(key, array("d", embedding))
+            return embedding
+
+        self._count("misses")
+        return None
+
+    def put(self, model, task_type, text, embedding):
+        key = self.make_key(model, task_type, text)
+        self.memory.put(key, array("d", embedding))
+        self._db_put(key, model, task_type, embedding)
+
+    def get_many(self, model, task_type, texts):
+        """Batch get: one list entry per text (None on a miss), one query for the persistent tier."""
+        keys = [self.make_key(model, task_type, text) for text in texts]
+        results = [None] * len(texts)
+        db_lookup = {}
+        for i, key in enumerate(keys):
+            packed = self.memory.get(key)
+            if packed is not None:
+                results[i] = packed.tolist()
+                self._count("memory_hits")
+            else:
+                db_lookup.setdefault(key, []).append(i)
+
+        found = self._db_get_many(list(db_lookup)) if db_lookup else {}
+        for key, indexes in db_lookup.items():
+            embedding = found.get(key)
+            if embedding is not None:
+                self.memory.put(key, array("d", embedding))
+            for i in indexes:
+                results[i] = embedding
+                self._count("db_hits" if embedding is not None else "misses")
+        return results
+
+    def put_many(self, model, task_type, items):
+        """Batch put of (text, embedding) pairs, one insert for the persistent tier."""
+        entries = {}
+        for text, embedding in items:
+            key = self.make_key(model, task_type, text)
+            self.memory.put(key, array("d", embedding))
+            entries[key] = embedding
+        if entries:
+            self._db_put_many(model, task_type, entries)
+
+    def _db_get(self, key):
+        if self.session_factory is None:
+            return None
+        db = self.session_factory()
+        try:
+            entry = db.get(EmbeddingCacheEntry, key)
+            return [float(x) for x in entry.embedding] if entry is not None else None
+        except Exception as e:
+            # The cache must never fail the request, fall back to the API
+            logger.warning(f"Embedding cache lookup failed: {e}")
+            return None
+        finally:
+            db.close()
+
+    def _db_put(self, key, model, task_type, embedding):
+        if self.session_factory is None:
+            return
+        db = self.session_factory()
+        try:
+            db.add(EmbeddingCacheEntry(key=key, model=model, task_type=task_type, embedding=embedding))
+            db.commit()
+        except IntegrityError:
+            # Another worker stored the same embedding first
+            db.rollback()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Embedding cache write failed: {e}")
+        finally:
+            db.close()
+
+    def _db_get_many(self, keys):
+        if self.session_factory is None:
+            return {}
+        db = self.session_factory()
+        try:
+            rows = db.execute(
+                select(EmbeddingCacheEntry.key, EmbeddingCacheEntry.embedding).where(EmbeddingCacheEntry.key.in_(keys))
+            )
+            return {key: [float(x) for x in embedding] for key, embedding in rows}
+        except Exception as e:
+            logger.warning(f"Embedding cache lookup failed: {e}")
+            return {}
+        finally:
+            db.close()
+
+    def _db_put_many(self, model, task_type, entries):
+        if self.session_factory is None:
+            return
+        db = self.session_factory()
+        try:
+            # Entries another worker stored first are kept
+            insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+            db.execute(insert(EmbeddingCacheEntry).values([
+                {"key": key, "model": model, "task_type": task_type, "embedding": embedding}
+                for key, embedding in entries.items()
+            ]).on_conflict_do_nothing(index_elements=[EmbeddingCacheEntry.key]))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Embedding cache write failed: {e}")
+        finally:
+            db.close()
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = sum(counters.values())
+        hits = counters["memory_hits"] + counters["db_hits"]
+        return {
+            **counters,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_size": len(self.memory),
+        }
+
+    def clear(self):
+        """Clear the in-process tier and reset counters. The persistent tier is kept."""
+        self.memory.clear()
+        with self._lock:
+            for name in self.counters:
+                self.counters[name] = 0
+
+
+embedding_cache = EmbeddingCache(maxsize=int(os.environ.get("EMBEDDING_CACHE_SIZE", "1024")))
+
+
+class SQLCache:
+    """Prompt -> generated SQL. Dropped when the date rolls over, since "last month" depends on today."""
+
+    def __init__(self, maxsize=512):
+        self.entries = LRUCache(maxsize)
+        self._lock = threading.Lock()
+        self.day = None
+        self.counters = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    @staticmethod
+    def normalize(prompt):
+        return " ".join(prompt.lower().split()).rstrip(" .?!")
+
+    def _roll_over(self, day):
+        with self._lock:
+            if self.day == day:
+                return
+            if self.day is not None:
+                self.counters["invalidations"] += 1
+            self.day = day
+        self.entries.clear()
+
+    def get(self, prompt, day):
+        self._roll_over(day)
+        sql = self.entries.get((self.normalize(prompt), day))
+        with self._lock:
+            self.counters["hits" if sql is not None else "misses"] += 1
+        return sql
+
+    def put(self, prompt, day, sql):
+        self._roll_over(day)
+        self.entries.put((self.normalize(prompt), day), sql)
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            **counters,
+            "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+            "size": len(self.entries),
+        }
+
+    def clear(self):
+        self.entries.clear()
+        with self._lock:
+            self.day = None
+            for name in self.counters:
+                self.counters[name] = 0
+
+
+sql_cache = SQLCache(maxsize=int(os.environ.get("SQL_CACHE_SIZE", "512")))
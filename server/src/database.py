@@ -1,7 +1,10 @@
 import os
+from datetime import datetime, timezone
 
 import dotenv
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -10,13 +13,61 @@ dotenv.load_dotenv()
 # --- CONFIGURATION ---
 DATABASE_URL = os.environ.get("DATABASE_URL")
 
+# Connection pool settings, shared by the sync and async engines
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true"
+# Seconds after which a pooled connection is replaced, -1 disables
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+
+
+def utcnow() -> datetime:
+    # Naive UTC, matching the TIMESTAMP columns
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def engine_options(url) -> dict:
+    """Pool settings for url. SQLite (tests, local runs) keeps SQLAlchemy's defaults."""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+
+
+def async_database_url(url):
+    """Map a sync DATABASE_URL onto its async driver (asyncpg / aiosqlite)."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend == "postgresql":
+        url = url.set(drivername="postgresql+asyncpg")
+        # asyncpg takes 'ssl' rather than libpq's 'sslmode'
+        if "sslmode" in url.query:
+            query = dict(url.query)
+            query["ssl"] = query.pop("sslmode")
+            url = url.set(query=query)
+    elif backend == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    return url
+
+
 # --- SETUP DATABASE ---
 if DATABASE_URL:
-    engine = create_engine(DATABASE_URL)
+    # The sync engine is kept for migrations, the embedding cache and scripts
+    engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    # Routes use the async engine so DB I/O doesn't hold the event loop or a worker thread
+    async_engine = create_async_engine(async_database_url(DATABASE_URL), **engine_options(DATABASE_URL))
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 else:
     # Handle the case where we are just importing code but not running it
     engine = None
     SessionLocal = None
+    async_engine = None
+    AsyncSessionLocal = None
 
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
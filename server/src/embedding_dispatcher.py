@@ -0,0 +1,94 @@
+"""
+Micro-batching for single-text embedding calls: concurrent callers share one batched API call.
+"""
+import asyncio
+from typing import Callable, Sequence
+
+
+class EmbeddingDispatcher:
+    """
+    Batches concurrent embed() calls per task_type into one embed_batch(texts, task_type) call.
+    A flush_window of 0 turns batching off.
+    """
+
+    def __init__(self, embed_batch: Callable[[Sequence[str], str], list], max_batch_size=100, flush_window=0.005,
+                 run_blocking=asyncio.to_thread):
+        self.embed_batch = embed_batch
+        self.max_batch_size = max_batch_size
+        self.flush_window = flush_window
+        self.run_blocking = run_blocking
+        # (loop, task_type) -> list of (text, Future) still accepting callers, and its flush timer.
+        # Waiting callers are futures on the event loop, only the batch call itself takes a thread.
+        self._open = {}
+        self._timers = {}
+        self._sending = set()
+        self.counters = {"requests": 0, "batches": 0, "texts_sent": 0, "full_flushes": 0, "errors": 0}
+
+    async def embed(self, text: str, task_type: str):
+        """Waits for the batch holding text to be embedded and returns its vector."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.counters["requests"] += 1
+        if self.flush_window <= 0 or self.max_batch_size <= 1:
+            self._start_send(loop, task_type, [(text, future)])
+            return await future
+
+        key = (loop, task_type)
+        batch = self._open.get(key)
+        if batch is None:
+            batch = self._open[key] = []
+            self._timers[key] = loop.call_later(self.flush_window, self._flush, key)
+        batch.append((text, future))
+        if len(batch) >= self.max_batch_size:
+            # Full: send now instead of waiting out the window
+            self.counters["full_flushes"] += 1
+            self._flush(key)
+        return await future
+
+    def _flush(self, key):
+        self._timers.pop(key).cancel()
+        loop, task_type = key
+        self._start_send(loop, task_type, self._open.pop(key))
+
+    def _start_send(self, loop, task_type: str, batch: list):
+        task = loop.create_task(self._send(task_type, batch))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _send(self, task_type: str, batch: list):
+        # Callers that gave up (cancelled) before the flush are not sent
+        batch = [(text, future) for text, future in batch if not future.done()]
+        if not batch:
+            return
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        self.counters["batches"] += 1
+        self.counters["texts_sent"] += len(texts)
+
+        try:
+            vectors = dict(zip(texts, await self.run_blocking(self.embed_batch, texts, task_type)))
+        except Exception as e:
+            self.counters["errors"] += 1
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for text, future in batch:
+            if not future.done():
+                future.set_result(vectors[text])
+
+    def stats(self) -> dict:
+        counters = dict(self.counters)
+        batches = counters["batches"]
+        return {
+            **counters,
+            "max_batch_size": self.max_batch_size,
+            "flush_window_ms": self.flush_window * 1000,
+            "avg_batch_size": round(counters["texts_sent"] / batches, 2) if batches else 0.0,
+            # Share of the batch capacity used per API call
+            "fill_ratio": round(counters["texts_sent"] / (batches * self.max_batch_size), 4) if batches else 0.0,
+        }
+
+    def reset_stats(self):
+        for name in self.counters:
+            self.counters[name] = 0
@@ -0,0 +1,138 @@
+"""Receipt image preprocessing before Gemini extraction: upright, trimmed, downscaled JPEG."""
+import hashlib
+import io
+import os
+
+from PIL import Image, ImageChops, ImageOps, UnidentifiedImageError
+
+try:
+    from pillow_heif import register_heif_opener
+
+    register_heif_opener()
+    HEIF_SUPPORTED = True
+except ImportError:
+    HEIF_SUPPORTED = False
+
+# Longest side sent to the model, two 768px tiles keep receipt text readable
+RECEIPT_MAX_SIDE = int(os.environ.get("RECEIPT_MAX_SIDE", "1536"))
+RECEIPT_JPEG_QUALITY = int(os.environ.get("RECEIPT_JPEG_QUALITY", "85"))
+# Pixel difference from the border colour that still counts as border when trimming
+BORDER_TOLERANCE = 12
+
+# Perceptual hash: dHash over a (PHASH_SIZE + 1) x PHASH_SIZE grayscale thumbnail, PHASH_SIZE^2 bits.
+# 256 bits rather than the usual 64 so same-layout screenshots with different amounts stay apart.
+PHASH_SIZE = 16
+# The hex digest is split into this many bands. Two hashes within PHASH_BANDS - 1 bits of each
+# other always share a band exactly, which is what makes the near-duplicate lookup indexable.
+PHASH_BANDS = 4
+# Neighbouring cells must differ by more than this to set a bit, so flat areas don't flip on JPEG noise
+PHASH_DEADZONE = 2
+
+# Magic numbers for uploads Pillow can't open, so they are at least labelled correctly
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF8", "image/gif"),
+    (b"RIFF", "image/webp"),
+)
+_HEIF_BRANDS = (b"heic", b"heix", b"hevc", b"heim", b"heis", b"mif1", b"msf1")
+
+
+def detect_mime_type(image_bytes: bytes) -> str:
+    """Best-effort MIME type from the file signature, defaulting to image/jpeg."""
+    if image_bytes[4:8] == b"ftyp" and image_bytes[8:12] in _HEIF_BRANDS:
+        return "image/heic"
+    for signature, mime_type in _SIGNATURES:
+        if image_bytes.startswith(signature):
+            return mime_type
+    return "image/jpeg"
+
+
+def _trim_border(img: Image.Image) -> Image.Image:
+    # Uniform margins (letterboxing, blank space around a cropped screenshot) carry no text
+    background = Image.new(img.mode, img.size, img.getpixel((0, 0)))
+    diff = ImageChops.difference(img, background).convert("L").point(lambda p: 255 if p > BORDER_TOLERANCE else 0)
+    bbox = diff.getbbox()
+    if not bbox or bbox == (0, 0) + img.size:
+        return img
+    pad = 8
+    left, top, right, bottom = bbox
+    return img.crop((max(0, left - pad), max(0, top - pad), min(img.width, right + pad), min(img.height, bottom + pad)))
+
+
+def _to_rgb(img: Image.Image) -> Image.Image:
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        # Flatten transparency onto white, JPEG has no alpha
+        img = img.convert("RGBA")
+        flattened = Image.new("RGB", img.size, (255, 255, 255))
+        flattened.paste(img, mask=img.getchannel("A"))
+        return flattened
+    if img.mode not in ("RGB", "L"):
+        return img.convert("RGB")
+    return img
+
+
+def preprocess_receipt_image(image_bytes: bytes, max_side: int = RECEIPT_MAX_SIDE,
+                             quality: int = RECEIPT_JPEG_QUALITY) -> tuple[bytes, str]:
+    """
+    Returns (bytes, mime_type) ready to send to Gemini.
+    Images Pillow can't decode are passed through unchanged with their sniffed MIME type.
+    """
+    try:
+        img = Image.open(io.BytesIO(image_bytes))
+        if img.format == "JPEG":
+            # Let libjpeg decode at a reduced scale when the photo is far larger than needed
+            img.draft("RGB", (max_side, max_side))
+        img.load()
+    except (UnidentifiedImageError, OSError, ValueError, Image.DecompressionBombError):
+        return image_bytes, detect_mime_type(image_bytes)
+
+    # Apply the EXIF orientation before the metadata is dropped
+    img = ImageOps.exif_transpose(img)
+    img = _to_rgb(img)
+    img = _trim_border(img)
+
+    if max(img.size) > max_side:
+        img.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+
+    # A fresh encode carries no EXIF/GPS/ICC metadata unless passed explicitly
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=quality, optimize=True)
+    return out.getvalue(), "image/jpeg"
+
+
+def receipt_image_hashes(image_bytes: bytes) -> tuple[str, str | None]:
+    """
+    Returns (sha256, phash) hex digests of an upload. sha256 catches byte-identical re-uploads,
+    phash catches re-saved or recompressed copies. phash is None if the image can't be decoded.
+    """
+    sha256 = hashlib.sha256(image_bytes).hexdigest()
+    try:
+        img = Image.open(io.BytesIO(image_bytes))
+        if img.format == "JPEG":
+            img.draft("L", (PHASH_SIZE * 8, PHASH_SIZE * 8))
+        img.load()
+    except (UnidentifiedImageError, OSError, ValueError, Image.DecompressionBombError):
+        return sha256, None
+
+    # Same normalisation as the extraction path, so borders and rotation don't change the hash
+    img = _trim_border(_to_rgb(ImageOps.exif_transpose(img)))
+    pixels = list(img.convert("L").resize((PHASH_SIZE + 1, PHASH_SIZE), Image.Resampling.LANCZOS).getdata())
+
+    bits = 0
+    for row in range(PHASH_SIZE):
+        offset = row * (PHASH_SIZE + 1)
+        for col in range(PHASH_SIZE):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1] + PHASH_DEADZONE)
+    return sha256, f"{bits:0{PHASH_SIZE * PHASH_SIZE // 4}x}"
+
+
+def phash_bands(phash: str) -> list[str]:
+    """Split a hex phash into PHASH_BANDS equal substrings."""
+    width = len(phash) // PHASH_BANDS
+    return [phash[i * width:(i + 1) * width] for i in range(PHASH_BANDS)]
+
+
+def phash_distance(a: str, b: str) -> int:
+    """Hamming distance between two hex phashes."""
+    return (int(a, 16) ^ int(b, 16)).bit_count()
@@ -0,0 +1,178 @@
+"""Bulk transaction import from CSV or JSON lines bank statement exports, written in batches."""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import time
+from datetime import date, datetime
+from types import SimpleNamespace
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src import database
+from src.analytics import record_summary_changes, snapshot
+from src.logger import logger
+from src.models.transaction import Transaction
+from src.utils import EMBEDDING_VERSION, generate_rag_chunks, rag_narrative, run_blocking
+
+IMPORT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", "500"))
+# Invalid rows listed in the report, the rest are only counted
+MAX_REPORTED_ERRORS = 50
+
+IMPORT_FORMATS = ("csv", "jsonl")
+TEXT_FIELDS = ("payee", "category", "transaction_time", "source_app", "upi_transaction_id", "bank_account", "notes")
+DATE_FORMATS = ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y")
+
+
+def detect_format(filename: Optional[str]) -> Optional[str]:
+    extension = (filename or "").rsplit(".", 1)[-1].lower()
+    return {"csv": "csv", "jsonl": "jsonl", "ndjson": "jsonl"}.get(extension)
+
+
+def iter_records(lines: Iterable[str], fmt: str) -> Iterator[tuple[int, object]]:
+    """Yields (line number, raw record) without reading the whole input. Parse errors are yielded as exceptions."""
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, record
+        return
+
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, ValueError(f"Invalid JSON: {e.msg}")
+
+
+def _parse_date(value) -> Optional[date]:
+    if value in (None, ""):
+        return None
+    if isinstance(value, date):
+        return value
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(str(value).strip(), fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"transaction_date must be YYYY-MM-DD or DD-MM-YYYY, got {value!r}")
+
+
+def validate_row(record) -> dict:
+    """Normalises one raw record into Transaction column values, or raises ValueError."""
+    if isinstance(record, Exception):
+        raise record
+    if not isinstance(record, dict):
+        raise ValueError("Each record must be an object")
+
+    txn_type = str(record.get("txn_type") or "").strip().upper()
+    if txn_type not in ("DEBIT", "CREDIT"):
+        raise ValueError("txn_type must be DEBIT or CREDIT")
+    try:
+        amount = float(str(record.get("amount")).replace(",", ""))
+    except ValueError:
+        raise ValueError(f"amount must be a number, got {record.get('amount')!r}")
+
+    row = {"txn_type": txn_type, "amount": amount, "transaction_date": _parse_date(record.get("transaction_date"))}
+    for field in TEXT_FIELDS:
+        value = record.get(field)
+        row[field] = (str(value).strip() or None) if value is not None else None
+    return row
+
+
+async def _write_batch(db: AsyncSession, batch: list[dict], seen_upi_ids: set) -> tuple[int, int]:
+    """Inserts one batch, returns (imported, skipped duplicates)."""
+    upi_ids = {row["upi_transaction_id"] for row in batch if row["upi_transaction_id"]} - seen_upi_ids
+    existing = set()
+    if upi_ids:
+        existing = set(await db.scalars(
+            select(Transaction.upi_transaction_id).where(Transaction.upi_transaction_id.in_(upi_ids))
+        ))
+
+    new_rows = []
+    for row in batch:
+        upi_id = row["upi_transaction_id"]
+        if upi_id and (upi_id in existing or upi_id in seen_upi_ids):
+            continue
+        if upi_id:
+            seen_upi_ids.add(upi_id)
+        new_rows.append(row)
+
+    if new_rows:
+        vectors = await run_blocking(generate_rag_chunks, new_rows)
+        # Executed as a multi-row INSERT (executemany), no per-row round trips or RETURNING
+        await db.execute(insert(Transaction), [
+            {**row, "embedding": vector, "embedding_version": EMBEDDING_VERSION, "narrative": rag_narrative(row)}
+            for row, vector in zip(new_rows, vectors)
+        ])
+        await record_summary_changes(db, added=[snapshot(SimpleNamespace(**row)) for row in new_rows])
+        await db.commit()
+    return len(new_rows), len(batch) - len(new_rows)
+
+
+async def import_transactions(db: AsyncSession, lines: Iterable[str], fmt: str,
+                              batch_size: int = IMPORT_BATCH_SIZE) -> dict:
+    """
+    Imports every valid row from lines. Each batch is committed on its own, so re-running an
+    interrupted import only adds what is missing (for rows that carry a upi_transaction_id).
+    """
+    start = time.perf_counter()
+    report = {"rows_read": 0, "imported": 0, "skipped_duplicates": 0, "invalid": 0, "errors": []}
+    seen_upi_ids = set()
+    batch = []
+
+    async def flush():
+        imported, skipped = await _write_batch(db, batch, seen_upi_ids)
+        report["imported"] += imported
+        report["skipped_duplicates"] += skipped
+        batch.clear()
+
+    for line_no, record in iter_records(lines, fmt):
+        report["rows_read"] += 1
+        try:
+            batch.append(validate_row(record))
+        except ValueError as e:
+            report["invalid"] += 1
+            if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                report["errors"].append({"line": line_no, "message": str(e)})
+            continue
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+
+    elapsed = time.perf_counter() - start
+    report["elapsed_s"] = round(elapsed, 3)
+    report["rows_per_second"] = round(report["imported"] / elapsed, 1) if elapsed > 0 else 0.0
+    logger.info(f"Imported {report['imported']} of {report['rows_read']} rows "
+                f"({report['rows_per_second']} rows/s, {report['invalid']} invalid)")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import transactions from a CSV or JSON lines file.")
+    parser.add_argument("path", help="Statement export (.csv, .jsonl)")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="Defaults to the file extension")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format(args.path)
+    if fmt is None:
+        raise SystemExit("Could not tell the format from the file name, pass --format")
+    if database.AsyncSessionLocal is None:
+        raise SystemExit("DATABASE_URL is not set")
+
+    async def run():
+        async with database.AsyncSessionLocal() as db:
+            with open(args.path, newline="", encoding="utf-8-sig") as f:
+                return await import_transactions(db, f, fmt, args.batch_size)
+
+    print(json.dumps(asyncio.run(run()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Receipt ingestion pipeline shared by the upload routes and the ingestion job worker."""
+import os
+from typing import Optional
+
+from sqlalchemy import or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.analytics import record_summary_changes
+from src.image_preprocessing import receipt_image_hashes, phash_bands, phash_distance
+from src.logger import logger
+from src.models.transaction import Transaction, phash_band
+from src.utils import EMBEDDING_VERSION, extract_data_from_image, generate_rag_chunk_async, rag_narrative, run_blocking
+
+# Max perceptual hash distance (bits out of 256) for a re-saved copy. Off (-1) by default, since
+# same-layout UPI screenshots with different amounts differ by only a few bits.
+RECEIPT_PHASH_MAX_DISTANCE = int(os.environ.get("RECEIPT_PHASH_MAX_DISTANCE", "-1"))
+
+
+def transaction_from_receipt(data: dict, vector, image_hashes=(None, None)) -> Transaction:
+    image_sha256, image_phash = image_hashes
+    return Transaction(
+        txn_type=data['txn_type'],
+        amount=data['amount'],
+        payee=data['payee'],
+        category=data['category'],
+        transaction_date=data['transaction_date'],
+        transaction_time=data.get('transaction_time'),  # Save the time
+        source_app=data['app_name'],
+        upi_transaction_id=data.get('upi_id'),  # Save the ID
+        bank_account=data.get('bank_account'),  # Save the Bank
+        notes=data.get('notes'),
+        embedding=vector,
+        embedding_version=EMBEDDING_VERSION,
+        narrative=rag_narrative(data),
+        image_sha256=image_sha256,
+        image_phash=image_phash
+    )
+
+
+def receipt_response(txn: Transaction) -> dict:
+    return {
+        "id": txn.id,
+        "txn_type": txn.txn_type,
+        "amount": txn.amount,
+        "payee": txn.payee,
+        "category": txn.category,
+        "transaction_date": txn.transaction_date,
+        "transaction_time": txn.transaction_time,
+        "source_app": txn.source_app,
+        "upi_transaction_id": txn.upi_transaction_id,
+        "bank_account": txn.bank_account,
+        "notes": txn.notes
+    }
+
+
+def phash_matches(a: Optional[str], b: Optional[str]) -> bool:
+    return RECEIPT_PHASH_MAX_DISTANCE >= 0 and a is not None and b is not None \
+        and phash_distance(a, b) <= RECEIPT_PHASH_MAX_DISTANCE
+
+
+async def find_duplicate_receipts(db: AsyncSession, image_hashes: list) -> list[Optional[int]]:
+    """Id of a transaction ingested from the same image, per (sha256, phash). Two index queries at most."""
+    by_sha = {}
+    shas = {image_sha256 for image_sha256, _ in image_hashes}
+    for txn_id, image_sha256 in await db.execute(
+            select(Transaction.id, Transaction.image_sha256).where(Transaction.image_sha256.in_(shas))
+            .order_by(Transaction.id)):
+        by_sha.setdefault(image_sha256, txn_id)
+    found = [by_sha.get(image_sha256) for image_sha256, _ in image_hashes]
+
+    phashes = {phash for (_, phash), txn_id in zip(image_hashes, found) if txn_id is None and phash is not None}
+    if not phashes or RECEIPT_PHASH_MAX_DISTANCE < 0:
+        return found
+
+    # Any hash within 3 bits shares at least one band exactly, so the band indexes find the candidates
+    bands = [phash_bands(phash) for phash in phashes]
+    candidates = (await db.execute(
+        select(Transaction.id, Transaction.image_phash).where(or_(
+            *(phash_band(Transaction.image_phash, i).in_({hash_bands[i] for hash_bands in bands})
+              for i in range(len(bands[0])))
+        )).order_by(Transaction.id)
+    )).all()
+    for n, (_, image_phash) in enumerate(image_hashes):
+        if found[n] is None and image_phash is not None:
+            found[n] = next((candidate_id for candidate_id, candidate_phash in candidates
+                             if phash_matches(image_phash, candidate_phash)), None)
+    return found
+
+
+async def find_duplicate_receipt(db: AsyncSession, image_sha256: str, image_phash: Optional[str]) -> Optional[int]:
+    """Id of a transaction ingested from the same image, if any. Index lookups only, no model call."""
+    [txn_id] = await find_duplicate_receipts(db, [(image_sha256, image_phash)])
+    return txn_id
+
+
+async def ingest_receipt(db: AsyncSession, content: bytes, image_hashes=None) -> dict:
+    """
+    Runs one receipt image through the pipeline and commits the new transaction.
+    Model and database errors propagate to the caller.
+    """
+    # Re-uploads of the same image are answered from the hashes, before any Gemini call
+    if image_hashes is None:
+        image_hashes = await run_blocking(receipt_image_hashes, content)
+    duplicate_id = await find_duplicate_receipt(db, *image_hashes)
+    if duplicate_id is not None:
+        return {"status": "skipped", "message": "Transaction already exists.", "id": duplicate_id}
+    # End the read transaction, so no pooled connection sits idle through the model calls
+    await db.commit()
+
+    data = await run_blocking(extract_data_from_image, content)
+    if not data:
+        return {"status": "error", "message": "Could not extract data from receipt"}
+
+    # Check if transaction already exists to avoid crashing
+    existing_txn = await db.scalar(
+        select(Transaction.id).where(Transaction.upi_transaction_id == data.get('upi_id')).limit(1)
+    )
+    if existing_txn:
+        return {"status": "skipped", "message": "Transaction already exists.", "id": existing_txn}
+    await db.commit()
+
+    # Generate RAG chunk
+    vector = await generate_rag_chunk_async(data)
+
+    new_transaction = transaction_from_receipt(data, vector, image_hashes)
+    try:
+        db.add(new_transaction)
+        await record_summary_changes(db, added=[new_transaction])
+        await db.commit()
+        await db.refresh(new_transaction)
+    except IntegrityError:
+        await db.rollback()
+        logger.error(f"Duplicate Transaction ID detected: {data.get('upi_id')}")
+        return {"status": "error", "message": "Duplicate Transaction ID detected"}
+
+    return receipt_response(new_transaction)
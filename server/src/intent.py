@@ -0,0 +1,231 @@
+"""
+Local fast path for formulaic search prompts ("food last month", "paid to Zomato").
+Prompts with any unrecognised word return None and fall back to generate_sql.
+"""
+import os
+import re
+import threading
+import time
+from calendar import monthrange
+from collections import namedtuple
+from datetime import date, timedelta
+from typing import Optional
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.transaction import Transaction
+
+# Seconds the payee names loaded from the database are reused
+INTENT_PAYEE_TTL = int(os.environ.get("INTENT_PAYEE_TTL", "300"))
+# Longest payee name, in words, looked for in a prompt
+MAX_PAYEE_WORDS = 5
+
+SearchIntent = namedtuple(
+    "SearchIntent", ["category", "payees", "txn_type", "start_date", "end_date", "order", "count"],
+    defaults=[None] * 7
+)
+
+# The category list of the extraction prompt in src/utils.py
+CATEGORY_WORDS = {
+    "food": "Food", "travel": "Travel", "utilities": "Utilities", "utility": "Utilities",
+    "transfer": "Transfer", "transfers": "Transfer", "shopping": "Shopping", "other": "Other",
+}
+TXN_TYPE_WORDS = {
+    **dict.fromkeys(("spent", "spend", "spending", "expense", "expenses", "paid", "debit", "debits", "debited"), "DEBIT"),
+    **dict.fromkeys(("received", "receive", "income", "credit", "credits", "credited"), "CREDIT"),
+}
+ORDER_WORDS = {
+    **dict.fromkeys(("highest", "largest", "biggest", "costliest", "expensive", "top", "max", "maximum"), "amount_desc"),
+    **dict.fromkeys(("lowest", "smallest", "cheapest", "min", "minimum"), "amount_asc"),
+    **dict.fromkeys(("latest", "recent", "newest"), "newest"),
+    **dict.fromkeys(("oldest", "earliest"), "oldest"),
+}
+FILLER_WORDS = frozenset((
+    "show", "me", "my", "all", "list", "get", "find", "display", "give", "the", "a", "an", "of", "on", "in",
+    "for", "from", "to", "at", "by", "with", "i", "did", "do", "what", "were", "was", "is", "are", "how",
+    "much", "transactions", "transaction", "txns", "payments", "payment", "purchases", "history", "please",
+    "amount", "amounts", "money", "most",
+))
+DATE_UNITS = {"day": "days", "days": "days", "week": "weeks", "weeks": "weeks", "month": "months", "months": "months"}
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalize_words(text: str) -> list[str]:
+    return _WORD.findall(text.lower())
+
+
+def _month_start(day: date, months_back: int = 0) -> date:
+    month = day.month - 1 - months_back
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def _relative_dates(words: list[str], i: int, today: date):
+    """(words consumed, (start, end)) for a relative date phrase starting at words[i], or None."""
+    word = words[i]
+    following = words[i + 1] if i + 1 < len(words) else None
+    if word == "today":
+        return 1, (today, today)
+    if word == "yesterday":
+        return 1, (today - timedelta(days=1), today - timedelta(days=1))
+
+    if word in ("this", "last", "previous") and following in ("week", "month", "year"):
+        back = 0 if word == "this" else 1
+        if following == "week":
+            start = today - timedelta(days=today.weekday() + 7 * back)
+            end = today if back == 0 else start + timedelta(days=6)
+        elif following == "month":
+            start = _month_start(today, back)
+            end = today if back == 0 else start.replace(day=monthrange(start.year, start.month)[1])
+        else:
+            start = date(today.year - back, 1, 1)
+            end = today if back == 0 else date(start.year, 12, 31)
+        return 2, (start, end)
+
+    # "last 30 days", "past 2 weeks", "last 3 months": a window ending today
+    if word in ("last", "past") and following is not None and following.isdigit() and i + 2 < len(words) \
+            and words[i + 2] in DATE_UNITS:
+        n, unit = int(following), DATE_UNITS[words[i + 2]]
+        if unit == "days":
+            start = today - timedelta(days=n)
+        elif unit == "weeks":
+            start = today - timedelta(weeks=n)
+        else:
+            # Same day n months back, clamped to the end of a shorter month
+            first = _month_start(today, n)
+            start = first.replace(day=min(today.day, monthrange(first.year, first.month)[1]))
+        return 3, (start, today)
+    return None
+
+
+def parse_prompt(prompt: str, payees: dict, today: Optional[date] = None) -> Optional[SearchIntent]:
+    """
+    SearchIntent for a fully recognised prompt, otherwise None.
+    payees maps a payee's normalised name ("blue tokai") to the stored spellings.
+    """
+    today = today or date.today()
+    words = normalize_words(prompt)
+    if not words:
+        return None
+
+    fields = {}
+
+    def assign(key, value):
+        # The same field twice with different values ("food travel") is left to the LLM
+        if fields.get(key, value) != value:
+            raise ValueError(key)
+        fields[key] = value
+
+    i = 0
+    try:
+        while i < len(words):
+            word = words[i]
+            dates = _relative_dates(words, i, today)
+            if dates is not None:
+                consumed, (start, end) = dates
+                assign("start_date", start)
+                assign("end_date", end)
+                i += consumed
+                continue
+
+            # Longest known payee name starting here
+            for length in range(min(MAX_PAYEE_WORDS, len(words) - i), 0, -1):
+                name = " ".join(words[i:i + length])
+                if name in payees:
+                    assign("payees", payees[name])
+                    i += length
+                    break
+            else:
+                if word in CATEGORY_WORDS:
+                    assign("category", CATEGORY_WORDS[word])
+                elif word in TXN_TYPE_WORDS:
+                    assign("txn_type", TXN_TYPE_WORDS[word])
+                elif word in ORDER_WORDS:
+                    assign("order", ORDER_WORDS[word])
+                    # "top 5", "highest 3"
+                    if i + 1 < len(words) and words[i + 1].isdigit() and ORDER_WORDS[word] != "newest":
+                        assign("count", int(words[i + 1]))
+                        i += 1
+                elif word not in FILLER_WORDS:
+                    return None
+                i += 1
+    except (ValueError, OverflowError):
+        # Conflicting values, or a date window too large to compute ("last 999999999 days")
+        return None
+
+    return SearchIntent(**fields)
+
+
+def build_query(intent: SearchIntent) -> Select:
+    """SELECT id for the intent, ordered like the generated SQL would be. The caller adds limit/offset."""
+    query = select(Transaction.id)
+    if intent.category is not None:
+        # Case-insensitive equality, served by the trigram index on category
+        query = query.where(Transaction.category.ilike(intent.category))
+    if intent.payees is not None:
+        query = query.where(Transaction.payee.in_(intent.payees))
+    if intent.txn_type is not None:
+        query = query.where(Transaction.txn_type.ilike(intent.txn_type))
+    if intent.start_date is not None:
+        query = query.where(Transaction.transaction_date.between(intent.start_date, intent.end_date))
+
+    if intent.order == "amount_desc":
+        query = query.order_by(Transaction.amount.desc(), Transaction.id.desc())
+    elif intent.order == "amount_asc":
+        query = query.order_by(Transaction.amount.asc(), Transaction.id.desc())
+    elif intent.order == "oldest":
+        query = query.order_by(Transaction.transaction_date.asc().nulls_last(), Transaction.id.asc())
+    else:
+        query = query.order_by(Transaction.transaction_date.desc().nulls_last(), Transaction.id.desc())
+    return query
+
+
+class IntentParser:
+    """parse_prompt with the payee names from the database, and fast path hit counters."""
+
+    def __init__(self, payee_ttl: int = INTENT_PAYEE_TTL):
+        self.payee_ttl = payee_ttl
+        self._payees = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "fallbacks": 0}
+
+    async def known_payees(self, db: AsyncSession) -> dict:
+        if self._payees is None or time.monotonic() - self._loaded_at > self.payee_ttl:
+            payees = {}
+            for payee in await db.scalars(select(Transaction.payee).where(Transaction.payee.is_not(None)).distinct()):
+                name = " ".join(normalize_words(payee))
+                # Names that read as ordinary prompt words ("Food", "Me") would hijack them
+                if len(name) < 3 or name in FILLER_WORDS or name in CATEGORY_WORDS or name in TXN_TYPE_WORDS \
+                        or name in ORDER_WORDS:
+                    continue
+                payees.setdefault(name, []).append(payee)
+            self._payees = {name: tuple(sorted(spellings)) for name, spellings in payees.items()}
+            self._loaded_at = time.monotonic()
+        return self._payees
+
+    async def parse(self, db: AsyncSession, prompt: str) -> Optional[SearchIntent]:
+        intent = parse_prompt(prompt, await self.known_payees(db))
+        with self._lock:
+            self.counters["hits" if intent is not None else "fallbacks"] += 1
+        return intent
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+        prompts = counters["hits"] + counters["fallbacks"]
+        return {
+            **counters,
+            "hit_rate": round(counters["hits"] / prompts, 4) if prompts else 0.0,
+            "known_payees": len(self._payees or ()),
+        }
+
+    def clear(self):
+        self._payees = None
+        with self._lock:
+            for name in self.counters:
+                self.counters[name] = 0
+
+
+intent_parser = IntentParser()
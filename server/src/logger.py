@@ -1,46 +1,85 @@
+import atexit
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+from logging.handlers import RotatingFileHandler, WatchedFileHandler, QueueHandler, QueueListener
 from pathlib import Path
 import sys
-import datetime
+
+# Queue mode: handlers run on a background listener thread, logging calls only enqueue
+LOG_QUEUE_ENABLED = os.environ.get("LOG_QUEUE_ENABLED", "true").lower() == "true"
+# Records beyond this many pending are dropped (and counted) instead of blocking the caller
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+# "size" (default): rotate in-process at 5MB, for a single worker. "external": append to the shared
+# file and reopen it when logrotate moves it, for several uvicorn workers with logrotate set up.
+LOG_ROTATION = os.environ.get("LOG_ROTATION", "size")
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that counts and drops records when the queue is full instead of raising."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
 
 class Logger:
-    def __init__(self, log_dir="logs", log_filename="app.log", max_bytes=5*1024*1024, backup_count=3):
+    def __init__(self, log_dir="logs", log_filename="app.log", max_bytes=5*1024*1024, backup_count=3,
+                 name="FastAPI_App", use_queue=LOG_QUEUE_ENABLED, queue_size=LOG_QUEUE_SIZE, rotation=LOG_ROTATION,
+                 fmt="[%(asctime)s] [%(levelname)s] [%(process)d] %(message)s"):
         """
         Initializes the logger.
         :param log_dir: Directory where logs are stored.
         :param log_filename: Base name of the log file.
         :param max_bytes: Max size of a log file before rotation (default 5MB).
         :param backup_count: Number of backup files to keep.
+        :param name: Name of the underlying logging.Logger.
+        :param use_queue: Hand records to a background thread instead of writing inline.
+        :param queue_size: Max pending records in queue mode.
+        :param rotation: "size" for in-process rotation (one worker), "external" for logrotate-managed files.
+        :param fmt: Line format, "%(message)s" for lines that are only the message.
         """
         self.log_dir = Path(log_dir)
         self.log_dir.mkdir(parents=True, exist_ok=True)
         self.log_path = self.log_dir / log_filename
+        self.queue_handler = None
+        self.listener = None
 
         # Create a custom logger
-        self.logger = logging.getLogger("FastAPI_App")
+        self.logger = logging.getLogger(name)
         self.logger.setLevel(logging.DEBUG)
 
         # Avoid adding handlers multiple times if logger is reused
-        if not self.logger.hasHandlers():
-            self._setup_handlers(max_bytes, backup_count)
-
-    def _setup_handlers(self, max_bytes, backup_count):
-        # 1. Format: Time - Level - Message
-        formatter = logging.Formatter(
-            fmt="[%(asctime)s] [%(levelname)s] %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S"
-        )
-
-        # 2. File Handler (With Rotation)
-        # Automatically creates new file when current one reaches 5MB
-        file_handler = RotatingFileHandler(
-            self.log_path,
-            maxBytes=max_bytes,
-            backupCount=backup_count,
-            encoding='utf-8'
-        )
+        if not self.logger.handlers:
+            handlers = self._build_handlers(max_bytes, backup_count, rotation, fmt)
+            if use_queue:
+                self._setup_queue(handlers, queue_size)
+            else:
+                for handler in handlers:
+                    self.logger.addHandler(handler)
+
+    def _build_handlers(self, max_bytes, backup_count, rotation, fmt):
+        # 1. Format: Time - Level - [pid] - Message by default. The pid tells workers apart in the shared file.
+        formatter = logging.Formatter(fmt=fmt, datefmt="%Y-%m-%d %H:%M:%S")
+
+        # 2. File Handler
+        if rotation == "size":
+            # Automatically creates new file when current one reaches 5MB
+            file_handler = RotatingFileHandler(
+                self.log_path,
+                maxBytes=max_bytes,
+                backupCount=backup_count,
+                encoding='utf-8'
+            )
+        else:
+            # Appends only, and reopens the file after logrotate renames it
+            file_handler = WatchedFileHandler(self.log_path, encoding='utf-8')
         file_handler.setFormatter(formatter)
         file_handler.setLevel(logging.INFO) # Save INFO and above to file
 
@@ -50,16 +89,39 @@ class Logger:
         console_handler.setFormatter(formatter)
         console_handler.setLevel(logging.DEBUG) # Show everything in console
 
-        # Add handlers to logger
-        self.logger.addHandler(file_handler)
-        self.logger.addHandler(console_handler)
+        return [file_handler, console_handler]
+
+    def _setup_queue(self, handlers, queue_size):
+        # The request path only enqueues, file/console I/O and rotation happen on the listener thread
+        self.queue_handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+        self.logger.addHandler(self.queue_handler)
+
+        self.listener = QueueListener(self.queue_handler.queue, *handlers, respect_handler_level=True)
+        self.listener.start()
+        # Flush whatever is still queued on shutdown
+        atexit.register(self.stop)
+
+    def stop(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def stats(self):
+        if self.queue_handler is None:
+            return {"queued": False}
+        return {
+            "queued": True,
+            "pending": self.queue_handler.queue.qsize(),
+            "dropped": self.queue_handler.dropped,
+        }
 
     def get_logger(self):
         return self.logger
 
-# Create a singleton instance
-app_logger_instance = Logger(
-    log_dir="logs",
-    log_filename=f"log_{datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.log"
-)
-logger = app_logger_instance.get_logger()
\ No newline at end of file
+# Create a singleton instance. Several workers share one file, see LOG_ROTATION.
+app_logger_instance = Logger(log_dir="logs", log_filename="app.log")
+logger = app_logger_instance.get_logger()
+
+# Request log (src/middleware.py): bare JSON lines, one per request
+request_logger_instance = Logger(log_dir="logs", log_filename="requests.log", name="FastAPI_Requests", fmt="%(message)s")
+request_logger = request_logger_instance.get_logger()
@@ -1,45 +1,47 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from starlette.middleware.base import BaseHTTPMiddleware
-from fastapi import Request
+from src.cache import embedding_cache, sql_cache
+from src.intent import intent_parser
 from src.database import Base, engine
-from src.logger import logger
+from src.logger import logger, app_logger_instance, request_logger_instance
+from src.middleware import RequestLoggingMiddleware
 from src.routes.transactions import router as transactions_router
 from src.routes.events import router as events_router
+from src.routes.jobs import router as jobs_router
+from src.routes.analytics import router as analytics_router
+from src.worker import ingestion_pool
+from src.utils import embedding_dispatcher
 
-app = FastAPI()
-
-
-async def log_request_middleware(request: Request, call_next):
-    # Only log for relevant routes to avoid cluttering
-    if request.url.path.startswith("/transactions"):
-        # We must read the body and then re-set it
-        body = await request.body()
-        try:
-            # Decode for printing
-            body_str = body.decode()
-            print(f"\n--- INCOMING REQUEST ---")
-            print(f"Method: {request.method}")
-            print(f"URL: {request.url}")
-            print(f"Body: {body_str}")
-            print(f"------------------------\n")
-        except Exception as e:
-            print(f"Could not log body: {e}")
-
-        # This is the magic part: we create a new request object with the
-        # original body because the stream was consumed by await request.body()
-        async def receive():
-            return {"type": "http.request", "body": body}
 
-        request._receive = receive
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Receipt ingestion workers share the API's event loop (INGESTION_WORKERS=0 to run them separately)
+    ingestion_pool.start()
+    yield
+    await ingestion_pool.stop()
 
-    response = await call_next(request)
-    return response
 
+app = FastAPI(lifespan=lifespan)
 
-# Add it to your app
-app.add_middleware(BaseHTTPMiddleware, dispatch=log_request_middleware)
+app.add_middleware(RequestLoggingMiddleware)
 
 app.include_router(transactions_router)
 app.include_router(events_router)
+app.include_router(jobs_router)
+app.include_router(analytics_router)
+
+
+@app.get("/metrics")
+def metrics():
+    return {
+        "embedding_cache": embedding_cache.stats(),
+        "embedding_batches": embedding_dispatcher.stats(),
+        "sql_cache": sql_cache.stats(),
+        "search_fast_path": intent_parser.stats(),
+        "logging": app_logger_instance.stats(),
+        "request_logging": request_logger_instance.stats(),
+        "ingestion": ingestion_pool.stats()
+    }
 
 logger.info("Server started successfully!")
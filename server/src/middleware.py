@@ -0,0 +1,73 @@
+"""Structured request logging as a pure ASGI middleware, without buffering the body."""
+import json
+import os
+import random
+import time
+from datetime import datetime, timezone
+
+from src.logger import request_logger
+
+# Fraction of successful requests that get logged. Server errors are always logged.
+REQUEST_LOG_SAMPLE_RATE = float(os.environ.get("REQUEST_LOG_SAMPLE_RATE", "1.0"))
+
+
+class RequestLoggingMiddleware:
+    """Logs one JSON line per request: start time, method, path, status, latency and body sizes."""
+
+    def __init__(self, app, sample_rate: float = REQUEST_LOG_SAMPLE_RATE,
+                 path_prefixes: tuple[str, ...] = ("/transactions", "/events"), log=request_logger):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.path_prefixes = path_prefixes
+        self.log = log
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        started_at = datetime.now(timezone.utc)
+        start = time.perf_counter()
+        status = None
+        request_bytes = 0
+        response_bytes = 0
+
+        async def counting_receive():
+            nonlocal request_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                request_bytes += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            nonlocal status, response_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        except Exception:
+            # Log as a 500 (what the client will see) and let the server handle the exception
+            status = status or 500
+            raise
+        finally:
+            failed = status is None or status >= 500
+            if failed or self.sample_rate >= 1 or random.random() < self.sample_rate:
+                record = {
+                    # Request start, ISO-8601 UTC
+                    "ts": started_at.isoformat(timespec="milliseconds"),
+                    "event": "http_request",
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status,
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+                    "request_bytes": request_bytes,
+                    "response_bytes": response_bytes,
+                }
+                if failed:
+                    self.log.error(json.dumps(record))
+                else:
+                    self.log.info(json.dumps(record))
@@ -0,0 +1,99 @@
+"""Minimal versioned schema migrations from server/migrations/NNNN_description.sql."""
+import argparse
+import re
+from pathlib import Path
+
+from sqlalchemy import text
+
+from src.logger import logger
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+MIGRATION_FILE_PATTERN = re.compile(r"^(\d{4})_[\w-]+\.sql$")
+
+# Serialises concurrent runners (e.g. several containers starting at once) on PostgreSQL
+MIGRATION_LOCK_ID = 724_311_001
+
+
+def discover_migrations(directory: Path = MIGRATIONS_DIR) -> list[tuple[str, Path]]:
+    migrations = []
+    for path in sorted(directory.glob("*.sql")):
+        match = MIGRATION_FILE_PATTERN.match(path.name)
+        if not match:
+            logger.warning(f"Ignoring migration file with unexpected name: {path.name}")
+            continue
+        migrations.append((match.group(1), path))
+
+    versions = [version for version, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions in {directory}")
+    return migrations
+
+
+def ensure_migrations_table(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version VARCHAR PRIMARY KEY, "
+        "name VARCHAR NOT NULL, "
+        "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    ))
+
+
+def applied_versions(conn) -> set[str]:
+    return {row.version for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def pending_migrations(engine, directory: Path = MIGRATIONS_DIR) -> list[tuple[str, Path]]:
+    with engine.begin() as conn:
+        ensure_migrations_table(conn)
+        done = applied_versions(conn)
+    return [(version, path) for version, path in discover_migrations(directory) if version not in done]
+
+
+def run_migrations(engine, directory: Path = MIGRATIONS_DIR) -> list[str]:
+    """Apply all pending migrations and return the versions that were applied."""
+    applied = []
+    with engine.connect() as lock_conn:
+        is_postgres = engine.dialect.name == "postgresql"
+        if is_postgres:
+            lock_conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        try:
+            for version, path in pending_migrations(engine, directory):
+                logger.info(f"Applying migration {path.name}")
+                with engine.begin() as conn:
+                    conn.exec_driver_sql(path.read_text())
+                    conn.execute(
+                        text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+                        {"version": version, "name": path.name}
+                    )
+                applied.append(version)
+        finally:
+            if is_postgres:
+                lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+                lock_conn.commit()
+
+    logger.info(f"Migrations complete, {len(applied)} applied")
+    return applied
+
+
+def main():
+    from src.database import engine
+
+    parser = argparse.ArgumentParser(description="Apply versioned SQL migrations")
+    parser.add_argument("--status", action="store_true", help="Show pending migrations without applying them")
+    args = parser.parse_args()
+
+    if engine is None:
+        raise SystemExit("DATABASE_URL is not set")
+
+    if args.status:
+        pending = pending_migrations(engine)
+        for version, path in discover_migrations():
+            state = "pending" if (version, path) in pending else "applied"
+            print(f"{version}  {state:8}  {path.name}")
+        return
+
+    run_migrations(engine)
+
+
+if __name__ == "__main__":
+    main()
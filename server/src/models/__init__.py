@@ -0,0 +1,3 @@
+# Importing any model loads them all, so relationship targets given by name
+# ("Event", "Split") resolve in the worker and CLI processes as well as the API.
+from src.models import embedding_cache, event, ingestion_job, reembed_checkpoint, spending_summary, split, transaction  # noqa: F401
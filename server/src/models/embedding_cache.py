@@ -0,0 +1,17 @@
+from sqlalchemy import Column, String, DateTime, func
+from pgvector.sqlalchemy import Vector
+
+from src.database import Base
+
+
+class EmbeddingCacheEntry(Base):
+    __tablename__ = "embedding_cache"
+    # sha256 of (model, task_type, text)
+    key = Column(String(64), primary_key=True)
+
+    model = Column(String, nullable=False)
+    task_type = Column(String, nullable=False)
+
+    embedding = Column(Vector(3072), nullable=False)
+
+    created_at = Column(DateTime, server_default=func.now())
@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, Text, LargeBinary, DateTime, ForeignKey, func
+from sqlalchemy.orm import deferred
+
+from src.database import Base
+
+
+class IngestionJob(Base):
+    """A receipt upload waiting for (or done with) extraction, see src/worker.py."""
+    __tablename__ = "ingestion_jobs"
+    id = Column(Integer, primary_key=True, index=True)
+
+    # queued -> running -> succeeded / skipped / failed. Failed attempts go back to queued until
+    # INGESTION_MAX_ATTEMPTS is reached.
+    status = Column(String, nullable=False, default="queued", server_default="queued", index=True)
+
+    filename = Column(String, nullable=True)
+    # The uploaded image, cleared once the job is finished. Deferred so status polls don't load it.
+    image = deferred(Column(LargeBinary, nullable=True))
+    image_sha256 = Column(String(64), nullable=True)
+    image_phash = Column(String(64), nullable=True)
+
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    error = Column(Text, nullable=True)
+
+    # Created transaction, or the existing one for skipped duplicates
+    transaction_id = Column(Integer, ForeignKey("transactions.id", ondelete="SET NULL"), nullable=True)
+
+    created_at = Column(DateTime, server_default=func.now())
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
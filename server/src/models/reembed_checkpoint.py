@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, DateTime, func
+
+from src.database import Base
+
+
+class ReembedCheckpoint(Base):
+    """Progress of re-embedding transactions to one embedding version, see src/reembed.py."""
+    __tablename__ = "reembed_checkpoints"
+    version = Column(String(64), primary_key=True)
+
+    # Transactions are walked in id order; everything up to last_id has been handled
+    last_id = Column(Integer, nullable=False, default=0, server_default="0")
+    rows_done = Column(Integer, nullable=False, default=0, server_default="0")
+
+    started_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
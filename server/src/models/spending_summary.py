@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, Float, Date
+
+from src.database import Base
+
+
+class SpendingSummary(Base):
+    """Per-day spending totals along one dimension (category, payee, bank_account), maintained by src/analytics.py."""
+    __tablename__ = "spending_summaries"
+    # Primary key order matches the /analytics filter: dimension + txn_type, then a day range
+    dimension = Column(String, primary_key=True)
+    txn_type = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    # '' when the transaction has no value for the dimension
+    value = Column(String, primary_key=True)
+
+    week = Column(Date, nullable=False)
+    month = Column(Date, nullable=False)
+
+    total = Column(Float, nullable=False, default=0)
+    txn_count = Column(Integer, nullable=False, default=0)
@@ -8,7 +8,7 @@ class Split(Base):
     __tablename__ = "splits"
     id = Column(Integer, primary_key=True, index=True)
 
-    transaction_id = Column(Integer, ForeignKey("transactions.id"))
+    transaction_id = Column(Integer, ForeignKey("transactions.id"), index=True)
     transaction = relationship("Transaction", back_populates="splits")
 
     amount = Column(Float, nullable=False)
@@ -1,12 +1,21 @@
+from datetime import date
 from typing import List
 
-from sqlalchemy import Column, Integer, String, Float, Date, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Date, Text, ForeignKey, Index, func, literal_column
 from pgvector.sqlalchemy import Vector
-from sqlalchemy.orm import relationship, Mapped
+from sqlalchemy.orm import relationship, Mapped, deferred, validates
 
 from src.database import Base
 from src.models.split import Split
 
+# Width in hex chars of one band of image_phash (4 bands of 64 bits)
+PHASH_BAND_WIDTH = 16
+
+def phash_band(column, band: int):
+    # Rendered with literal offsets so the expression matches the indexes in migrations/0005
+    start = band * PHASH_BAND_WIDTH + 1
+    return func.substr(column, literal_column(str(start)), literal_column(str(PHASH_BAND_WIDTH)))
+
 
 class Transaction(Base):
     __tablename__ = "transactions"
@@ -28,9 +37,41 @@ class Transaction(Base):
     bank_account = Column(String, nullable=True)
 
     notes = Column(Text, nullable=True)
-    embedding = Column(Vector(3072))
+    # HNSW-indexed as halfvec (migrations/0003). Deferred, no response returns it.
+    embedding = deferred(Column(Vector(3072)))
+    # EMBEDDING_VERSION (model + narrative template) that produced embedding, see src/reembed.py
+    embedding_version = Column(String(64), nullable=True)
+    # The embedded text (rag_narrative), full-text indexed through the generated search_vector column
+    # that only exists in Postgres (migrations/0009_hybrid_search.sql) and so isn't mapped here
+    narrative = deferred(Column(Text, nullable=True))
+
+    # Hashes of the uploaded receipt image, used to skip re-uploads before calling Gemini
+    image_sha256 = Column(String(64), index=True)
+    image_phash = Column(String(64))
 
-    event_id = Column(Integer, ForeignKey("events.id"))
+    event_id = Column(Integer, ForeignKey("events.id"), index=True)
     event = relationship("Event", back_populates="transactions")
 
     splits: Mapped[List["Split"]] = relationship("Split", back_populates="transaction")
+
+    # Created by migrations/0004_query_indexes.sql. Postgres-only DDL (NULLS LAST, pg_trgm), so
+    # create_all on SQLite in tests skips them.
+    __table_args__ = (
+        Index("ix_transactions_date_id", transaction_date.desc().nulls_last(), id.desc()).ddl_if(dialect="postgresql"),
+        Index("ix_transactions_payee_trgm", payee, postgresql_using="gin",
+              postgresql_ops={"payee": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+        Index("ix_transactions_category_trgm", category, postgresql_using="gin",
+              postgresql_ops={"category": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+        # migrations/0005_receipt_image_hashes.sql
+        Index("ix_transactions_image_phash_b0", phash_band(image_phash, 0)),
+        Index("ix_transactions_image_phash_b1", phash_band(image_phash, 1)),
+        Index("ix_transactions_image_phash_b2", phash_band(image_phash, 2)),
+        Index("ix_transactions_image_phash_b3", phash_band(image_phash, 3)),
+    )
+
+    @validates("transaction_date")
+    def _parse_transaction_date(self, key, value):
+        # Payloads and Gemini output carry YYYY-MM-DD strings, asyncpg only binds date objects
+        if isinstance(value, str):
+            return date.fromisoformat(value) if value else None
+        return value
@@ -0,0 +1,137 @@
+"""
+Re-embeds transactions whose embedding_version differs from EMBEDDING_VERSION,
+resuming from a checkpoint after an interrupted run.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Optional
+
+from sqlalchemy import bindparam, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src import database
+from src.logger import logger
+from src.models.reembed_checkpoint import ReembedCheckpoint
+from src.models.transaction import Transaction
+from src.utils import EMBEDDING_VERSION, NARRATIVE_FIELDS, generate_rag_chunks, rag_narrative, run_blocking
+
+REEMBED_BATCH_SIZE = int(os.environ.get("REEMBED_BATCH_SIZE", "100"))
+# Upper bound on re-embedded rows per minute, 0 for no limit
+REEMBED_ROWS_PER_MINUTE = int(os.environ.get("REEMBED_ROWS_PER_MINUTE", "1000"))
+
+
+def is_stale(version: str = EMBEDDING_VERSION):
+    return or_(Transaction.embedding_version.is_(None), Transaction.embedding_version != version)
+
+
+# One UPDATE per batch (executemany). The narrative fields are compared with the values that
+# were embedded, so a concurrent edit through the API is not overwritten with a stale vector.
+_apply_embedding = (
+    update(Transaction.__table__)
+    .where(Transaction.__table__.c.id == bindparam("row_id"),
+           *(Transaction.__table__.c[field].is_not_distinct_from(bindparam(f"old_{field}")) for field in NARRATIVE_FIELDS))
+    .values(embedding=bindparam("new_embedding"), embedding_version=bindparam("new_version"),
+            narrative=bindparam("new_narrative"))
+)
+
+
+async def get_checkpoint(db: AsyncSession, version: str = EMBEDDING_VERSION, restart: bool = False) -> ReembedCheckpoint:
+    checkpoint = await db.get(ReembedCheckpoint, version)
+    if checkpoint is None:
+        checkpoint = ReembedCheckpoint(version=version, last_id=0, rows_done=0, started_at=database.utcnow())
+        db.add(checkpoint)
+    elif restart:
+        checkpoint.last_id, checkpoint.rows_done = 0, 0
+        checkpoint.started_at, checkpoint.finished_at = database.utcnow(), None
+    await db.commit()
+    return checkpoint
+
+
+async def reembed_batch(db: AsyncSession, checkpoint: ReembedCheckpoint, batch_size: int = REEMBED_BATCH_SIZE) -> int:
+    """Re-embeds the next batch of stale rows after the checkpoint and returns how many were read."""
+    rows = (await db.execute(
+        select(Transaction.id, *(getattr(Transaction, field) for field in NARRATIVE_FIELDS))
+        .where(Transaction.id > checkpoint.last_id, is_stale(checkpoint.version))
+        .order_by(Transaction.id)
+        .limit(batch_size)
+    )).all()
+    if not rows:
+        checkpoint.finished_at = checkpoint.updated_at = database.utcnow()
+        await db.commit()
+        return 0
+
+    data = [row._asdict() for row in rows]
+    vectors = await run_blocking(generate_rag_chunks, data)
+    await db.execute(_apply_embedding, [
+        {"row_id": row.id, "new_embedding": vector, "new_version": checkpoint.version,
+         "new_narrative": rag_narrative(fields), **{f"old_{field}": fields[field] for field in NARRATIVE_FIELDS}}
+        for row, fields, vector in zip(rows, data, vectors)
+    ])
+    checkpoint.last_id = rows[-1].id
+    checkpoint.rows_done += len(rows)
+    checkpoint.updated_at = database.utcnow()
+    # Vectors and checkpoint are committed together, a crash repeats at most this batch
+    await db.commit()
+    return len(rows)
+
+
+async def reembed_stale(db: AsyncSession, batch_size: int = REEMBED_BATCH_SIZE,
+                        rows_per_minute: int = REEMBED_ROWS_PER_MINUTE, restart: bool = False,
+                        max_batches: Optional[int] = None) -> dict:
+    """Runs batches until no stale row is left after the checkpoint (or max_batches is reached)."""
+    checkpoint = await get_checkpoint(db, restart=restart)
+    logger.info(f"Re-embedding to {checkpoint.version} from transaction id {checkpoint.last_id}")
+    start = time.perf_counter()
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        batch_start = time.perf_counter()
+        rows = await reembed_batch(db, checkpoint, batch_size)
+        if not rows:
+            break
+        batches += 1
+        logger.info(f"Re-embedded {checkpoint.rows_done} rows, up to transaction id {checkpoint.last_id}")
+        if rows_per_minute > 0:
+            # Spread batches out so the run never exceeds the configured rate
+            await asyncio.sleep(max(0.0, rows * 60 / rows_per_minute - (time.perf_counter() - batch_start)))
+
+    report = await reembed_status(db)
+    report["elapsed_s"] = round(time.perf_counter() - start, 3)
+    return report
+
+
+async def reembed_status(db: AsyncSession) -> dict:
+    checkpoint = await db.get(ReembedCheckpoint, EMBEDDING_VERSION, populate_existing=True)
+    return {
+        "version": EMBEDDING_VERSION,
+        "stale_rows": await db.scalar(select(func.count()).select_from(Transaction).where(is_stale())),
+        "rows_done": checkpoint.rows_done if checkpoint else 0,
+        "last_id": checkpoint.last_id if checkpoint else 0,
+        "finished": checkpoint is not None and checkpoint.finished_at is not None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-embed transactions with an outdated embedding version.")
+    parser.add_argument("--batch-size", type=int, default=REEMBED_BATCH_SIZE)
+    parser.add_argument("--rows-per-minute", type=int, default=REEMBED_ROWS_PER_MINUTE, help="0 for no limit")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start from the first row")
+    parser.add_argument("--status", action="store_true", help="Print progress and exit")
+    args = parser.parse_args()
+
+    if database.AsyncSessionLocal is None:
+        raise SystemExit("DATABASE_URL is not set")
+
+    async def run():
+        async with database.AsyncSessionLocal() as db:
+            if args.status:
+                return await reembed_status(db)
+            return await reembed_stale(db, args.batch_size, args.rows_per_minute, args.restart)
+
+    print(json.dumps(asyncio.run(run()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.analytics import SUMMARY_DIMENSIONS, UNDATED
+from src.dependencies import get_async_db
+from src.models.spending_summary import SpendingSummary
+from src.utils import parse_date_range
+
+router = APIRouter(
+    prefix="/analytics",
+    tags=["Analytics"]
+)
+
+TIME_BUCKETS = {"day": SpendingSummary.day, "week": SpendingSummary.week, "month": SpendingSummary.month}
+
+
+@router.get("/")
+async def get_analytics(
+        group_by: str = Query("category", description="category, payee, bank_account, day, week or month"),
+        date_range: str = Query(None, description="Date range in dd-mm-yyyy,dd-mm-yyyy format"),
+        txn_type: str = Query("DEBIT", description="DEBIT (spend) or CREDIT"),
+        lim: int = Query(50, ge=1, description="Max buckets for category, payee and bank_account"),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Spending totals from the summary tables. Dimensions are ordered by total, largest first;
+    day / week / month series are in date order and leave out undated transactions.
+    """
+    if group_by not in SUMMARY_DIMENSIONS and group_by not in TIME_BUCKETS:
+        choices = ", ".join(SUMMARY_DIMENSIONS + tuple(TIME_BUCKETS))
+        raise HTTPException(status_code=400, detail=f"group_by must be one of {choices}")
+
+    total = func.sum(SpendingSummary.total).label("total")
+    count = func.sum(SpendingSummary.txn_count).label("count")
+
+    # Every transaction has exactly one row per dimension, so time series sum the category rows
+    dimension = group_by if group_by in SUMMARY_DIMENSIONS else "category"
+    conditions = [SpendingSummary.dimension == dimension, SpendingSummary.txn_type == txn_type.upper()]
+    if date_range is not None:
+        start_date, end_date = parse_date_range(date_range)
+        conditions.append(SpendingSummary.day.between(start_date, end_date))
+    elif group_by in TIME_BUCKETS:
+        conditions.append(SpendingSummary.day > UNDATED)
+
+    if group_by in TIME_BUCKETS:
+        bucket = TIME_BUCKETS[group_by]
+        query = select(bucket.label("key"), total, count).where(*conditions).group_by(bucket).order_by(bucket)
+    else:
+        query = (
+            select(SpendingSummary.value.label("key"), total, count).where(*conditions)
+            .group_by(SpendingSummary.value).order_by(total.desc()).limit(lim)
+        )
+
+    buckets = [
+        {"key": row.key or None, "total": round(row.total, 2), "count": row.count}
+        for row in (await db.execute(query)).all()
+    ]
+    overall = (await db.execute(select(total, count).where(*conditions))).one()
+
+    return {
+        "group_by": group_by,
+        "txn_type": txn_type.upper(),
+        "total": round(overall.total or 0, 2),
+        "count": overall.count or 0,
+        "buckets": buckets
+    }
@@ -1,12 +1,14 @@
 from typing import Any, List, Optional
 
 from fastapi import APIRouter, UploadFile, File, Depends
-from sqlalchemy import Date
-from sqlalchemy.orm import Session
+from sqlalchemy import Date, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
-from src.dependencies import get_db
+from src.dependencies import get_async_db
 from src.logger import logger
 from src.models.event import Event
+from src.models.split import Split
 from src.models.transaction import Transaction
 from pydantic import BaseModel
 
@@ -16,9 +18,9 @@ router = APIRouter(
 )
 
 @router.post("/")
-def create_event(
+async def create_event(
     event: dict[str, Any],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
         new_event = Event(
@@ -27,8 +29,8 @@ def create_event(
         )
 
         db.add(new_event)
-        db.commit()
-        db.refresh(new_event)
+        await db.commit()
+        await db.refresh(new_event)
 
         logger.info(f"Event {new_event.id} created successfully")
         return {
@@ -41,45 +43,113 @@ def create_event(
         logger.error(f"Error creating event: {str(e)}", exc_info=True)
         return {"message": f"Error creating event: {str(e)}"}
 
+class SplitResponse(BaseModel):
+    id: int
+    payee: str
+    amount: float
+    is_settled: bool
+
+    class Config:
+        from_attributes = True
+
 class TransactionResponse(BaseModel):
     id: int
     txn_type: str
     amount: float
-    payee: str
-    category: str
+    payee: Optional[str]
+    category: Optional[str]
     transaction_date: Any
-    transaction_time: str
-    source_app: str
-    upi_transaction_id: str
-    bank_account: str
+    transaction_time: Optional[str]
+    source_app: Optional[str]
+    upi_transaction_id: Optional[str]
+    bank_account: Optional[str]
     notes: Optional[str]
     event_id: int
+    splits: List[SplitResponse] = []
 
     class Config:
         from_attributes = True
 
+class PayeeOutstanding(BaseModel):
+    payee: Optional[str]
+    amount: float
+    split_count: int
+
+class EventSummary(BaseModel):
+    transaction_count: int = 0
+    total_debit: float = 0.0
+    total_credit: float = 0.0
+    settled_amount: float = 0.0
+    settled_count: int = 0
+    unsettled_amount: float = 0.0
+    unsettled_count: int = 0
+    outstanding_by_payee: List[PayeeOutstanding] = []
+
 class EventResponse(BaseModel):
     id: int
     event_name: str
     event_notes: Optional[str]
 
     transactions: List[TransactionResponse] = []
+    summary: Optional[EventSummary] = None
 
     class Config:
         from_attributes = True
 
 
+async def _event_summary(db: AsyncSession, event_id: int) -> EventSummary:
+    """Totals for an event, aggregated by the database with GROUP BY."""
+    summary = EventSummary()
+
+    totals = await db.execute(
+        select(Transaction.txn_type, func.sum(Transaction.amount), func.count(Transaction.id))
+        .where(Transaction.event_id == event_id)
+        .group_by(Transaction.txn_type)
+    )
+    for txn_type, amount, count in totals:
+        summary.transaction_count += count
+        if txn_type == "DEBIT":
+            summary.total_debit = amount or 0.0
+        elif txn_type == "CREDIT":
+            summary.total_credit = amount or 0.0
+
+    # Splits with no explicit is_settled are still outstanding
+    is_settled = func.coalesce(Split.is_settled, False)
+    split_totals = await db.execute(
+        select(Split.payee, is_settled, func.sum(Split.amount), func.count(Split.id))
+        .join(Transaction, Split.transaction_id == Transaction.id)
+        .where(Transaction.event_id == event_id)
+        .group_by(Split.payee, is_settled)
+        .order_by(Split.payee)
+    )
+    for payee, settled, amount, count in split_totals:
+        if settled:
+            summary.settled_amount += amount or 0.0
+            summary.settled_count += count
+        else:
+            summary.unsettled_amount += amount or 0.0
+            summary.unsettled_count += count
+            summary.outstanding_by_payee.append(PayeeOutstanding(payee=payee, amount=amount or 0.0, split_count=count))
+
+    return summary
+
+
 @router.get("/{event_id}", response_model=EventResponse)
-def get_event(
+async def get_event(
     event_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
-        event = db.query(Event).filter(Event.id == event_id).first()
+        event = await db.scalar(
+            select(Event)
+            .options(selectinload(Event.transactions).selectinload(Transaction.splits))
+            .where(Event.id == event_id)
+        )
         if event:
+            response = EventResponse.model_validate(event)
+            response.summary = await _event_summary(db, event_id)
             logger.info(f"Event {event_id} retrieved successfully")
-            print(event.transactions.__dict__)
-            return event
+            return response
         else:
             logger.error(f"Event {event_id} not found")
             return {"message": "Event not found"}
@@ -89,11 +159,11 @@ def get_event(
         return {"message": f"Error retrieving event: {str(e)}"}
 
 @router.get("/")
-def get_all_events(
-    db: Session = Depends(get_db)
+async def get_all_events(
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
-        events = db.query(Event).all()
+        events = (await db.scalars(select(Event))).all()
         return [event.__dict__ for event in events]
 
     except Exception as e:
@@ -101,16 +171,18 @@ def get_all_events(
         return {"message": f"Error retrieving all events: {str(e)}"}
 
 @router.put("/")
-def update_event(
+async def update_event(
     event: dict[str, Any],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
         event_id = event.get("id")
         event_name = event.get("event_name")
         event_notes = event.get("event_notes")
-        db.query(Event).filter(Event.id == event_id).update({"event_name": event_name, "event_notes": event_notes})
-        db.commit()
+        await db.execute(
+            update(Event).where(Event.id == event_id).values(event_name=event_name, event_notes=event_notes)
+        )
+        await db.commit()
         logger.info(f"Event {event_id} updated successfully")
         return {"message": "Event updated successfully"}
 
@@ -120,15 +192,16 @@ def update_event(
 
 
 @router.delete("/{event_id}")
-def delete_event(
+async def delete_event(
     event_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
-        event = db.query(Event).filter(Event.id == event_id).first()
+        # Transactions are loaded so the ORM can detach them without lazy-loading
+        event = await db.get(Event, event_id, options=[selectinload(Event.transactions)])
         if event:
-            db.delete(event)
-            db.commit()
+            await db.delete(event)
+            await db.commit()
             logger.info(f"Event {event_id} deleted successfully")
             return {"message": "Event deleted successfully"}
         else:
@@ -144,55 +217,79 @@ class EventTransactionRequest(BaseModel):
     event_id: int
     txn_ids: List[int]
 
+async def _missing_transaction_ids(db: AsyncSession, txn_ids: List[int]) -> List[int]:
+    # Lock the rows we are about to update so they can't disappear before the UPDATE runs
+    found = set(await db.scalars(select(Transaction.id).where(Transaction.id.in_(txn_ids)).with_for_update()))
+    return sorted(set(txn_ids) - found)
+
 # Add transactions to an event
 @router.post("/add_transactions")
-def add_transactions(
+async def add_transactions(
     body: EventTransactionRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
-        event = db.query(Event).filter(Event.id == body.event_id).first()
-        if event:
-            for txn_id in body.txn_ids:
-                txn = db.query(Transaction).filter(Transaction.id == txn_id).first()
-                if txn:
-                    txn.event_id = body.event_id
-                    db.commit()
-                    logger.info(f"Transaction {txn_id} added to event {body.event_id} successfully")
-                else:
-                    logger.error(f"Transaction {txn_id} not found")
-                    return {"status": "error", "message": "Transaction not found"}
-            return {"status": "success", "message": "Transactions added to event successfully"}
-        else:
+        event = await db.scalar(select(Event.id).where(Event.id == body.event_id))
+        if not event:
             logger.error(f"Event {body.event_id} not found")
             return {"status": "error", "message": "Event not found"}
 
+        # Validate every id first, nothing is written if any of them is missing
+        missing_ids = await _missing_transaction_ids(db, body.txn_ids)
+        if missing_ids:
+            await db.rollback()
+            logger.error(f"Transactions {missing_ids} not found")
+            return {"status": "error", "message": "Transaction not found", "missing_ids": missing_ids}
+
+        result = await db.execute(
+            update(Transaction)
+            .where(Transaction.id.in_(body.txn_ids))
+            .values(event_id=body.event_id)
+            .execution_options(synchronize_session=False)
+        )
+        updated = result.rowcount
+        await db.commit()
+
+        logger.info(f"{updated} transactions added to event {body.event_id} successfully")
+        return {"status": "success", "message": "Transactions added to event successfully", "updated": updated, "missing_ids": []}
+
     except Exception as e:
+        await db.rollback()
         logger.error(f"Error adding transactions to event: {str(e)}", exc_info=True)
         return {"status": "error", "message": f"Error adding transactions to event: {str(e)}"}
 
 @router.post("/remove_transactions")
-def remove_transactions(
+async def remove_transactions(
     body: EventTransactionRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
-        event = db.query(Event).filter(Event.id == body.event_id).first()
-        if event:
-            for txn_id in body.txn_ids:
-                txn = db.query(Transaction).filter(Transaction.id == txn_id).first()
-                if txn:
-                    txn.event_id = None
-                    db.commit()
-                    logger.info(f"Transaction {txn_id} removed from event {body.event_id} successfully")
-                else:
-                    logger.error(f"Transaction {txn_id} not found")
-                    return {"status": "error", "message": "Transaction not found"}
-            return {"status": "success", "message": "Transactions removed from event successfully"}
-        else:
+        event = await db.scalar(select(Event.id).where(Event.id == body.event_id))
+        if not event:
             logger.error(f"Event {body.event_id} not found")
             return {"status": "error", "message": "Event not found"}
 
+        # Validate every id first, nothing is written if any of them is missing
+        missing_ids = await _missing_transaction_ids(db, body.txn_ids)
+        if missing_ids:
+            await db.rollback()
+            logger.error(f"Transactions {missing_ids} not found")
+            return {"status": "error", "message": "Transaction not found", "missing_ids": missing_ids}
+
+        # Only detach transactions that actually belong to this event
+        result = await db.execute(
+            update(Transaction)
+            .where(Transaction.id.in_(body.txn_ids), Transaction.event_id == body.event_id)
+            .values(event_id=None)
+            .execution_options(synchronize_session=False)
+        )
+        updated = result.rowcount
+        await db.commit()
+
+        logger.info(f"{updated} transactions removed from event {body.event_id} successfully")
+        return {"status": "success", "message": "Transactions removed from event successfully", "updated": updated, "missing_ids": []}
+
     except Exception as e:
+        await db.rollback()
         logger.error(f"Error removing transactions from event: {str(e)}", exc_info=True)
-        return {"status": "error", "message": f"Error removing transactions from event: {str(e)}"}
\ No newline at end of file
+        return {"status": "error", "message": f"Error removing transactions from event: {str(e)}"}
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.dependencies import get_async_db
+from src.ingestion import receipt_response
+from src.models.ingestion_job import IngestionJob
+from src.models.transaction import Transaction
+
+router = APIRouter(
+    prefix="/jobs",
+    tags=["Jobs"]
+)
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Status of a receipt ingestion job: queued, running, succeeded, skipped or failed.
+    Finished jobs include the created transaction (or, when skipped, the existing one).
+    """
+    job = await db.get(IngestionJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    transaction = None
+    if job.transaction_id is not None:
+        txn = await db.get(Transaction, job.transaction_id)
+        transaction = receipt_response(txn) if txn else None
+
+    return {
+        "id": job.id,
+        "status": job.status,
+        "filename": job.filename,
+        "attempts": job.attempts,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "transaction_id": job.transaction_id,
+        "transaction": transaction
+    }
@@ -1,28 +1,59 @@
 
+import asyncio
+import csv
+import io
+import json
+import os
+from collections import defaultdict
+
 from fastapi import APIRouter, UploadFile, File, Body
-from typing import Any, Optional
+from typing import Any, List, Optional
 
-from fastapi import HTTPException, Depends, Query, Form
+from fastapi import HTTPException, Depends, Query, Form, Response
+from fastapi.responses import StreamingResponse
 from httpx import Request
 from pydantic import BaseModel
-from sqlalchemy import text
+from sqlalchemy import text, and_, or_, select, update, func
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
-from sqlalchemy.orm import Session
-
-from src.dependencies import get_db
-from src.main import logger
+from src.analytics import record_summary_changes, snapshot
+from src.database import AsyncSessionLocal
+from src.dependencies import get_async_db
+from src.logger import logger
 from src.models.event import Event
 from src.models.split import Split
+from src.image_preprocessing import receipt_image_hashes
+from src.importer import detect_format, import_transactions
+from src.intent import build_query, intent_parser
+from src.ingestion import ingest_receipt, find_duplicate_receipt, find_duplicate_receipts, phash_matches, \
+    receipt_response, transaction_from_receipt
 from src.models.transaction import Transaction
-from src.utils import extract_data_from_image, generate_embedding, generate_sql, generate_rag_chunk, get_offset_limit, \
-    parse_date_range
+from src.search import SEARCH_CANDIDATES, lexical_candidates, reciprocal_rank_fusion, semantic_candidates
+from src.utils import extract_data_from_image, generate_embedding_async, generate_sql, generate_rag_chunk_async, get_offset_limit, \
+    parse_date_range, run_blocking, get_cached_sql, uses_query_vector, encode_cursor, decode_cursor, rag_narrative, \
+    EMBEDDING_VERSION
+from src.worker import enqueue_receipt, ingestion_pool
 
 router = APIRouter(
     prefix="/transactions",
     tags=["Transactions"]
 )
 
+# Max number of receipts processed against Gemini at the same time in a batch upload
+RECEIPT_BATCH_CONCURRENCY = int(os.environ.get("RECEIPT_BATCH_CONCURRENCY", "8"))
+
+# Rows fetched per server-side cursor round trip when streaming an export
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", "1000"))
+
+# HNSW recall knob for semantic search (higher = better recall, slower). pgvector's default is 40.
+VECTOR_EF_SEARCH = int(os.environ.get("VECTOR_EF_SEARCH", "100"))
+
+# How long the speculative prompt embedding waits for the generated SQL before it is requested.
+# SQL that arrives sooner without :query_vector means the embedding is never sent (nor billed).
+PROMPT_EMBEDDING_DELAY_MS = float(os.environ.get("PROMPT_EMBEDDING_DELAY_MS", "300"))
+
 class SplitResponse(BaseModel):
     id: int
     payee: str
@@ -36,11 +67,12 @@ class TransactionResponse(BaseModel):
     id: int
     txn_type: str
     amount: float
-    payee: str
-    category: str
+    # Nullable in the table: imported and manually created rows may not have them
+    payee: Optional[str]
+    category: Optional[str]
     transaction_date: Any
     transaction_time: Optional[str]
-    source_app: str
+    source_app: Optional[str]
     upi_transaction_id: Optional[str]
     bank_account: Optional[str]
     notes: Optional[str]
@@ -57,73 +89,253 @@ class SplitUpdateSchema(BaseModel):
     is_settled: Optional[bool] = None
     notes: Optional[str] = None
 
+class SettleSplitsSchema(BaseModel):
+    payee: str
+    event_id: int
+
+async def _settle_splits(db: AsyncSession, *conditions, settle: bool = True) -> list:
+    """
+    Settles (or unsettles) the matching splits and adjusts their parents with conditional UPDATEs.
+    Returns (split_id, transaction_id, amount) for the splits that changed. Not committed.
+    """
+    # NULL counts as unsettled, like the column default
+    pending = Split.is_settled.is_not(True) if settle else Split.is_settled.is_(True)
+    changed = (await db.execute(
+        update(Split)
+        .where(*conditions, pending)
+        .values(is_settled=settle)
+        .returning(Split.id, Split.transaction_id, Split.amount)
+        .execution_options(synchronize_session=False)
+    )).all()
+
+    deltas = defaultdict(float)
+    for _, txn_id, amount in changed:
+        if txn_id is not None:
+            deltas[txn_id] += amount if settle else -amount
+
+    # In id order, so concurrent bulk settles lock transactions in the same order
+    for txn_id in sorted(deltas):
+        row = (await db.execute(
+            update(Transaction)
+            .where(Transaction.id == txn_id)
+            .values(amount=Transaction.amount - deltas[txn_id])
+            .returning(Transaction.txn_type, Transaction.transaction_date, Transaction.amount,
+                       Transaction.category, Transaction.payee, Transaction.bank_account)
+            .execution_options(synchronize_session=False)
+        )).one()
+        after = snapshot(row)
+        await record_summary_changes(db, added=[after], removed=[after._replace(amount=after.amount + deltas[txn_id])])
+
+    return changed
+
+async def _save_transaction(db: AsyncSession, txn: Transaction) -> Transaction:
+    db.add(txn)
+    await db.commit()
+    await db.refresh(txn)
+    return txn
+
 @router.post("/upload-receipt")
 async def upload_receipt(
+        response: Response,
         file: UploadFile = File(...),
-        db: Session = Depends(get_db)
+        wait: bool = Query(False, description="Process inline and return the transaction instead of a job id"),
+        db: AsyncSession = Depends(get_async_db)
 ):
-
+    """
+    Queues the receipt as an ingestion job and returns 202, poll GET /jobs/{id} for the result.
+    With wait=true the receipt is processed inside the request.
+    """
     try:
         content = await file.read()
-        data = extract_data_from_image(content)
-
-        # Check if transaction already exists to avoid crashing
-        existing_txn = db.query(Transaction).filter(Transaction.upi_transaction_id == data.get('upi_id')).first()
-        if existing_txn:
-            return {"status": "skipped", "message": "Transaction already exists."}
-
-        # Generate RAG chunk
-        vector = generate_rag_chunk(data)
-
-        new_transaction = Transaction(
-            txn_type=data['txn_type'],
-            amount=data['amount'],
-            payee=data['payee'],
-            category=data['category'],
-            transaction_date=data['transaction_date'],
-            transaction_time=data.get('transaction_time'),  # Save the time
-            source_app=data['app_name'],
-            upi_transaction_id=data.get('upi_id'),  # Save the ID
-            bank_account=data.get('bank_account'),  # Save the Bank
-            notes=data.get('notes'),
-            embedding=vector
-        )
 
+        if wait:
+            return await ingest_receipt(db, content)
+
+        # Re-uploads of the same image are answered from the hashes, without queueing a job
+        image_hashes = await run_blocking(receipt_image_hashes, content)
+        duplicate_id = await find_duplicate_receipt(db, *image_hashes)
+        if duplicate_id is not None:
+            return {"status": "skipped", "message": "Transaction already exists.", "id": duplicate_id}
+
+        job = await enqueue_receipt(db, file.filename, content, image_hashes)
+        ingestion_pool.notify()
+
+        response.status_code = 202
+        return {"status": "queued", "job_id": job.id}
+
+    except Exception as e:
+        logger.error(e, exc_info=True)
+        return {"status": "error", "message": f"Error uploading receipt: {str(e)}"}
+
+async def _insert_receipts(db: AsyncSession, new_transactions: list[Transaction]) -> list[dict]:
+    db.add_all(new_transactions)
+    await record_summary_changes(db, added=new_transactions)
+    # Flush to get the generated ids
+    await db.flush()
+    created = [{"status": "success", **receipt_response(txn)} for txn in new_transactions]
+    await db.commit()
+    return created
+
+@router.post("/upload-receipts")
+async def upload_receipts(
+        files: List[UploadFile] = File(...),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Batch version of /upload-receipt. Returns one result per uploaded file, in upload order."""
+    semaphore = asyncio.Semaphore(RECEIPT_BATCH_CONCURRENCY)
+
+    async def bounded(func, *args):
+        async with semaphore:
+            return await run_blocking(func, *args)
+
+    results: list[dict] = [{"filename": f.filename} for f in files]
+
+    try:
+        contents = [await f.read() for f in files]
+
+        # 1. Skip images already ingested (or repeated in this batch) without calling Gemini
+        image_hashes = await asyncio.gather(*(run_blocking(receipt_image_hashes, c) for c in contents))
+        duplicate_ids = await find_duplicate_receipts(db, image_hashes)
+        to_extract, accepted, repeats = [], [], {}
+        for idx, ((image_sha256, image_phash), duplicate_id) in enumerate(zip(image_hashes, duplicate_ids)):
+            if duplicate_id is not None:
+                results[idx].update({"status": "skipped", "message": "Transaction already exists.", "id": duplicate_id})
+                continue
+            original = next((i for i, sha, phash in accepted
+                             if image_sha256 == sha or phash_matches(image_phash, phash)), None)
+            if original is not None:
+                # Repeat of an earlier file in this batch, reported once that file's outcome is known
+                repeats[idx] = original
+                continue
+            accepted.append((idx, image_sha256, image_phash))
+            to_extract.append(idx)
+        # No transaction stays open (and no connection pinned) while Gemini runs
+        await db.commit()
+
+        # 2. Extract the remaining receipts concurrently
+        extracted = [None] * len(files)
+        for idx, data in zip(to_extract, await asyncio.gather(
+                *(bounded(extract_data_from_image, contents[idx]) for idx in to_extract))):
+            extracted[idx] = data
+
+        # 3. Dedupe UPI ids against the DB in one query, and within the batch itself
+        upi_ids = {data.get('upi_id') for data in extracted if data and data.get('upi_id')}
+        existing_ids = set()
+        if upi_ids:
+            existing_ids = set(await db.scalars(
+                select(Transaction.upi_transaction_id).where(Transaction.upi_transaction_id.in_(upi_ids))
+            ))
+
+        pending = []
+        for idx in to_extract:
+            data = extracted[idx]
+            if not data:
+                results[idx].update({"status": "error", "message": "Could not extract data from receipt"})
+                continue
+            upi_id = data.get('upi_id')
+            if upi_id and upi_id in existing_ids:
+                results[idx].update({"status": "skipped", "message": "Transaction already exists."})
+                continue
+            if upi_id:
+                existing_ids.add(upi_id)
+            pending.append(idx)
+        await db.commit()
+
+        # 4. Generate embeddings concurrently for the new receipts only
+        vectors = await asyncio.gather(*(generate_rag_chunk_async(extracted[idx]) for idx in pending),
+                                       return_exceptions=True)
+
+        # 5. Build the rows. A failed embedding or malformed extraction only fails its own file
+        rows = {}
+        for idx, vector in zip(pending, vectors):
+            if isinstance(vector, Exception):
+                logger.error(f"Could not embed receipt {files[idx].filename}: {vector}")
+                results[idx].update({"status": "error", "message": "Could not generate embedding"})
+                continue
+            try:
+                rows[idx] = transaction_from_receipt(extracted[idx], vector, image_hashes[idx])
+            except (KeyError, TypeError, ValueError) as e:
+                logger.error(f"Invalid data extracted from receipt {files[idx].filename}: {e!r}")
+                results[idx].update({"status": "error", "message": "Could not extract data from receipt"})
+
+        # 6. Insert everything in a single transaction
         try:
-            db.add(new_transaction)
-            db.commit()
-            db.refresh(new_transaction)
-
-            return {
-                "txn_type": new_transaction.txn_type,
-                "amount": new_transaction.amount,
-                "payee": new_transaction.payee,
-                "category": new_transaction.category,
-                "transaction_date": new_transaction.transaction_date,
-                "transaction_time": new_transaction.transaction_time,
-                "source_app": new_transaction.source_app,
-                "upi_transaction_id": new_transaction.upi_transaction_id,
-                "bank_account": new_transaction.bank_account,
-                "notes": new_transaction.notes
-            }
-
-            # return {"status": "success", "id": new_transaction.id}
+            created = dict(zip(rows, await _insert_receipts(db, list(rows.values()))))
         except IntegrityError:
-            db.rollback()
-            logger.error(f"Duplicate Transaction ID detected: {data['upi_id']}")
-            return {"status": "error", "message": "Duplicate Transaction ID detected"}
+            # A UPI id inserted since step 3. Retry row by row so only the colliding file fails
+            await db.rollback()
+            logger.error("Duplicate Transaction ID detected while committing receipt batch, inserting one by one")
+            created = {}
+            embedded = dict(zip(pending, vectors))
+            for idx in rows:
+                # Fresh objects, the rollback expunged the batch's rows from the session
+                txn = transaction_from_receipt(extracted[idx], embedded[idx], image_hashes[idx])
+                try:
+                    [created[idx]] = await _insert_receipts(db, [txn])
+                except IntegrityError:
+                    await db.rollback()
+                    results[idx].update({"status": "error", "message": "Duplicate Transaction ID detected"})
+
+        for idx, result in created.items():
+            results[idx].update(result)
+        for idx, original in repeats.items():
+            if "id" in results[original]:
+                results[idx].update({"status": "skipped", "message": "Transaction already exists.",
+                                     "id": results[original]["id"]})
+            else:
+                # Nothing was stored from the first copy, so the repeat shares its error (or skip)
+                results[idx].update({"status": results[original]["status"], "message": results[original]["message"]})
+
+        logger.info(f"Receipt batch processed: {len(created)} created out of {len(files)} files")
+        return results
 
     except Exception as e:
         logger.error(e, exc_info=True)
-        return {"status": "error", "message": f"Error uploading receipt: {str(e)}"}
+        return {"status": "error", "message": f"Error uploading receipts: {str(e)}"}
+
+@router.post("/import")
+async def import_transactions_file(
+        file: UploadFile = File(...),
+        format: str = Query(None, pattern="^(csv|jsonl|ndjson)$", description="Defaults to the file extension"),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Bulk import of bank statement rows (CSV or JSON lines), see src/importer.py."""
+    fmt = detect_format(f".{format}" if format else file.filename)
+    if fmt is None:
+        raise HTTPException(status_code=400, detail="Could not tell the format from the file name, pass format=csv or jsonl")
+
+    try:
+        lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+        report = await import_transactions(db, lines, fmt)
+        return {"status": "success", **report}
+
+    except Exception as e:
+        logger.error(e, exc_info=True)
+        return {"status": "error", "message": f"Error importing transactions: {str(e)}"}
+
+# Listings are ordered newest first with id as tie-breaker, so (transaction_date, id) is a unique keyset
+LISTING_ORDER = (Transaction.transaction_date.desc().nulls_last(), Transaction.id.desc())
+
+def _after_cursor(cursor_date, cursor_id):
+    # Rows after (cursor_date, cursor_id) in LISTING_ORDER. Undated rows sort last.
+    if cursor_date is None:
+        return and_(Transaction.transaction_date.is_(None), Transaction.id < cursor_id)
+    return or_(
+        Transaction.transaction_date < cursor_date,
+        and_(Transaction.transaction_date == cursor_date, Transaction.id < cursor_id),
+        Transaction.transaction_date.is_(None)
+    )
 
 @router.get("/", response_model=list[TransactionResponse])
 async def get_transactions(
+        response: Response,
         prompt: str = Query(None, description="Natural language search query"),
         date_range: str = Query(None, description="Date range in YYYY-MM-DD format"),
         lim: int = Query(50, ge=-1),
         page: int = Query(1, ge=1),
-        db: Session = Depends(get_db)
+        cursor: str = Query(None, description="Opaque cursor from X-Next-Cursor, replaces page for listings"),
+        ef_search: int = Query(None, ge=1, le=1000, description="HNSW recall knob for semantic search"),
+        db: AsyncSession = Depends(get_async_db)
 ):
     offset_val, actual_limit = get_offset_limit(page, lim)
 
@@ -131,18 +343,24 @@ async def get_transactions(
 
     if prompt is None:
         try:
-            if date_range is None:
-                result = db.query(Transaction).order_by(Transaction.transaction_date.desc()).offset(offset_val).limit(actual_limit).all()
-            else:
+            # Splits are loaded up front, async sessions can't lazy-load during response serialization
+            query = select(Transaction).options(selectinload(Transaction.splits))
+
+            if date_range is not None:
                 start_date, end_date = parse_date_range(date_range)
                 logger.info(f"Fetching transactions between {start_date} and {end_date}")
+                query = query.where(Transaction.transaction_date >= start_date, Transaction.transaction_date <= end_date)
+
+            if cursor is not None:
+                # Keyset pagination: continue right after the last row of the previous page
+                query = query.where(_after_cursor(*decode_cursor(cursor)))
+                offset_val = 0
 
-                result = (db.query(Transaction)
-                          .filter(Transaction.transaction_date >= start_date, Transaction.transaction_date <= end_date)
-                          .order_by(Transaction.transaction_date.desc())
-                          .offset(offset_val)
-                          .limit(actual_limit)
-                          .all())
+            result = (await db.scalars(query.order_by(*LISTING_ORDER).offset(offset_val).limit(actual_limit))).all()
+
+            if lim != -1 and len(result) == actual_limit:
+                last = result[-1]
+                response.headers["X-Next-Cursor"] = encode_cursor(last.transaction_date, last.id)
 
             return result
 
@@ -150,100 +368,221 @@ async def get_transactions(
             logger.error(f"Error getting transactions: {e}", exc_info=True)
             raise HTTPException(status_code=400, detail=f"Error getting transactions: {e}")
 
-    # IF PROMPT IS PROVIDED, GENERATE SQL QUERY
+    # FORMULAIC PROMPTS ("food last month", "highest amount this week") ARE ANSWERED LOCALLY
+    try:
+        intent = await intent_parser.parse(db, prompt)
+        if intent is not None:
+            logger.info(f"Search prompt answered locally: {intent}")
+            if intent.count is not None:
+                # "top 5" caps the whole result, not each page
+                actual_limit = max(0, min(actual_limit, intent.count - offset_val))
+            txn_ids = (await db.scalars(build_query(intent).offset(offset_val).limit(actual_limit))).all()
+            return await _hydrate_transactions(db, list(txn_ids))
+
+    except Exception as e:
+        logger.error(f"Error running local search for '{prompt}': {e}", exc_info=True)
+        raise HTTPException(status_code=400, detail="Could not interpret search query.")
 
+    # OTHERWISE, GENERATE SQL QUERY
+    # Without a cached query, the embedding starts PROMPT_EMBEDDING_DELAY_MS after the SQL request
+    # and is abandoned if the SQL doesn't use it
+    embedding_task = None
     try:
-        generated_sql = generate_sql(prompt, lim, page)
+        generated_sql = get_cached_sql(prompt)
+        if generated_sql is None:
+            sql_task = asyncio.create_task(run_blocking(generate_sql, prompt, check_cache=False))
+            embedding_task = asyncio.create_task(_delayed_embedding(prompt))
+            generated_sql = await sql_task
         logger.info(f"Generated SQL query: {generated_sql}")
 
     except Exception as e:
+        if embedding_task is not None:
+            embedding_task.cancel()
         logger.error(f"Error generating SQL query: {e}", exc_info=True)
         raise HTTPException(status_code=400, detail="Could not generate SQL query.")
 
-    # 1. EMBED THE PROMPT (For semantic search)
-    # We always generate this because the LLM might decide to use it.
-    query_vector = generate_embedding(prompt)
+    params = {"limit": actual_limit, "offset": offset_val}
+
+    # 1. EMBED THE PROMPT (For semantic search), only when the SQL uses it
+    if uses_query_vector(generated_sql):
+        if embedding_task is None:
+            embedding_task = asyncio.create_task(generate_embedding_async(prompt))
+        query_vector = await embedding_task
+        params["query_vector"] = str(query_vector)  # pgvector expects string representation or list
+    elif embedding_task is not None:
+        embedding_task.cancel()
 
     # 4. EXECUTE THE SQL
     try:
-        # We bind the vector and pagination params safely
-        stmt = text(generated_sql)
-        result = db.execute(stmt, {
-            "query_vector": str(query_vector),  # pgvector expects string representation or list
-            "limit": actual_limit,
-            "offset": offset_val
-        })
-
-        # SQLAlchemy rows are accessible by column name.
-        # We assume the generated SQL selects 'id' (which 'SELECT *' does).
-        rows = result.fetchall()
-
-        if not rows:
-            return []
-
-        # Extract the IDs from the raw result preserving order
-        txn_ids = [row.id for row in rows]
-
-        # 3. RE-FETCH WITH ORM (Hydration)
-        # Now we fetch the full objects including the 'splits' relationship
-        # We use .filter(Transaction.id.in_(txn_ids))
-        from sqlalchemy.orm import selectinload
-
-        orm_results = (
-            db.query(Transaction)
-            .options(selectinload(Transaction.splits))  # Optimize fetching splits
-            .filter(Transaction.id.in_(txn_ids))
-            .all()
+        return await _run_generated_sql(
+            db, generated_sql, params,
+            ef_search=(ef_search or VECTOR_EF_SEARCH) if "query_vector" in params else None
         )
 
-        # 4. RESTORE ORDER
-        # The IN clause does not guarantee order, so we sort them back
-        # to match the semantic search/SQL order
-        txn_map = {txn.id: txn for txn in orm_results}
-        ordered_results = [txn_map[txn_id] for txn_id in txn_ids if txn_id in txn_map]
-
-        return ordered_results
-
     except Exception as e:
         # If the LLM wrote bad SQL, this will catch it
         print(f"SQL Error: {e}")
         logger.error(f"Error executing SQL query: Query: {generated_sql} {e}", exc_info=True)
         raise HTTPException(status_code=400, detail="Could not interpret search query.")
 
+async def _delayed_embedding(prompt: str):
+    await asyncio.sleep(PROMPT_EMBEDDING_DELAY_MS / 1000)
+    return await generate_embedding_async(prompt)
+
+@router.get("/search", response_model=list[TransactionResponse])
+async def search_transactions(
+        q: str = Query(..., min_length=1, description="Search text, e.g. 'coffee' or 'uber to airport'"),
+        date_range: str = Query(None, description="Date range in dd-mm-yyyy,dd-mm-yyyy format"),
+        lim: int = Query(20, ge=1, le=100),
+        page: int = Query(1, ge=1),
+        candidates: int = Query(SEARCH_CANDIDATES, ge=1, le=1000, description="Rows taken from each index"),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Hybrid search without SQL generation: full-text matches and nearest neighbours of the query
+    embedding, merged by reciprocal rank fusion (see src/search.py).
+    """
+    dates = parse_date_range(date_range) if date_range is not None else None
+
+    # The query embedding is fetched while the full-text candidates are read
+    embedding_task = asyncio.create_task(generate_embedding_async(q, "retrieval_query"))
+    try:
+        lexical = await lexical_candidates(db, q, candidates, dates)
+        semantic = await semantic_candidates(db, await embedding_task, candidates, dates, VECTOR_EF_SEARCH)
+    except Exception as e:
+        embedding_task.cancel()
+        logger.error(f"Error searching transactions for {q!r}: {e}", exc_info=True)
+        raise HTTPException(status_code=400, detail="Could not search transactions.")
+
+    ranked = reciprocal_rank_fusion(lexical, semantic)
+    offset_val = (page - 1) * lim
+    return await _hydrate_transactions(db, [txn_id for txn_id, _ in ranked[offset_val:offset_val + lim]])
+
+# Everything a client needs from an export. The embedding is deliberately left out.
+EXPORT_COLUMNS = (
+    Transaction.id, Transaction.txn_type, Transaction.amount, Transaction.payee, Transaction.category,
+    Transaction.transaction_date, Transaction.transaction_time, Transaction.source_app,
+    Transaction.upi_transaction_id, Transaction.bank_account, Transaction.notes, Transaction.event_id
+)
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+
+async def _stream_export(export_format: str, start_date=None, end_date=None):
+    """
+    Yields the export chunk by chunk from a server-side cursor. Uses its own session because the
+    response outlives the request's session.
+    """
+    async with AsyncSessionLocal() as db:
+        stmt = select(*EXPORT_COLUMNS).order_by(*LISTING_ORDER)
+        if start_date is not None:
+            stmt = stmt.where(Transaction.transaction_date >= start_date, Transaction.transaction_date <= end_date)
+        result = await db.stream(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if export_format == "csv":
+            writer.writerow(EXPORT_FIELDS)
+
+        async for rows in result.partitions():
+            if export_format == "csv":
+                writer.writerows(rows)
+            else:
+                for row in rows:
+                    buffer.write(json.dumps(row._asdict(), default=str))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue()
+
+@router.get("/export")
+def export_transactions(
+        format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+        date_range: str = Query(None, description="Date range in dd-mm-yyyy,dd-mm-yyyy format")
+):
+    start_date, end_date = parse_date_range(date_range) if date_range else (None, None)
+    logger.info(f"Streaming {format} export of transactions")
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _stream_export(format, start_date, end_date),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=transactions.{format}"}
+    )
+
+async def _run_generated_sql(db: AsyncSession, generated_sql: str, params: dict, ef_search: int = None) -> list[Transaction]:
+    # Scoped to the current transaction, so pooled connections keep the server default
+    if ef_search and db.get_bind().dialect.name == "postgresql":
+        await db.execute(text("SELECT set_config('hnsw.ef_search', :ef_search, true)"), {"ef_search": str(ef_search)})
+
+    # We bind the vector and pagination params safely
+    stmt = text(generated_sql)
+    result = await db.execute(stmt, params)
+
+    # SQLAlchemy rows are accessible by column name.
+    # The generated SQL selects only 'id', the full rows are hydrated below.
+    rows = result.fetchall()
+
+    # Extract the IDs from the raw result preserving order
+    return await _hydrate_transactions(db, [row.id for row in rows])
+
+async def _hydrate_transactions(db: AsyncSession, txn_ids: list[int]) -> list[Transaction]:
+    if not txn_ids:
+        return []
+
+    # 3. RE-FETCH WITH ORM (Hydration)
+    # Now we fetch the full objects including the 'splits' relationship
+    # We use .where(Transaction.id.in_(txn_ids))
+    orm_results = (await db.scalars(
+        select(Transaction)
+        .options(selectinload(Transaction.splits))  # Optimize fetching splits
+        .where(Transaction.id.in_(txn_ids))
+    )).all()
+
+    # 4. RESTORE ORDER
+    # The IN clause does not guarantee order, so we sort them back
+    # to match the semantic search/SQL order
+    txn_map = {txn.id: txn for txn in orm_results}
+    return [txn_map[txn_id] for txn_id in txn_ids if txn_id in txn_map]
+
 @router.put("/split")
 async def update_split(
         split_data: SplitUpdateSchema,  # Use the schema here
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
-    print(f"RECEIVED DATA: {split_data}")  # This will now print!
-
     try:
+        # Settlement is a single conditional UPDATE, no read-modify-write in Python
+        if split_data.is_settled:
+            if await _settle_splits(db, Split.id == split_data.id):
+                await db.commit()
+                logger.info(f"Transaction amount updated for split {split_data.id}")
+                return {"status": "success", "message": "Split settled successfully"}
+            if await db.get(Split, split_data.id) is None:
+                logger.error(f"Split {split_data.id} not found")
+                return {"status": "error", "message": "Split not found"}
+            return {"status": "success", "message": "Split already settled"}
+
         # Access fields using dot notation: split_data.id
-        split_obj = db.query(Split).filter(Split.id == split_data.id).first()
+        split_obj = await db.get(Split, split_data.id)
 
         if not split_obj:
             logger.error(f"Split {split_data.id} not found")
             return {"status": "error", "message": "Split not found"}
 
-        # Handle Settlement Logic
-        if split_data.is_settled:
-            txn = split_obj.transaction
-            txn.amount -= split_obj.amount
-            # OPTIONAL: You likely want to mark the split as settled in DB too?
-            split_obj.is_settled = True
-            db.commit()
-            logger.info(f"Transaction amount updated for split {split_obj.id}")
-            return {"status": "success", "message": "Split settled successfully"}
-
         # Handle General Update
         # Convert schema to dict, excluding fields that weren't sent (nulls)
         update_data = split_data.model_dump(exclude_unset=True)
 
+        # Unsettling puts the amount back on the transaction, atomically like settling
+        if update_data.pop("is_settled", None) is False:
+            await _settle_splits(db, Split.id == split_data.id, settle=False)
+
         for key, value in update_data.items():
             if hasattr(split_obj, key):
                 setattr(split_obj, key, value)
 
-        db.commit()
+        await db.commit()
         logger.info(f"Split {split_obj.id} updated successfully")
         return {"status": "success", "message": "Split updated successfully"}
 
@@ -251,25 +590,63 @@ async def update_split(
         logger.error(e, exc_info=True)
         return {"status": "error", "message": f"Error updating split: {str(e)}"}
 
+@router.put("/split/settle")
+async def settle_splits(body: SettleSplitsSchema, db: AsyncSession = Depends(get_async_db)):
+    """Settles every unsettled split owed by payee (case-insensitive) in an event, in one transaction."""
+    try:
+        if await db.get(Event, body.event_id) is None:
+            logger.error(f"Event {body.event_id} not found")
+            return {"status": "error", "message": "Event not found"}
+
+        # Rows are locked in id order so overlapping bulk settles queue instead of deadlocking
+        to_settle = (
+            select(Split.id)
+            .join(Transaction, Split.transaction_id == Transaction.id)
+            .where(Transaction.event_id == body.event_id, func.lower(Split.payee) == body.payee.lower())
+            .order_by(Split.id)
+            .with_for_update(of=Split)
+        )
+        changed = await _settle_splits(db, Split.id.in_(to_settle))
+        await db.commit()
+
+        logger.info(f"Settled {len(changed)} splits for {body.payee} in event {body.event_id}")
+        return {
+            "status": "success",
+            "message": f"{len(changed)} splits settled",
+            "settled_ids": [split_id for split_id, _, _ in changed],
+            "amount": round(sum(amount for _, _, amount in changed), 2)
+        }
+
+    except Exception as e:
+        logger.error(e, exc_info=True)
+        return {"status": "error", "message": f"Error settling splits: {str(e)}"}
+
 
 @router.put("/{txn_id}")
 async def update_transaction(
         txn_id: int,
         transaction: dict[str, Any],
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
 
     try:
-        txn = db.query(Transaction).filter(Transaction.id == txn_id).first()
+        txn = await db.get(Transaction, txn_id)
         if txn:
+            before = snapshot(txn)
+            narrative = rag_narrative(txn.__dict__)
             for key, value in transaction.items():
                 if hasattr(txn, key) and value is not None:
                     setattr(txn, key, value)
 
-            # Regenerate embedding if relevant fields are updated
-            txn.embedding = generate_rag_chunk(txn.__dict__)
+            # Regenerate the embedding only if the embedded text changed (category, event etc. don't
+            # appear in it), or the stored vector comes from an older EMBEDDING_VERSION
+            if rag_narrative(txn.__dict__) != narrative or txn.embedding_version != EMBEDDING_VERSION:
+                txn.embedding = await generate_rag_chunk_async(txn.__dict__)
+                txn.embedding_version = EMBEDDING_VERSION
+                txn.narrative = rag_narrative(txn.__dict__)
 
-            db.commit()
+            await record_summary_changes(db, added=[txn], removed=[before])
+            await db.commit()
             logger.info(f"Transaction {txn_id} updated successfully")
             return {"status": "success", "message": "Transaction updated successfully"}
         else:
@@ -281,16 +658,17 @@ async def update_transaction(
 
 
 @router.post("/")
-async def create_transaction(transaction: dict[str, Any], db: Session = Depends(get_db)):
+async def create_transaction(transaction: dict[str, Any], db: AsyncSession = Depends(get_async_db)):
     try:
         new_transaction = Transaction(**transaction)
 
         # Generate embedding
-        new_transaction.embedding = generate_rag_chunk(transaction)
+        new_transaction.embedding = await generate_rag_chunk_async(transaction)
+        new_transaction.embedding_version = EMBEDDING_VERSION
+        new_transaction.narrative = rag_narrative(transaction)
 
-        db.add(new_transaction)
-        db.commit()
-        db.refresh(new_transaction)
+        await record_summary_changes(db, added=[new_transaction])
+        await _save_transaction(db, new_transaction)
         logger.info(f"Transaction {new_transaction.id} created successfully")
 
         return {"status": "success", "message": "Transaction created successfully", "id": new_transaction.id}
@@ -300,12 +678,14 @@ async def create_transaction(transaction: dict[str, Any], db: Session = Depends(
         return {"status": "error", "message": f"Error creating transaction: {str(e)}"}
 
 @router.delete("/{txn_id}")
-async def delete_transaction(txn_id: int, db: Session = Depends(get_db)):
+async def delete_transaction(txn_id: int, db: AsyncSession = Depends(get_async_db)):
     try:
-        txn = db.query(Transaction).filter(Transaction.id == txn_id).first()
+        # Splits are loaded so the ORM can detach them without lazy-loading
+        txn = await db.get(Transaction, txn_id, options=[selectinload(Transaction.splits)])
         if txn:
-            db.delete(txn)
-            db.commit()
+            await record_summary_changes(db, removed=[txn])
+            await db.delete(txn)
+            await db.commit()
             logger.info(f"Transaction {txn_id} deleted successfully")
             return {"status": "success", "message": "Transaction deleted successfully"}
         else:
@@ -317,9 +697,9 @@ async def delete_transaction(txn_id: int, db: Session = Depends(get_db)):
         return {"status": "error", "message": f"Error deleting transaction: {str(e)}"}
 
 @router.post("/split")
-async def add_split(split: dict[str, Any], db: Session = Depends(get_db)):
+async def add_split(split: dict[str, Any], db: AsyncSession = Depends(get_async_db)):
     try:
-        txn = db.query(Transaction).filter(Transaction.id == split['txn_id']).first()
+        txn = await db.get(Transaction, split['txn_id'])
         if txn:
             new_split = Split(
                 payee=split['payee'],
@@ -328,8 +708,8 @@ async def add_split(split: dict[str, Any], db: Session = Depends(get_db)):
             )
             new_split.transaction_id = txn.id
             db.add(new_split)
-            db.commit()
-            db.refresh(new_split)
+            await db.commit()
+            await db.refresh(new_split)
 
             logger.info(f"Split {new_split.id} added to transaction {split['txn_id']} successfully")
             return {"status": "success", "message": "Split added successfully"}
@@ -341,12 +721,12 @@ async def add_split(split: dict[str, Any], db: Session = Depends(get_db)):
         return {"status": "error", "message": f"Error adding split: {str(e)}"}
 
 @router.delete("/split/{split_id}")
-async def delete_split(split_id: int, db: Session = Depends(get_db)):
+async def delete_split(split_id: int, db: AsyncSession = Depends(get_async_db)):
     try:
-        split_obj = db.query(Split).filter(Split.id == split_id).first()
+        split_obj = await db.get(Split, split_id)
         if split_obj:
-            db.delete(split_obj)
-            db.commit()
+            await db.delete(split_obj)
+            await db.commit()
             logger.info(f"Split {split_id} deleted successfully")
             return {"status": "success", "message": "Split deleted successfully"}
         else:
@@ -0,0 +1,80 @@
+"""Hybrid transaction search: full-text and vector candidates merged with reciprocal rank fusion."""
+import os
+import re
+from collections import defaultdict
+from datetime import date
+from typing import Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.utils import VECTOR_DISTANCE_SQL
+
+# Rows taken from each index before fusion
+SEARCH_CANDIDATES = int(os.environ.get("SEARCH_CANDIDATES", "200"))
+# RRF constant; larger values flatten the advantage of the very top ranks (60 is the usual choice)
+SEARCH_RRF_K = int(os.environ.get("SEARCH_RRF_K", "60"))
+
+_WORD = re.compile(r"\w+")
+
+
+def to_tsquery_text(query: str) -> Optional[str]:
+    """Any-word, prefix-matching tsquery text ("star cof" -> "star:* | cof:*"), None if the query has no words."""
+    # \w+ only, so user input can't inject tsquery operators
+    words = _WORD.findall(query.lower())
+    return " | ".join(f"{word}:*" for word in dict.fromkeys(words)) or None
+
+
+def _date_filter(date_range: Optional[tuple[date, date]]) -> str:
+    return " AND transaction_date BETWEEN :start_date AND :end_date" if date_range else ""
+
+
+def lexical_sql(date_range: Optional[tuple[date, date]] = None):
+    return text(f"""
+        SELECT id FROM transactions, to_tsquery('english', :tsquery) AS query
+        WHERE search_vector @@ query{_date_filter(date_range)}
+        ORDER BY ts_rank_cd(search_vector, query) DESC, id DESC
+        LIMIT :limit
+    """)
+
+
+def semantic_sql(date_range: Optional[tuple[date, date]] = None):
+    return text(f"""
+        SELECT id FROM transactions
+        WHERE embedding IS NOT NULL{_date_filter(date_range)}
+        ORDER BY {VECTOR_DISTANCE_SQL}
+        LIMIT :limit
+    """)
+
+
+async def lexical_candidates(db: AsyncSession, query: str, limit: int = SEARCH_CANDIDATES,
+                             date_range: Optional[tuple[date, date]] = None) -> list[int]:
+    tsquery = to_tsquery_text(query)
+    if tsquery is None:
+        return []
+    params = {"tsquery": tsquery, "limit": limit}
+    if date_range:
+        params["start_date"], params["end_date"] = date_range
+    result = await db.execute(lexical_sql(date_range), params)
+    return [row.id for row in result]
+
+
+async def semantic_candidates(db: AsyncSession, query_vector: Sequence[float], limit: int = SEARCH_CANDIDATES,
+                              date_range: Optional[tuple[date, date]] = None, ef_search: int = 0) -> list[int]:
+    # HNSW returns at most ef_search rows, so it must be at least the candidate count
+    await db.execute(text("SELECT set_config('hnsw.ef_search', :ef_search, true)"),
+                     {"ef_search": str(max(limit, ef_search))})
+    params = {"query_vector": str(list(query_vector)), "limit": limit}
+    if date_range:
+        params["start_date"], params["end_date"] = date_range
+    result = await db.execute(semantic_sql(date_range), params)
+    return [row.id for row in result]
+
+
+def reciprocal_rank_fusion(*rankings: Sequence[int], k: int = SEARCH_RRF_K) -> list[tuple[int, float]]:
+    """(id, score) pairs, best first. Ties go to the newer (higher) id."""
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, txn_id in enumerate(ranking, start=1):
+            scores[txn_id] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
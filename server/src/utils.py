@@ -1,14 +1,39 @@
+import asyncio
+import base64
+import functools
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 
 import google.generativeai as genai
 
+from src.cache import embedding_cache, sql_cache
+from src.embedding_dispatcher import EmbeddingDispatcher
+from src.image_preprocessing import preprocess_receipt_image, detect_mime_type
+
 # --- SETUP AI ---
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
 genai.configure(api_key=GEMINI_API_KEY)
 
-def extract_data_from_image(image_bytes):
+# --- BLOCKING CALL OFFLOAD ---
+# The genai SDK and the sync SQLAlchemy Session are blocking. Async routes hand those
+# calls to this bounded pool so a slow Gemini call never stalls the event loop.
+BLOCKING_POOL_SIZE = int(os.environ.get("BLOCKING_POOL_SIZE", "16"))
+_blocking_executor = ThreadPoolExecutor(max_workers=BLOCKING_POOL_SIZE, thread_name_prefix="blocking")
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking function in the bounded worker pool and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_blocking_executor, functools.partial(func, *args, **kwargs))
+
+def extract_data_from_image(image_bytes, preprocess=True):
+    # Downscaled, metadata-free JPEG instead of the raw upload (see src/image_preprocessing.py)
+    if preprocess:
+        image_bytes, mime_type = preprocess_receipt_image(image_bytes)
+    else:
+        mime_type = detect_mime_type(image_bytes)
+
     model = genai.GenerativeModel('gemini-2.5-flash-lite')
 
     prompt = """
@@ -30,24 +55,88 @@ def extract_data_from_image(image_bytes):
     """
 
     try:
-        response = model.generate_content([prompt, {"mime_type": "image/jpeg", "data": image_bytes}])
+        response = model.generate_content([prompt, {"mime_type": mime_type, "data": image_bytes}])
         clean_json = response.text.replace("```json", "").replace("```", "").strip()
         return json.loads(clean_json)
     except Exception as e:
         print(f"Extraction Error: {e}")
         return None
 
-def generate_embedding(text):
-    # Using the latest embedding model
-    result = genai.embed_content(
-        model="models/gemini-embedding-001",
-        content=text,
-        task_type="retrieval_document"
-    )
+# Must produce 3072-dimensional vectors (transactions.embedding is vector(3072))
+EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "models/gemini-embedding-001")
+# Bump whenever rag_narrative() changes what gets embedded
+RAG_NARRATIVE_VERSION = 1
+# Stored in transactions.embedding_version. Rows with any other version are re-embedded by src/reembed.py.
+EMBEDDING_VERSION = f"{EMBEDDING_MODEL.rsplit('/', 1)[-1]}:narrative-v{RAG_NARRATIVE_VERSION}"
+# Texts per embed_content call for batch embedding (the batch endpoint accepts up to 100)
+EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", "100"))
+# How long concurrent single-text embeddings wait for each other before one batched call
+# (src/embedding_dispatcher.py). 0 sends every text on its own.
+EMBEDDING_BATCH_WINDOW_MS = float(os.environ.get("EMBEDDING_BATCH_WINDOW_MS", "5"))
+
+# Distance expression matching the HNSW index in migrations/0003_embedding_hnsw_index.sql.
+# A plain `embedding <-> :query_vector` can't use it and falls back to a full scan.
+VECTOR_DISTANCE_SQL = "embedding::halfvec(3072) <-> CAST(:query_vector AS halfvec(3072))"
+
+def _embed_texts(texts, task_type):
+    # A lone text goes out as a plain single embed call
+    if len(texts) == 1:
+        return [genai.embed_content(model=EMBEDDING_MODEL, content=texts[0], task_type=task_type)['embedding']]
+    return genai.embed_content(model=EMBEDDING_MODEL, content=list(texts), task_type=task_type)['embedding']
+
+embedding_dispatcher = EmbeddingDispatcher(
+    _embed_texts, max_batch_size=EMBEDDING_BATCH_SIZE, flush_window=EMBEDDING_BATCH_WINDOW_MS / 1000,
+    run_blocking=run_blocking
+)
+
+def generate_embedding(text, task_type="retrieval_document"):
+    # Identical (model, task_type, text) never pays for a second API call
+    cached = embedding_cache.get(EMBEDDING_MODEL, task_type, text)
+    if cached is not None:
+        return cached
+
+    embedding = _embed_texts([text], task_type)[0]
+    embedding_cache.put(EMBEDDING_MODEL, task_type, text, embedding)
     # Returns a 3072-dimensional vector
-    return result['embedding']
+    return embedding
+
+async def generate_embedding_async(text, task_type="retrieval_document"):
+    # Like generate_embedding, but concurrent callers share one batched API call
+    cached = await run_blocking(embedding_cache.get, EMBEDDING_MODEL, task_type, text)
+    if cached is not None:
+        return cached
+
+    embedding = await embedding_dispatcher.embed(text, task_type)
+    await run_blocking(embedding_cache.put, EMBEDDING_MODEL, task_type, text, embedding)
+    return embedding
+
+def generate_embeddings(texts, task_type="retrieval_document"):
+    """Embeds many texts in input order, sending cache misses EMBEDDING_BATCH_SIZE texts per API call."""
+    vectors = embedding_cache.get_many(EMBEDDING_MODEL, task_type, texts)
+    missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+
+    computed = {}
+    for start in range(0, len(missing), EMBEDDING_BATCH_SIZE):
+        batch = missing[start:start + EMBEDDING_BATCH_SIZE]
+        result = genai.embed_content(model=EMBEDDING_MODEL, content=batch, task_type=task_type)
+        computed.update(zip(batch, result['embedding']))
+    embedding_cache.put_many(EMBEDDING_MODEL, task_type, computed.items())
+
+    return [vector if vector is not None else computed[text] for text, vector in zip(texts, vectors)]
+
+def get_cached_sql(prompt):
+    # Pagination stays in :limit/:offset, so the same SQL serves every page of a prompt
+    return sql_cache.get(prompt, date.today().strftime("%Y-%m-%d"))
+
+def uses_query_vector(sql):
+    return sql is not None and ":query_vector" in sql
+
+def generate_sql(prompt, check_cache=True):
+    if check_cache:
+        cached_sql = get_cached_sql(prompt)
+        if cached_sql is not None:
+            return cached_sql
 
-def generate_sql(prompt, lim, page):
      # 2. PREPARE THE SYSTEM PROMPT
     # We pass 'today' so the LLM knows what "last week" or "last month" means.
     today_str = date.today().strftime("%Y-%m-%d")
@@ -73,25 +162,25 @@ def generate_sql(prompt, lim, page):
 
         Context:
         - Today is: {today_str}
-        - The user wants page {page} with a limit of {lim}.
 
         Rules:
         1. STRICTLY return only the SQL query. No markdown, no explanations.
         2. Use the parameter ':query_vector' for semantic similarity if needed.
-        3. Use the parameter ':limit' and ':offset' for pagination.
-        4. For semantic search (vague queries like "something like food"), use: ORDER BY embedding <-> :query_vector
+        3. Always paginate with exactly 'LIMIT :limit OFFSET :offset'. Never hard-code the limit or offset.
+        4. For semantic search (vague queries like "something like food"), use exactly: ORDER BY {VECTOR_DISTANCE_SQL}
         5. For specific math (e.g. "highest amount"), use standard ORDER BY amount DESC.
-        6. Always select all columns using 'SELECT *'.
+        6. Always select only the id column using 'SELECT id'. Never select the embedding.
 
         Example 1 ("Show me food expenses last month"):
-        SELECT * FROM transactions 
+        SELECT id FROM transactions 
         WHERE category ILIKE '%food%' 
-        AND txn_date >= DATE_TRUNC('month', CURRENT_DATE - INTERVAL '1 month')
+        AND transaction_date >= DATE_TRUNC('month', CURRENT_DATE - INTERVAL '1 month')
+        AND transaction_date < DATE_TRUNC('month', CURRENT_DATE)
         LIMIT :limit OFFSET :offset;
 
         Example 2 ("Expenses similar to 'gym'"):
-        SELECT * FROM transactions 
-        ORDER BY embedding <-> :query_vector
+        SELECT id FROM transactions 
+        ORDER BY {VECTOR_DISTANCE_SQL}
         LIMIT :limit OFFSET :offset;
         """
     # print("asking llm")
@@ -102,17 +191,33 @@ def generate_sql(prompt, lim, page):
     try:
         response = model.generate_content(f"{system_prompt}\nUser Request: \"{prompt}\"")
         generated_sql = response.text.replace("```sql", "").replace("```", "").strip()
+        # Only queries that leave pagination to the bind parameters are reusable across pages
+        if ":limit" in generated_sql and ":offset" in generated_sql:
+            sql_cache.put(prompt, today_str, generated_sql)
         return generated_sql
 
     except Exception as e:
         print(f"SQL Generation Error: {e}")
         return None
 
+# Transaction fields read by rag_narrative(), a change to any of them needs a new embedding
+NARRATIVE_FIELDS = ("txn_type", "amount", "payee", "bank_account", "transaction_date", "transaction_time", "notes")
+
+def rag_narrative(data: dict) -> str:
+    action = "Paid" if data.get('txn_type') == "DEBIT" else "Received"
+    preposition = "to" if data.get('txn_type') == "DEBIT" else "from"
+    # Missing fields read as None, the same as explicit nulls (notes keeps its old '' default)
+    return f"{action} {data.get('amount')} {preposition} {data.get('payee')} via {data.get('bank_account')} on {data.get('transaction_date')} at {data.get('transaction_time')}. Additional notes: {data.get('notes', '')}."
+
 def generate_rag_chunk(data: dict):
-    action = "Paid" if data['txn_type'] == "DEBIT" else "Received"
-    preposition = "to" if data['txn_type'] == "DEBIT" else "from"
-    narrative = f"{action} {data['amount']} {preposition} {data['payee']} via {data['bank_account']} on {data['transaction_date']} at {data['transaction_time']}. Additional notes: {data.get('notes', '')}."
-    return generate_embedding(narrative)
+    return generate_embedding(rag_narrative(data))
+
+async def generate_rag_chunk_async(data: dict):
+    return await generate_embedding_async(rag_narrative(data))
+
+def generate_rag_chunks(rows: list[dict]):
+    """Batch version of generate_rag_chunk, see generate_embeddings."""
+    return generate_embeddings([rag_narrative(row) for row in rows])
 
 def get_offset_limit(page, lim):
     # Calculate standard SQL offset
@@ -150,3 +255,15 @@ def parse_date_range(date_range: str) -> tuple[date, date]:
 
     return start, end
 
+def encode_cursor(txn_date, txn_id) -> str:
+    # Opaque keyset cursor over (transaction_date, id)
+    payload = json.dumps({"d": txn_date.isoformat() if txn_date else None, "id": txn_id})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        txn_date = date.fromisoformat(payload["d"]) if payload["d"] else None
+        return txn_date, int(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -0,0 +1,213 @@
+"""
+Receipt ingestion job queue. Workers claim `ingestion_jobs` rows with FOR UPDATE SKIP LOCKED,
+in the API process or via `python -m src.worker`.
+"""
+import argparse
+import asyncio
+from datetime import timedelta
+import os
+from typing import Optional
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
+
+from src import database
+from src.ingestion import ingest_receipt
+from src.logger import logger
+from src.models.ingestion_job import IngestionJob
+
+# Worker loops started with the API. 0 leaves processing to `python -m src.worker`.
+INGESTION_WORKERS = int(os.environ.get("INGESTION_WORKERS", "2"))
+# Seconds an idle worker waits before polling again. Uploads to the same process wake it at once.
+INGESTION_POLL_INTERVAL = float(os.environ.get("INGESTION_POLL_INTERVAL", "2.0"))
+# Attempts before a job is marked failed (extraction errors, model timeouts, DB errors)
+INGESTION_MAX_ATTEMPTS = int(os.environ.get("INGESTION_MAX_ATTEMPTS", "3"))
+# Seconds after which a running job is considered abandoned by a dead worker and reclaimed
+INGESTION_JOB_TIMEOUT = int(os.environ.get("INGESTION_JOB_TIMEOUT", "300"))
+
+
+async def enqueue_receipt(db: AsyncSession, filename: Optional[str], content: bytes,
+                          image_hashes=(None, None)) -> IngestionJob:
+    image_sha256, image_phash = image_hashes
+    job = IngestionJob(filename=filename, image=content, image_sha256=image_sha256, image_phash=image_phash)
+    db.add(job)
+    await db.commit()
+    return job
+
+
+async def claim_next_job(db: AsyncSession) -> Optional[int]:
+    """Marks the oldest claimable job as running and returns its id, or None if the queue is empty."""
+    claimable = or_(
+        IngestionJob.status == "queued",
+        and_(IngestionJob.status == "running",
+             IngestionJob.started_at < database.utcnow() - timedelta(seconds=INGESTION_JOB_TIMEOUT)),
+    )
+    # SKIP LOCKED lets concurrent workers each take a different row instead of queueing on one
+    next_job = (
+        select(IngestionJob.id).where(claimable).order_by(IngestionJob.id).limit(1)
+        .with_for_update(skip_locked=True).scalar_subquery()
+    )
+    job_id = await db.scalar(
+        update(IngestionJob)
+        .where(IngestionJob.id == next_job)
+        .values(status="running", attempts=IngestionJob.attempts + 1, started_at=database.utcnow())
+        .returning(IngestionJob.id)
+    )
+    await db.commit()
+    return job_id
+
+
+def _record_failure(job: IngestionJob, error: str):
+    job.error = error
+    if job.attempts < INGESTION_MAX_ATTEMPTS:
+        job.status = "queued"
+        job.started_at = None
+    else:
+        # The image is kept so a failed job can be inspected or requeued by hand
+        job.status = "failed"
+        job.finished_at = database.utcnow()
+
+
+async def run_job(db: AsyncSession, job_id: int) -> str:
+    """Processes one claimed job and returns its new status."""
+    job = await db.get(IngestionJob, job_id, options=[undefer(IngestionJob.image)])
+    if job.attempts > INGESTION_MAX_ATTEMPTS:
+        # Reclaimed after its last attempt timed out
+        job.status = "failed"
+        job.error = job.error or "Worker stopped while processing the receipt"
+        job.finished_at = database.utcnow()
+        await db.commit()
+        return job.status
+
+    image_hashes = (job.image_sha256, job.image_phash) if job.image_sha256 else None
+    attempts = job.attempts
+    # Only short transactions from here on, ingest_receipt commits before each model call
+    await db.commit()
+    try:
+        result = await ingest_receipt(db, job.image, image_hashes)
+    except Exception as e:
+        logger.error(f"Ingestion job {job_id} failed (attempt {attempts}): {e}", exc_info=True)
+        await db.rollback()
+        result = {"status": "error", "message": f"Error uploading receipt: {str(e)}"}
+
+    # A rollback inside or after ingest_receipt expires the job, reload it before writing
+    await db.refresh(job)
+    if result.get("status") == "error":
+        _record_failure(job, result["message"])
+    else:
+        # Skipped duplicates point at the transaction that already holds the receipt
+        job.status = "skipped" if result.get("status") == "skipped" else "succeeded"
+        job.transaction_id = result.get("id")
+        job.error = None
+        job.finished_at = database.utcnow()
+        job.image = None
+    await db.commit()
+    return job.status
+
+
+class IngestionWorkerPool:
+    """N worker loops on the current event loop, pulling from the ingestion_jobs queue."""
+
+    def __init__(self, size: int = INGESTION_WORKERS, session_factory=None,
+                 poll_interval: float = INGESTION_POLL_INTERVAL):
+        self.size = size
+        self.poll_interval = poll_interval
+        self._session_factory = session_factory
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: list[asyncio.Task] = []
+        self.busy = 0
+        self.completed = {"succeeded": 0, "skipped": 0, "failed": 0, "retried": 0}
+
+    @property
+    def session_factory(self):
+        return self._session_factory or database.AsyncSessionLocal
+
+    def start(self):
+        if self._tasks or self.size <= 0 or self.session_factory is None:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run(), name=f"ingestion-worker-{i}") for i in range(self.size)]
+        logger.info(f"Started {self.size} ingestion workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._wakeup = None
+
+    def notify(self):
+        """Wakes idle workers after a job was enqueued from this process."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def work_once(self) -> Optional[str]:
+        """Claims and runs one job. Returns its new status, or None if there was nothing to do."""
+        async with self.session_factory() as db:
+            job_id = await claim_next_job(db)
+            if job_id is None:
+                return None
+            self.busy += 1
+            try:
+                status = await run_job(db, job_id)
+            finally:
+                self.busy -= 1
+        self.completed["retried" if status == "queued" else status] += 1
+        return status
+
+    async def drain(self):
+        """Runs jobs on `size` concurrent loops until the queue is empty."""
+        async def loop():
+            while await self.work_once() is not None:
+                pass
+        await asyncio.gather(*(loop() for _ in range(max(self.size, 1))))
+
+    async def _run(self):
+        while True:
+            try:
+                if await self.work_once() is not None:
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Database unavailable and the like, keep the worker alive and retry after a pause
+                logger.error(f"Ingestion worker error: {e}", exc_info=True)
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def stats(self) -> dict:
+        return {"workers": len(self._tasks), "busy": self.busy, **self.completed}
+
+
+ingestion_pool = IngestionWorkerPool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process queued receipt ingestion jobs.")
+    parser.add_argument("--workers", type=int, default=max(INGESTION_WORKERS, 1), help="Concurrent worker loops")
+    parser.add_argument("--once", action="store_true", help="Exit when the queue is empty instead of polling")
+    args = parser.parse_args()
+
+    if database.AsyncSessionLocal is None:
+        raise SystemExit("DATABASE_URL is not set")
+
+    pool = IngestionWorkerPool(size=args.workers)
+
+    async def run():
+        if args.once:
+            await pool.drain()
+            return
+        pool.start()
+        await asyncio.gather(*pool._tasks)
+
+    asyncio.run(run())
+    logger.info(f"Ingestion worker finished: {pool.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -93,3 +93,82 @@ def sample_image_bytes():
     # Create a minimal valid JPEG header
     return b'\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00'
 
+
+
+@pytest.fixture(scope="function")
+def api_db_path(tmp_path):
+    """File-backed SQLite shared by the sync test session and the async engine the routes use."""
+    return tmp_path / "api.db"
+
+
+@pytest.fixture(scope="function")
+def api_db_session(api_db_path):
+    """Sync session for seeding and inspecting the database behind the API."""
+    # Import models so they are registered on Base.metadata
+    from src.models.event import Event  # noqa: F401
+    from src.models.ingestion_job import IngestionJob  # noqa: F401
+    from src.models.reembed_checkpoint import ReembedCheckpoint  # noqa: F401
+    from src.models.spending_summary import SpendingSummary  # noqa: F401
+    from src.models.split import Split  # noqa: F401
+    from src.models.transaction import Transaction  # noqa: F401
+
+    engine = create_engine(f"sqlite:///{api_db_path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    session = TestingSessionLocal()
+
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def api_async_engine(api_db_session, api_db_path):
+    """aiosqlite engine on the same database. NullPool, as TestClient runs each request on a new event loop."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import NullPool
+
+    return create_async_engine(f"sqlite+aiosqlite:///{api_db_path}", poolclass=NullPool)
+
+
+@pytest.fixture(scope="function")
+def api_session_factory(api_async_engine):
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    return async_sessionmaker(api_async_engine, autoflush=False, expire_on_commit=False)
+
+
+@pytest.fixture(scope="function")
+def client(api_session_factory):
+    """FastAPI TestClient with get_async_db overridden to use the SQLite test database."""
+    from fastapi.testclient import TestClient
+    from src.main import app
+    from src.dependencies import get_async_db
+
+    async def override_get_async_db():
+        async with api_session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_caches():
+    """Keep the caches in-memory only and empty between tests."""
+    from src.cache import embedding_cache, sql_cache
+    from src.intent import intent_parser
+
+    embedding_cache.clear()
+    sql_cache.clear()
+    intent_parser.clear()
+    with patch.object(embedding_cache, "session_factory", None):
+        yield
+    embedding_cache.clear()
+    sql_cache.clear()
+    intent_parser.clear()
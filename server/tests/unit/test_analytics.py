@@ -0,0 +1,132 @@
+"""
+Unit tests for the spending summaries (src/analytics.py) and GET /analytics.
+"""
+from collections import defaultdict
+from datetime import date
+from unittest.mock import patch
+
+import pytest
+
+from src.analytics import UNDATED, month_start, week_start
+from src.models.spending_summary import SpendingSummary
+from src.models.transaction import Transaction
+
+
+def create(client, **fields):
+    payload = {"txn_type": "DEBIT", "amount": 100.0, "payee": "Zomato", "category": "Food",
+               "transaction_date": "2026-01-15", "bank_account": "SBI", **fields}
+    return client.post("/transactions/", json=payload).json()["id"]
+
+
+def recomputed(session, dimension):
+    """Summary contents rebuilt from the transactions table, the invariant the deltas maintain."""
+    expected = defaultdict(lambda: [0.0, 0])
+    for txn in session.query(Transaction):
+        key = (txn.txn_type, txn.transaction_date or UNDATED, getattr(txn, dimension) or "")
+        expected[key][0] += txn.amount
+        expected[key][1] += 1
+    return {key: (round(total, 6), count) for key, (total, count) in expected.items()}
+
+
+def stored(session, dimension):
+    session.expire_all()
+    return {
+        (row.txn_type, row.day, row.value): (round(row.total, 6), row.txn_count)
+        for row in session.query(SpendingSummary).filter_by(dimension=dimension)
+    }
+
+
+@pytest.fixture
+def api(client, mock_embedding):
+    with patch("src.routes.transactions.generate_rag_chunk_async", return_value=mock_embedding):
+        yield client
+
+
+class TestSummaryMaintenance:
+    """Every transaction write keeps the summaries equal to a full GROUP BY."""
+
+    def test_create_update_delete_keep_summaries_exact(self, api, api_db_session):
+        food = create(api, amount=120.0)
+        create(api, amount=80.0, payee="Swiggy", transaction_date="2026-01-16")
+        travel = create(api, amount=300.0, category="Travel", payee="Uber", bank_account=None)
+        create(api, amount=50.0, transaction_date=None)
+
+        api.put(f"/transactions/{food}", json={"category": "Dining", "amount": 130.0})
+        api.put(f"/transactions/{travel}", json={"transaction_date": "2026-02-01"})
+        api.delete(f"/transactions/{travel}")
+
+        for dimension in ("category", "payee", "bank_account"):
+            assert stored(api_db_session, dimension) == recomputed(api_db_session, dimension)
+
+    def test_emptied_buckets_are_removed(self, api, api_db_session):
+        txn_id = create(api, category="Rare")
+        api.put(f"/transactions/{txn_id}", json={"category": "Food"})
+
+        api_db_session.expire_all()
+        assert api_db_session.query(SpendingSummary).filter_by(value="Rare").count() == 0
+
+    def test_receipt_upload_is_summarised(self, client, api_db_session, mock_embedding):
+        from tests.unit.test_transactions_routes import receipt_data
+
+        with patch("src.ingestion.extract_data_from_image", return_value=receipt_data("801")), \
+                patch("src.ingestion.generate_rag_chunk_async", return_value=mock_embedding):
+            client.post("/transactions/upload-receipt?wait=true", files={"file": ("a.jpg", b"img", "image/jpeg")})
+
+        assert stored(api_db_session, "payee") == {("DEBIT", date(2026, 1, 15), "Zomato"): (150.0, 1)}
+
+    def test_settling_a_split_reduces_the_total(self, api, api_db_session):
+        txn_id = create(api, amount=300.0)
+        api.post("/transactions/split", json={"txn_id": txn_id, "payee": "Ravi", "amount": 100.0, "is_settled": False})
+        split_id = api_db_session.query(Transaction).get(txn_id).splits[0].id
+
+        api.put("/transactions/split", json={"id": split_id, "is_settled": True})
+
+        assert stored(api_db_session, "category") == {("DEBIT", date(2026, 1, 15), "Food"): (200.0, 1)}
+
+
+class TestAnalyticsEndpoint:
+    """GET /analytics reads the summaries."""
+
+    @pytest.fixture
+    def seeded(self, api):
+        create(api, amount=100.0, category="Food", transaction_date="2026-01-05")
+        create(api, amount=40.0, category="Food", transaction_date="2026-01-06")
+        create(api, amount=500.0, category="Rent", payee="Landlord", transaction_date="2026-02-01")
+        create(api, amount=20.0, category="Misc", transaction_date=None)
+        create(api, txn_type="CREDIT", amount=1000.0, category="Salary", transaction_date="2026-01-31")
+        return api
+
+    def test_by_category_orders_by_total(self, seeded):
+        body = seeded.get("/analytics/", params={"group_by": "category"}).json()
+
+        assert [(b["key"], b["total"], b["count"]) for b in body["buckets"]] == [
+            ("Rent", 500.0, 1), ("Food", 140.0, 2), ("Misc", 20.0, 1)
+        ]
+        assert body["total"] == 660.0 and body["count"] == 4
+
+    def test_by_month_skips_undated(self, seeded):
+        body = seeded.get("/analytics/", params={"group_by": "month"}).json()
+
+        assert [(b["key"], b["total"]) for b in body["buckets"]] == [("2026-01-01", 140.0), ("2026-02-01", 500.0)]
+
+    def test_by_week_within_date_range(self, seeded):
+        body = seeded.get("/analytics/", params={"group_by": "week", "date_range": "01-01-2026,31-01-2026"}).json()
+
+        # 5 and 6 Jan 2026 are a Monday and a Tuesday
+        assert [(b["key"], b["count"]) for b in body["buckets"]] == [("2026-01-05", 2)]
+
+    def test_credit_and_payee(self, seeded):
+        body = seeded.get("/analytics/", params={"group_by": "payee", "txn_type": "credit"}).json()
+        assert [(b["key"], b["total"]) for b in body["buckets"]] == [("Zomato", 1000.0)]
+
+    def test_invalid_group_by(self, seeded):
+        assert seeded.get("/analytics/", params={"group_by": "hour"}).status_code == 400
+
+
+class TestBuckets:
+    """Week and month starts."""
+
+    def test_week_and_month_start(self):
+        assert week_start(date(2026, 1, 8)) == date(2026, 1, 5)
+        assert month_start(date(2026, 1, 8)) == date(2026, 1, 1)
+        assert week_start(UNDATED) == UNDATED
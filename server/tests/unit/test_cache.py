@@ -0,0 +1,144 @@
+"""
+Unit tests for the LRU and embedding caches.
+"""
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.cache import LRUCache, EmbeddingCache
+from src.models.embedding_cache import EmbeddingCacheEntry
+
+
+class TestLRUCache:
+    """Tests for the in-process LRU tier."""
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")          # "b" is now the least recently used
+        cache.put("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+        assert len(cache) == 2
+
+    def test_clear(self):
+        cache = LRUCache()
+        cache.put("a", 1)
+        cache.clear()
+        assert cache.get("a") is None
+
+
+class TestEmbeddingCache:
+    """Tests for the two-tier content-addressed embedding cache."""
+
+    @pytest.fixture
+    def session_factory(self):
+        engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        EmbeddingCacheEntry.__table__.create(bind=engine)
+        return sessionmaker(bind=engine)
+
+    def test_key_depends_on_model_task_and_text(self):
+        key = EmbeddingCache.make_key("m", "retrieval_document", "text")
+        assert key != EmbeddingCache.make_key("m2", "retrieval_document", "text")
+        assert key != EmbeddingCache.make_key("m", "retrieval_query", "text")
+        assert key != EmbeddingCache.make_key("m", "retrieval_document", "text2")
+        assert len(key) == 64
+
+    def test_memory_hit_and_miss_counters(self):
+        cache = EmbeddingCache(session_factory=None)
+        assert cache.get("m", "t", "hello") is None
+        cache.put("m", "t", "hello", [0.1, 0.2])
+
+        assert cache.get("m", "t", "hello") == [0.1, 0.2]
+        stats = cache.stats()
+        assert stats["misses"] == 1
+        assert stats["memory_hits"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_persistent_tier_survives_memory_eviction(self, session_factory):
+        cache = EmbeddingCache(maxsize=1, session_factory=session_factory)
+        cache.put("m", "t", "first", [1.0, 2.0])
+        cache.put("m", "t", "second", [3.0, 4.0])   # evicts "first" from memory
+
+        assert cache.get("m", "t", "first") == [1.0, 2.0]
+        assert cache.stats()["db_hits"] == 1
+
+        # Promoted back to the memory tier
+        assert cache.get("m", "t", "first") == [1.0, 2.0]
+        assert cache.stats()["memory_hits"] == 1
+
+    def test_duplicate_persistent_write_is_ignored(self, session_factory):
+        cache = EmbeddingCache(session_factory=session_factory)
+        cache.put("m", "t", "same", [1.0])
+        cache.put("m", "t", "same", [1.0])
+
+        db = session_factory()
+        assert db.query(EmbeddingCacheEntry).count() == 1
+        db.close()
+
+    def test_get_many_and_put_many(self, session_factory):
+        cache = EmbeddingCache(maxsize=1, session_factory=session_factory)
+        cache.put_many("m", "t", [("a", [1.0]), ("b", [2.0])])   # "a" evicted from memory
+
+        assert cache.get_many("m", "t", ["a", "b", "c", "a"]) == [[1.0], [2.0], None, [1.0]]
+        stats = cache.stats()
+        assert (stats["memory_hits"], stats["db_hits"], stats["misses"]) == (1, 2, 1)
+
+        # Already stored entries are left alone
+        cache.put_many("m", "t", [("a", [1.0])])
+        db = session_factory()
+        assert db.query(EmbeddingCacheEntry).count() == 2
+        db.close()
+
+    def test_database_errors_fall_back_to_miss(self):
+        session = MagicMock()
+        session.get.side_effect = RuntimeError("db down")
+
+        cache = EmbeddingCache(session_factory=lambda: session)
+        assert cache.get("m", "t", "text") is None
+        assert cache.stats()["misses"] == 1
+
+
+class TestGenerateEmbeddingCaching:
+    """Tests that generate_embedding only calls the API on a cache miss."""
+
+    def test_repeated_text_calls_api_once(self, mock_embedding):
+        with patch('google.generativeai.embed_content', return_value={'embedding': mock_embedding}) as mock_embed:
+            from src.utils import generate_embedding
+
+            first = generate_embedding("Paid 100 to Amazon")
+            second = generate_embedding("Paid 100 to Amazon")
+
+            assert first == second == mock_embedding
+            assert mock_embed.call_count == 1
+
+    def test_task_type_is_part_of_the_key(self, mock_embedding):
+        with patch('google.generativeai.embed_content', return_value={'embedding': mock_embedding}) as mock_embed:
+            from src.utils import generate_embedding
+
+            generate_embedding("food", task_type="retrieval_document")
+            generate_embedding("food", task_type="retrieval_query")
+
+            assert mock_embed.call_count == 2
+
+    def test_batch_embeds_only_unique_misses(self, mock_embedding):
+        def embed(model, content, task_type):
+            # A list of texts gets a list of vectors back
+            return {"embedding": mock_embedding if isinstance(content, str) else [mock_embedding for _ in content]}
+
+        with patch('google.generativeai.embed_content', side_effect=embed) as mock_embed, \
+                patch('src.utils.EMBEDDING_BATCH_SIZE', 2):
+            from src.utils import generate_embedding, generate_embeddings
+
+            generate_embedding("cached")
+            vectors = generate_embeddings(["cached", "x", "y", "x", "z"])
+
+        assert vectors == [mock_embedding] * 5
+        # 1 single call, then x, y, z in batches of 2
+        assert [call.kwargs["content"] for call in mock_embed.call_args_list] == ["cached", ["x", "y"], ["z"]]
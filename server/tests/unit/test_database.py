@@ -105,3 +105,63 @@ class TestDatabaseDependency:
             # In SQLAlchemy, closed sessions have specific behavior
             assert True  # If we get here without error, cleanup worked
 
+
+    def test_get_async_db_yields_async_session(self):
+        """Test that get_async_db yields an AsyncSession and closes it afterwards."""
+        import asyncio
+        from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        factory = async_sessionmaker(engine)
+
+        async def run():
+            with patch('src.dependencies.AsyncSessionLocal', factory):
+                from src.dependencies import get_async_db
+
+                db_generator = get_async_db()
+                db = await db_generator.__anext__()
+                assert isinstance(db, AsyncSession)
+                assert (await db.execute(text("SELECT 1"))).scalar() == 1
+                await db_generator.aclose()
+            await engine.dispose()
+
+        asyncio.run(run())
+
+
+class TestAsyncEngineConfig:
+    """Tests for the async engine URL mapping and pool settings."""
+
+    def test_postgres_url_uses_asyncpg(self):
+        from src.database import async_database_url
+
+        url = async_database_url("postgresql://user:pw@localhost/expenses")
+        assert url.drivername == "postgresql+asyncpg"
+        assert url.database == "expenses"
+
+    def test_psycopg2_url_and_sslmode_are_mapped(self):
+        from src.database import async_database_url
+
+        url = async_database_url("postgresql+psycopg2://user:pw@db/expenses?sslmode=require")
+        assert url.drivername == "postgresql+asyncpg"
+        assert dict(url.query) == {"ssl": "require"}
+
+    def test_sqlite_url_uses_aiosqlite(self):
+        from src.database import async_database_url
+
+        assert async_database_url("sqlite:///test.db").drivername == "sqlite+aiosqlite"
+
+    def test_pool_settings(self, monkeypatch):
+        import src.database as db_module
+
+        monkeypatch.setattr(db_module, "DB_POOL_SIZE", 20)
+        monkeypatch.setattr(db_module, "DB_MAX_OVERFLOW", 5)
+        monkeypatch.setattr(db_module, "DB_POOL_PRE_PING", False)
+        monkeypatch.setattr(db_module, "DB_POOL_RECYCLE", 600)
+        options = db_module.engine_options("postgresql://user:pw@localhost/expenses")
+
+        assert options == {"pool_size": 20, "max_overflow": 5, "pool_pre_ping": False, "pool_recycle": 600}
+
+    def test_sqlite_keeps_default_pool(self):
+        from src.database import engine_options
+
+        assert engine_options("sqlite:///:memory:") == {}
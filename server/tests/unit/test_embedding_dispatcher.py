@@ -0,0 +1,140 @@
+"""
+Unit tests for micro-batched embedding calls (src/embedding_dispatcher.py).
+"""
+import asyncio
+import threading
+from unittest.mock import patch
+
+from src.embedding_dispatcher import EmbeddingDispatcher
+
+
+class RecordingEmbedder:
+    """embed_batch stand-in that records every batch and returns [len(text)] per text."""
+
+    def __init__(self, error=None):
+        self.batches = []
+        self.error = error
+        self._lock = threading.Lock()
+
+    def __call__(self, texts, task_type):
+        with self._lock:
+            self.batches.append((list(texts), task_type))
+        if self.error:
+            raise self.error
+        return [[float(len(text))] for text in texts]
+
+
+def embed_concurrently(dispatcher, texts, task_type="retrieval_document"):
+    async def run():
+        return await asyncio.gather(*(dispatcher.embed(text, task_type) for text in texts))
+    return asyncio.run(run())
+
+
+class TestEmbeddingDispatcher:
+    """Concurrent callers share batched calls and each get their own vector."""
+
+    def test_concurrent_callers_share_one_call(self):
+        embedder = RecordingEmbedder()
+        dispatcher = EmbeddingDispatcher(embedder, max_batch_size=100, flush_window=0.05)
+        texts = [f"text {i:02d}" + "x" * i for i in range(20)]
+
+        vectors = embed_concurrently(dispatcher, texts)
+
+        assert vectors == [[float(len(text))] for text in texts]
+        assert len(embedder.batches) == 1
+        assert sorted(embedder.batches[0][0]) == sorted(texts)
+        stats = dispatcher.stats()
+        assert (stats["requests"], stats["batches"], stats["texts_sent"]) == (20, 1, 20)
+        assert stats["fill_ratio"] == 0.2
+
+    def test_full_batch_is_sent_before_the_window_ends(self):
+        embedder = RecordingEmbedder()
+        # A window far longer than the test: only full batches can finish it in time
+        dispatcher = EmbeddingDispatcher(embedder, max_batch_size=4, flush_window=30)
+
+        embed_concurrently(dispatcher, [f"t{i}" for i in range(8)])
+
+        assert [len(texts) for texts, _ in embedder.batches] == [4, 4]
+        assert dispatcher.stats()["full_flushes"] == 2
+        assert dispatcher.stats()["fill_ratio"] == 1.0
+
+    def test_identical_texts_are_sent_once(self):
+        embedder = RecordingEmbedder()
+        dispatcher = EmbeddingDispatcher(embedder, max_batch_size=10, flush_window=0.05)
+
+        vectors = embed_concurrently(dispatcher, ["coffee"] * 5)
+
+        assert vectors == [[6.0]] * 5
+        assert embedder.batches == [(["coffee"], "retrieval_document")]
+
+    def test_task_types_are_batched_separately(self):
+        embedder = RecordingEmbedder()
+        dispatcher = EmbeddingDispatcher(embedder, max_batch_size=2, flush_window=30)
+
+        async def run():
+            await asyncio.gather(*(dispatcher.embed(text, task_type) for text, task_type in [
+                ("a", "retrieval_query"), ("b", "retrieval_document"),
+                ("c", "retrieval_query"), ("d", "retrieval_document"),
+            ]))
+        asyncio.run(run())
+
+        assert sorted((task_type, sorted(texts)) for texts, task_type in embedder.batches) == [
+            ("retrieval_document", ["b", "d"]), ("retrieval_query", ["a", "c"])
+        ]
+
+    def test_errors_reach_every_caller(self):
+        dispatcher = EmbeddingDispatcher(RecordingEmbedder(error=RuntimeError("quota")), max_batch_size=3, flush_window=30)
+
+        async def run():
+            return await asyncio.gather(*(dispatcher.embed(text, "retrieval_document") for text in "abc"),
+                                        return_exceptions=True)
+
+        assert [str(result) for result in asyncio.run(run())] == ["quota"] * 3
+        assert dispatcher.stats()["errors"] == 1
+
+    def test_cancelled_callers_are_not_sent(self):
+        embedder = RecordingEmbedder()
+        dispatcher = EmbeddingDispatcher(embedder, max_batch_size=100, flush_window=0.05)
+
+        async def run():
+            abandoned = asyncio.create_task(dispatcher.embed("abandoned", "retrieval_query"))
+            await asyncio.sleep(0)
+            abandoned.cancel()
+            await asyncio.sleep(0.1)
+
+        asyncio.run(run())
+        assert embedder.batches == []
+
+    def test_zero_window_sends_each_text_alone(self):
+        embedder = RecordingEmbedder()
+        dispatcher = EmbeddingDispatcher(embedder, max_batch_size=100, flush_window=0)
+
+        assert embed_concurrently(dispatcher, ["solo"]) == [[4.0]]
+        assert embedder.batches == [(["solo"], "retrieval_document")]
+
+
+class TestGenerateEmbeddingBatching:
+    """generate_embedding_async goes through the shared dispatcher after the cache."""
+
+    def test_batches_are_not_limited_by_the_blocking_pool(self, mock_embedding):
+        from src.utils import BLOCKING_POOL_SIZE, embedding_dispatcher, generate_embedding, generate_embedding_async
+
+        def embed(model, content, task_type):
+            return {"embedding": mock_embedding if isinstance(content, str) else [mock_embedding for _ in content]}
+
+        texts = [f"Paid {i} to Zomato" for i in range(BLOCKING_POOL_SIZE * 3)]
+
+        async def run():
+            return await asyncio.gather(*(generate_embedding_async(text) for text in texts))
+
+        with patch("google.generativeai.embed_content", side_effect=embed) as mock_embed, \
+                patch.object(embedding_dispatcher, "flush_window", 0.2):
+            vectors = asyncio.run(run())
+
+            # Now cached: no further call
+            generate_embedding("Paid 3 to Zomato")
+
+        assert vectors == [mock_embedding] * len(texts)
+        # Waiting callers hold no pool thread, so one call carries more texts than the pool has threads
+        assert mock_embed.call_count == 1
+        assert len(mock_embed.call_args.kwargs["content"]) == len(texts)
@@ -0,0 +1,145 @@
+"""
+Unit tests for the events router.
+"""
+from datetime import date
+
+import pytest
+from sqlalchemy import event as sa_event
+
+from src.models.event import Event
+from src.models.transaction import Transaction
+
+
+@pytest.fixture
+def trip(api_db_session):
+    trip = Event(event_name="Goa trip", event_notes="Dec 2025")
+    other = Event(event_name="Other")
+    api_db_session.add_all([trip, other])
+    api_db_session.flush()
+    api_db_session.add_all([
+        Transaction(id=i, txn_type="DEBIT", amount=float(i * 100), payee=f"Payee {i}", category="Travel",
+                    transaction_date=date(2025, 12, i), source_app="Google Pay")
+        for i in range(1, 6)
+    ])
+    api_db_session.commit()
+    return trip, other
+
+
+def event_ids(db):
+    db.expire_all()
+    return {txn.id: txn.event_id for txn in db.query(Transaction).all()}
+
+
+class TestAddRemoveTransactions:
+    """Tests for set-based add_transactions / remove_transactions."""
+
+    def test_add_transactions_in_one_update(self, client, api_db_session, api_async_engine, trip):
+        trip_event, _ = trip
+        statements = []
+        engine = api_async_engine.sync_engine
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        sa_event.listen(engine, "before_cursor_execute", listener)
+        try:
+            response = client.post("/events/add_transactions", json={"event_id": trip_event.id, "txn_ids": [1, 2, 3]})
+        finally:
+            sa_event.remove(engine, "before_cursor_execute", listener)
+
+        assert response.json()["status"] == "success"
+        assert response.json()["updated"] == 3
+        assert sum(s.lstrip().upper().startswith("UPDATE") for s in statements) == 1
+        assert event_ids(api_db_session) == {1: trip_event.id, 2: trip_event.id, 3: trip_event.id, 4: None, 5: None}
+
+    def test_missing_ids_are_reported_and_nothing_is_written(self, client, api_db_session, trip):
+        trip_event, _ = trip
+        response = client.post("/events/add_transactions", json={"event_id": trip_event.id, "txn_ids": [1, 42, 2, 77]})
+
+        body = response.json()
+        assert body["status"] == "error"
+        assert body["missing_ids"] == [42, 77]
+        assert all(event_id is None for event_id in event_ids(api_db_session).values())
+
+    def test_unknown_event(self, client, trip):
+        response = client.post("/events/add_transactions", json={"event_id": 999, "txn_ids": [1]})
+        assert response.json() == {"status": "error", "message": "Event not found"}
+
+    def test_remove_only_detaches_transactions_of_this_event(self, client, api_db_session, trip):
+        trip_event, other_event = trip
+        client.post("/events/add_transactions", json={"event_id": trip_event.id, "txn_ids": [1, 2]})
+        client.post("/events/add_transactions", json={"event_id": other_event.id, "txn_ids": [3]})
+
+        response = client.post("/events/remove_transactions", json={"event_id": trip_event.id, "txn_ids": [1, 3]})
+
+        assert response.json()["status"] == "success"
+        assert response.json()["updated"] == 1
+        ids = event_ids(api_db_session)
+        assert ids[1] is None
+        assert ids[2] == trip_event.id
+        assert ids[3] == other_event.id
+
+    def test_remove_with_missing_ids(self, client, api_db_session, trip):
+        trip_event, _ = trip
+        client.post("/events/add_transactions", json={"event_id": trip_event.id, "txn_ids": [1]})
+
+        response = client.post("/events/remove_transactions", json={"event_id": trip_event.id, "txn_ids": [1, 50]})
+
+        assert response.json()["missing_ids"] == [50]
+        assert event_ids(api_db_session)[1] == trip_event.id
+
+
+class TestGetEvent:
+    """Tests for event detail with eager-loaded transactions and aggregates."""
+
+    @pytest.fixture
+    def settled_trip(self, api_db_session, trip):
+        from src.models.split import Split
+
+        trip_event, other_event = trip
+        for txn_id in (1, 2, 3):
+            api_db_session.get(Transaction, txn_id).event_id = trip_event.id
+        api_db_session.get(Transaction, 3).txn_type = "CREDIT"
+        api_db_session.get(Transaction, 4).event_id = other_event.id
+        api_db_session.add_all([
+            Split(transaction_id=1, payee="Asha", amount=30.0, is_settled=False),
+            Split(transaction_id=1, payee="Ravi", amount=20.0, is_settled=True),
+            Split(transaction_id=2, payee="Asha", amount=50.0, is_settled=False),
+            Split(transaction_id=2, payee="Ravi", amount=40.0, is_settled=None),
+            Split(transaction_id=4, payee="Asha", amount=999.0, is_settled=False),
+        ])
+        api_db_session.commit()
+        return trip_event
+
+    def test_event_detail_includes_transactions_splits_and_summary(self, client, settled_trip):
+        response = client.get(f"/events/{settled_trip.id}")
+
+        assert response.status_code == 200
+        body = response.json()
+        assert sorted(t["id"] for t in body["transactions"]) == [1, 2, 3]
+        txn_1 = next(t for t in body["transactions"] if t["id"] == 1)
+        assert sorted(s["payee"] for s in txn_1["splits"]) == ["Asha", "Ravi"]
+
+        summary = body["summary"]
+        assert summary["transaction_count"] == 3
+        assert summary["total_debit"] == 300.0
+        assert summary["total_credit"] == 300.0
+        assert summary["settled_amount"] == 20.0
+        assert summary["settled_count"] == 1
+        assert summary["unsettled_amount"] == 120.0
+        assert summary["unsettled_count"] == 3
+        assert summary["outstanding_by_payee"] == [
+            {"payee": "Asha", "amount": 80.0, "split_count": 2},
+            {"payee": "Ravi", "amount": 40.0, "split_count": 1},
+        ]
+
+    def test_event_detail_uses_bounded_number_of_queries(self, client, api_async_engine, settled_trip):
+        event_id = settled_trip.id
+        statements = []
+        engine = api_async_engine.sync_engine
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        sa_event.listen(engine, "before_cursor_execute", listener)
+        try:
+            client.get(f"/events/{event_id}")
+        finally:
+            sa_event.remove(engine, "before_cursor_execute", listener)
+
+        # event + transactions + splits + 2 aggregate queries, independent of the number of rows
+        assert len(statements) <= 5
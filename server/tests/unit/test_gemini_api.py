@@ -140,7 +140,7 @@ class TestGenerateSQL:
             from src.utils import generate_sql
 
             # Run the function
-            result = generate_sql("Show transactions", 10, 1)
+            result = generate_sql("Show transactions")
 
             # Assertions
             assert result == expected_clean_sql
@@ -154,6 +154,103 @@ class TestGenerateSQL:
         with patch('google.generativeai.GenerativeModel', return_value=mock_model):
             from src.utils import generate_sql
 
-            result = generate_sql("Show transactions", 10, 1)
+            result = generate_sql("Show transactions")
 
             assert result is None
+
+
+class TestGenerateSQLCache:
+    """Tests for the generated SQL cache."""
+
+    PAGINATED_SQL = "SELECT * FROM transactions ORDER BY amount DESC LIMIT :limit OFFSET :offset"
+
+    def mock_model(self, sql):
+        mock_response = MagicMock()
+        mock_response.text = sql
+        mock_model = MagicMock()
+        mock_model.generate_content.return_value = mock_response
+        return mock_model
+
+    def test_same_prompt_is_served_from_cache(self):
+        """Test that repeated (normalized) prompts don't call the LLM again."""
+        mock_model = self.mock_model(self.PAGINATED_SQL)
+
+        with patch('google.generativeai.GenerativeModel', return_value=mock_model):
+            from src.utils import generate_sql
+
+            first = generate_sql("Highest amount this week")
+            second = generate_sql("  highest   amount this WEEK? ")
+
+            assert first == second == self.PAGINATED_SQL
+            assert mock_model.generate_content.call_count == 1
+
+    def test_pagination_is_not_baked_into_prompt(self):
+        """Test that the system prompt doesn't contain page/limit values."""
+        mock_model = self.mock_model(self.PAGINATED_SQL)
+
+        with patch('google.generativeai.GenerativeModel', return_value=mock_model):
+            from src.utils import generate_sql
+
+            generate_sql("food")
+            sent_prompt = mock_model.generate_content.call_args[0][0]
+
+            assert "The user wants page" not in sent_prompt
+            assert "LIMIT :limit OFFSET :offset" in sent_prompt
+
+    def test_sql_without_bind_pagination_is_not_cached(self):
+        """Test that SQL with hard-coded pagination is never reused."""
+        mock_model = self.mock_model("SELECT * FROM transactions LIMIT 10")
+
+        with patch('google.generativeai.GenerativeModel', return_value=mock_model):
+            from src.utils import generate_sql
+
+            generate_sql("food")
+            generate_sql("food")
+
+            assert mock_model.generate_content.call_count == 2
+
+    def test_cache_invalidated_on_date_rollover(self):
+        """Test that relative date prompts are regenerated the next day."""
+        mock_model = self.mock_model(self.PAGINATED_SQL)
+
+        with patch('google.generativeai.GenerativeModel', return_value=mock_model), \
+                patch('src.utils.date') as mock_date:
+            from src.utils import generate_sql
+            from src.cache import sql_cache
+
+            mock_date.today.return_value = date(2026, 1, 31)
+            generate_sql("food last month")
+            generate_sql("food last month")
+
+            mock_date.today.return_value = date(2026, 2, 1)
+            generate_sql("food last month")
+
+            assert mock_model.generate_content.call_count == 2
+            assert "2026-02-01" in mock_model.generate_content.call_args[0][0]
+            assert sql_cache.stats()["invalidations"] == 1
+
+    def test_prompt_uses_indexable_vector_distance(self):
+        """Test that semantic search is steered towards the HNSW-indexed halfvec expression."""
+        mock_model = self.mock_model(self.PAGINATED_SQL)
+
+        with patch('google.generativeai.GenerativeModel', return_value=mock_model):
+            from src.utils import generate_sql, VECTOR_DISTANCE_SQL
+
+            generate_sql("expenses similar to gym")
+            sent_prompt = mock_model.generate_content.call_args[0][0]
+
+            assert f"ORDER BY {VECTOR_DISTANCE_SQL}" in sent_prompt
+            assert "ORDER BY embedding <-> :query_vector" not in sent_prompt
+
+    def test_prompt_asks_for_ids_only(self):
+        """Test that generated SQL selects ids only, so embeddings are never transferred."""
+        mock_model = self.mock_model(self.PAGINATED_SQL)
+
+        with patch('google.generativeai.GenerativeModel', return_value=mock_model):
+            from src.utils import generate_sql
+
+            generate_sql("food")
+            sent_prompt = mock_model.generate_content.call_args[0][0]
+
+            assert "SELECT id" in sent_prompt
+            assert "SELECT *" not in sent_prompt
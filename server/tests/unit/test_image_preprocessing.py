@@ -0,0 +1,158 @@
+"""
+Unit tests for receipt image preprocessing.
+"""
+import io
+from unittest.mock import MagicMock, patch
+
+from PIL import Image
+
+from src.image_preprocessing import detect_mime_type, preprocess_receipt_image, receipt_image_hashes, phash_bands, \
+    phash_distance
+
+
+def encode(img, fmt, **kwargs):
+    out = io.BytesIO()
+    img.save(out, format=fmt, **kwargs)
+    return out.getvalue()
+
+
+def receipt(size=(1200, 2600), mode="RGB", background="white"):
+    """A white image with a block of 'text' in the middle."""
+    img = Image.new(mode, size, background)
+    img.paste(Image.new(mode, (size[0] // 2, size[1] // 2), "black"), (size[0] // 4, size[1] // 4))
+    return img
+
+
+class TestPreprocessReceiptImage:
+    """Tests for preprocess_receipt_image."""
+
+    def test_png_is_reencoded_as_smaller_jpeg(self):
+        raw = encode(receipt(), "PNG")
+
+        processed, mime_type = preprocess_receipt_image(raw)
+
+        assert mime_type == "image/jpeg"
+        assert Image.open(io.BytesIO(processed)).format == "JPEG"
+        assert len(processed) < len(raw)
+
+    def test_large_image_is_downscaled(self):
+        noise = Image.effect_noise((4000, 3000), 64).convert("RGB")
+        processed, _ = preprocess_receipt_image(encode(noise, "JPEG"), max_side=1536)
+
+        assert max(Image.open(io.BytesIO(processed)).size) == 1536
+
+    def test_uniform_border_is_trimmed(self):
+        processed, _ = preprocess_receipt_image(encode(receipt(size=(800, 1600)), "PNG"))
+
+        width, height = Image.open(io.BytesIO(processed)).size
+        # Black block is 400x800, plus a few pixels of padding
+        assert width < 450 and height < 850
+
+    def test_exif_metadata_is_stripped_and_orientation_applied(self):
+        img = Image.effect_noise((300, 200), 64).convert("RGB")
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotate 90 CW
+        exif[0x010F] = "PhoneMaker"
+        raw = encode(img, "JPEG", exif=exif)
+
+        processed, _ = preprocess_receipt_image(raw)
+
+        result = Image.open(io.BytesIO(processed))
+        assert result.size == (200, 300)
+        assert not result.getexif()
+
+    def test_transparency_is_flattened(self):
+        img = Image.new("RGBA", (100, 100), (0, 0, 0, 0))
+        processed, mime_type = preprocess_receipt_image(encode(img, "PNG"))
+
+        result = Image.open(io.BytesIO(processed))
+        assert mime_type == "image/jpeg"
+        assert result.mode == "RGB"
+        assert result.getpixel((50, 50)) == (255, 255, 255)
+
+    def test_undecodable_bytes_pass_through(self):
+        raw = b"\x89PNG\r\n\x1a\ntruncated"
+        assert preprocess_receipt_image(raw) == (raw, "image/png")
+
+
+class TestDetectMimeType:
+    """Tests for signature based MIME detection."""
+
+    def test_known_signatures(self):
+        assert detect_mime_type(b"\xff\xd8\xff\xe0rest") == "image/jpeg"
+        assert detect_mime_type(b"\x89PNG\r\n\x1a\nrest") == "image/png"
+        assert detect_mime_type(b"RIFF\x00\x00\x00\x00WEBP") == "image/webp"
+        assert detect_mime_type(b"\x00\x00\x00\x18ftypheic") == "image/heic"
+
+    def test_unknown_defaults_to_jpeg(self):
+        assert detect_mime_type(b"fake_image_bytes") == "image/jpeg"
+
+
+def photo():
+    """Smooth gradient with a few shapes, like a photographed paper receipt."""
+    from PIL import ImageDraw
+
+    img = Image.radial_gradient("L").resize((600, 900)).convert("RGB")
+    draw = ImageDraw.Draw(img)
+    for i in range(6):
+        draw.rectangle((50 + i * 80, 100 + i * 110, 120 + i * 80, 180 + i * 110), fill=(40 * i, 200 - 30 * i, 90))
+    return img
+
+
+class TestReceiptImageHashes:
+    """Tests for the content hashes used to skip re-uploads."""
+
+    def test_recompressed_copy_is_close(self):
+        img = photo()
+        sha_png, phash_png = receipt_image_hashes(encode(img, "PNG"))
+        sha_jpg, phash_jpg = receipt_image_hashes(encode(img, "JPEG", quality=70))
+
+        assert sha_png != sha_jpg
+        assert len(phash_png) == 64
+        assert phash_distance(phash_png, phash_jpg) <= 4
+
+    def test_different_image_is_far(self):
+        _, a = receipt_image_hashes(encode(photo(), "PNG"))
+        _, b = receipt_image_hashes(encode(Image.effect_noise((600, 600), 64).convert("RGB"), "PNG"))
+
+        assert phash_distance(a, b) > 64
+
+    def test_undecodable_bytes_only_get_sha256(self):
+        sha256, phash = receipt_image_hashes(b"fake_image_bytes")
+
+        assert len(sha256) == 64
+        assert phash is None
+
+    def test_bands_split_the_hash(self):
+        phash = "0123456789abcdef" * 4
+        assert phash_bands(phash) == ["0123456789abcdef"] * 4
+        assert phash_distance("f" * 64, "0" * 64) == 256
+
+
+class TestExtractUsesPreprocessing:
+    """extract_data_from_image sends the preprocessed bytes with the right MIME type."""
+
+    def test_sends_preprocessed_jpeg(self):
+        raw = encode(receipt(), "PNG")
+        mock_model = MagicMock()
+        mock_model.generate_content.return_value.text = '{"amount": 1.0}'
+
+        with patch("src.utils.genai.GenerativeModel", return_value=mock_model):
+            from src.utils import extract_data_from_image
+            extract_data_from_image(raw)
+
+        image_part = mock_model.generate_content.call_args[0][0][1]
+        assert image_part["mime_type"] == "image/jpeg"
+        assert len(image_part["data"]) < len(raw)
+
+    def test_preprocess_can_be_disabled(self):
+        raw = encode(receipt(size=(50, 50)), "PNG")
+        mock_model = MagicMock()
+        mock_model.generate_content.return_value.text = '{"amount": 1.0}'
+
+        with patch("src.utils.genai.GenerativeModel", return_value=mock_model):
+            from src.utils import extract_data_from_image
+            extract_data_from_image(raw, preprocess=False)
+
+        image_part = mock_model.generate_content.call_args[0][0][1]
+        assert image_part == {"mime_type": "image/png", "data": raw}
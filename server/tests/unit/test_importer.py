@@ -0,0 +1,137 @@
+"""
+Unit tests for bulk transaction import (src/importer.py) and POST /transactions/import.
+"""
+import asyncio
+import json
+from datetime import date
+from unittest.mock import patch
+
+import pytest
+
+from src.importer import import_transactions, iter_records, validate_row
+from src.models.spending_summary import SpendingSummary
+from src.models.transaction import Transaction
+
+
+def fake_embed(model, content, task_type):
+    """batchEmbedContents stand-in: one small vector per text."""
+    return {"embedding": [[float(len(text))] * 3 for text in content]}
+
+
+def csv_statement(rows):
+    header = "txn_type,amount,payee,category,transaction_date,upi_transaction_id,bank_account\n"
+    return header + "".join(",".join(map(str, row)) + "\n" for row in rows)
+
+
+class TestValidateRow:
+    """Rows are normalised or rejected one at a time."""
+
+    def test_normalises_types_and_dates(self):
+        row = validate_row({"txn_type": "debit", "amount": "1,250.50", "payee": " Zomato ",
+                            "transaction_date": "15-01-2026", "notes": ""})
+
+        assert row["txn_type"] == "DEBIT"
+        assert row["amount"] == 1250.5
+        assert row["payee"] == "Zomato"
+        assert row["transaction_date"] == date(2026, 1, 15)
+        assert row["notes"] is None
+
+    @pytest.mark.parametrize("record, message", [
+        ({"txn_type": "REFUND", "amount": "1"}, "txn_type"),
+        ({"txn_type": "DEBIT", "amount": "abc"}, "amount"),
+        ({"txn_type": "DEBIT", "amount": "1", "transaction_date": "Jan 5"}, "transaction_date"),
+        (["not", "an", "object"], "object"),
+    ])
+    def test_rejects_invalid_rows(self, record, message):
+        with pytest.raises(ValueError, match=message):
+            validate_row(record)
+
+    def test_jsonl_parse_errors_keep_line_numbers(self):
+        records = list(iter_records(['{"a": 1}\n', "\n", "{broken\n"], "jsonl"))
+        assert [line for line, _ in records] == [1, 3]
+        assert isinstance(records[1][1], ValueError)
+
+
+class TestImportEndpoint:
+    """POST /transactions/import streams, dedupes and batches."""
+
+    def test_csv_import_batches_embeddings_and_dedupes(self, client, api_db_session):
+        api_db_session.add(Transaction(txn_type="DEBIT", amount=1.0, payee="Old", upi_transaction_id="UPI-0"))
+        api_db_session.commit()
+
+        rows = [("DEBIT", 10 + i, f"Payee {i}", "Food", "2026-01-15", f"UPI-{i}", "SBI") for i in range(250)]
+        rows.append(("DEBIT", 99, "Repeat", "Food", "2026-01-15", "UPI-5", "SBI"))
+        rows.append(("SPEND", 1, "Bad", "Food", "2026-01-15", "UPI-X", "SBI"))
+
+        with patch("src.importer.IMPORT_BATCH_SIZE", 100), \
+                patch("src.utils.EMBEDDING_BATCH_SIZE", 100), \
+                patch("google.generativeai.embed_content", side_effect=fake_embed) as mock_embed:
+            response = client.post("/transactions/import", files={
+                "file": ("statement.csv", csv_statement(rows).encode(), "text/csv")
+            })
+
+        body = response.json()
+        assert body["status"] == "success"
+        assert body["rows_read"] == 252
+        assert body["imported"] == 249
+        assert body["skipped_duplicates"] == 2
+        assert body["invalid"] == 1
+        assert body["errors"] == [{"line": 253, "message": "txn_type must be DEBIT or CREDIT"}]
+        assert body["rows_per_second"] > 0
+
+        # Many texts per API call instead of one call per row
+        assert mock_embed.call_count <= 4
+        assert all(len(call.kwargs["content"]) > 1 for call in mock_embed.call_args_list)
+        assert api_db_session.query(Transaction).count() == 250
+
+    def test_jsonl_import_updates_summaries(self, client, api_db_session):
+        lines = [
+            {"txn_type": "DEBIT", "amount": 100, "payee": "Uber", "category": "Travel", "transaction_date": "2026-02-01"},
+            {"txn_type": "DEBIT", "amount": 50, "payee": "Uber", "category": "Travel", "transaction_date": "2026-02-01"},
+        ]
+        content = "\n".join(json.dumps(line) for line in lines).encode()
+
+        with patch("google.generativeai.embed_content", side_effect=fake_embed):
+            body = client.post("/transactions/import", params={"format": "ndjson"},
+                               files={"file": ("export.txt", content, "application/x-ndjson")}).json()
+
+        assert body["imported"] == 2
+        summary = api_db_session.query(SpendingSummary).filter_by(dimension="payee", value="Uber").one()
+        assert (summary.total, summary.txn_count) == (150.0, 2)
+
+    def test_imported_rows_can_be_viewed_in_an_event(self, client, api_db_session):
+        # Statements carry no category or source app
+        content = b"txn_type,amount,payee,transaction_date\nDEBIT,80,Blue Tokai,2026-01-15\n"
+        with patch("google.generativeai.embed_content", side_effect=fake_embed):
+            client.post("/transactions/import", files={"file": ("statement.csv", content, "text/csv")})
+        txn_id = api_db_session.query(Transaction.id).scalar()
+
+        event_id = client.post("/events/", json={"event_name": "Trip"}).json()["id"]
+        client.post("/events/add_transactions", json={"event_id": event_id, "txn_ids": [txn_id]})
+        response = client.get(f"/events/{event_id}")
+
+        assert response.status_code == 200
+        txn = response.json()["transactions"][0]
+        assert (txn["payee"], txn["category"], txn["source_app"]) == ("Blue Tokai", None, None)
+
+    def test_unknown_format_is_rejected(self, client):
+        response = client.post("/transactions/import", files={"file": ("statement.xlsx", b"", "application/octet-stream")})
+        assert response.status_code == 400
+
+
+class TestImportTransactions:
+    """The import function behind the endpoint and the CLI."""
+
+    def test_rerun_only_adds_missing_rows(self, api_db_session, api_session_factory):
+        statement = csv_statement([("CREDIT", 500, "Employer", "Salary", "01-03-2026", f"SAL-{i}", "HDFC") for i in range(3)])
+
+        async def run():
+            async with api_session_factory() as db:
+                return await import_transactions(db, statement.splitlines(keepends=True), "csv", batch_size=2)
+
+        with patch("google.generativeai.embed_content", side_effect=fake_embed):
+            first = asyncio.run(run())
+            second = asyncio.run(run())
+
+        assert first["imported"] == 3
+        assert second["imported"] == 0 and second["skipped_duplicates"] == 3
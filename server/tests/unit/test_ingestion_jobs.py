@@ -0,0 +1,242 @@
+"""
+Unit tests for the receipt ingestion job queue (src/worker.py) and GET /jobs/{id}.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from src.models.ingestion_job import IngestionJob
+from src.models.transaction import Transaction
+from src.worker import IngestionWorkerPool, claim_next_job
+from tests.unit.test_transactions_routes import receipt_data
+
+
+def upload(client, content=b"receipt-image", name="a.jpg"):
+    return client.post("/transactions/upload-receipt", files={"file": (name, content, "image/jpeg")})
+
+
+class TestUploadEnqueues:
+    """POST /transactions/upload-receipt stores the image and answers before extraction."""
+
+    def test_returns_202_with_job_id(self, client, api_db_session):
+        with patch("src.ingestion.extract_data_from_image") as mock_extract:
+            response = upload(client)
+
+        assert response.status_code == 202
+        assert response.json()["status"] == "queued"
+        mock_extract.assert_not_called()
+
+        job = api_db_session.get(IngestionJob, response.json()["job_id"])
+        assert job.status == "queued"
+        assert job.image == b"receipt-image"
+        assert job.filename == "a.jpg"
+        assert len(job.image_sha256) == 64
+
+    def test_known_image_is_skipped_without_job(self, client, api_db_session):
+        import hashlib
+
+        api_db_session.add(Transaction(txn_type="DEBIT", amount=1.0, payee="Old",
+                                       image_sha256=hashlib.sha256(b"receipt-image").hexdigest()))
+        api_db_session.commit()
+
+        response = upload(client)
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "skipped"
+        assert api_db_session.query(IngestionJob).count() == 0
+
+    def test_wait_processes_inline(self, client, api_db_session, mock_embedding):
+        with patch("src.ingestion.extract_data_from_image", return_value=receipt_data("701")), \
+                patch("src.ingestion.generate_rag_chunk_async", return_value=mock_embedding):
+            response = client.post("/transactions/upload-receipt?wait=true",
+                                   files={"file": ("a.jpg", b"inline", "image/jpeg")})
+
+        assert response.status_code == 200
+        assert response.json()["upi_transaction_id"] == "701"
+        assert api_db_session.query(IngestionJob).count() == 0
+
+
+class TestWorker:
+    """Claiming, processing and retrying queued jobs."""
+
+    @pytest.fixture
+    def pool(self, api_session_factory):
+        return IngestionWorkerPool(size=1, session_factory=api_session_factory, poll_interval=0.01)
+
+    def test_job_succeeds_and_reports_transaction(self, client, api_db_session, pool, mock_embedding):
+        job_id = upload(client).json()["job_id"]
+        assert client.get(f"/jobs/{job_id}").json()["status"] == "queued"
+
+        with patch("src.ingestion.extract_data_from_image", return_value=receipt_data("702")), \
+                patch("src.ingestion.generate_rag_chunk_async", return_value=mock_embedding):
+            asyncio.run(pool.drain())
+
+        body = client.get(f"/jobs/{job_id}").json()
+        assert body["status"] == "succeeded"
+        assert body["attempts"] == 1
+        assert body["transaction"]["upi_transaction_id"] == "702"
+        assert body["transaction_id"] == api_db_session.query(Transaction).one().id
+
+        # The stored image is released once the transaction exists
+        api_db_session.expire_all()
+        assert api_db_session.get(IngestionJob, job_id).image is None
+
+    def test_duplicate_upi_id_is_skipped(self, client, api_db_session, pool, mock_embedding):
+        api_db_session.add(Transaction(txn_type="DEBIT", amount=1.0, payee="Old", upi_transaction_id="703"))
+        api_db_session.commit()
+        job_id = upload(client).json()["job_id"]
+
+        with patch("src.ingestion.extract_data_from_image", return_value=receipt_data("703")), \
+                patch("src.ingestion.generate_rag_chunk_async", return_value=mock_embedding) as mock_chunk:
+            asyncio.run(pool.drain())
+
+        body = client.get(f"/jobs/{job_id}").json()
+        assert body["status"] == "skipped"
+        assert body["transaction"]["payee"] == "Old"
+        mock_chunk.assert_not_called()
+
+    def test_errors_are_retried_then_failed(self, client, pool):
+        job_id = upload(client).json()["job_id"]
+
+        with patch("src.ingestion.extract_data_from_image", side_effect=RuntimeError("model timeout")) as mock_extract, \
+                patch("src.worker.INGESTION_MAX_ATTEMPTS", 2):
+            asyncio.run(pool.drain())
+
+        body = client.get(f"/jobs/{job_id}").json()
+        assert body["status"] == "failed"
+        assert body["attempts"] == 2
+        assert "model timeout" in body["error"]
+        assert mock_extract.call_count == 2
+        assert pool.stats()["retried"] == 1 and pool.stats()["failed"] == 1
+
+    def test_unknown_job_is_404(self, client):
+        assert client.get("/jobs/999").status_code == 404
+
+
+class TestNoConnectionDuringModelCalls:
+    """Extraction and embedding run with no database transaction open."""
+
+    @pytest.fixture
+    def open_connections(self, api_async_engine):
+        from sqlalchemy import event as sa_event
+
+        pool = api_async_engine.sync_engine.pool
+        state = {"open": 0, "during_model_calls": []}
+
+        def checkout(*args):
+            state["open"] += 1
+
+        def checkin(*args):
+            state["open"] -= 1
+
+        sa_event.listen(pool, "checkout", checkout)
+        sa_event.listen(pool, "checkin", checkin)
+        yield state
+        sa_event.remove(pool, "checkout", checkout)
+        sa_event.remove(pool, "checkin", checkin)
+
+    def model_patches(self, state, mock_embedding, upi_id, target="src.ingestion"):
+        def extract(content):
+            state["during_model_calls"].append(state["open"])
+            return receipt_data(upi_id)
+
+        async def embed(data):
+            state["during_model_calls"].append(state["open"])
+            return mock_embedding
+
+        return patch(f"{target}.extract_data_from_image", side_effect=extract), \
+            patch(f"{target}.generate_rag_chunk_async", side_effect=embed)
+
+    def test_worker(self, client, api_session_factory, open_connections, mock_embedding):
+        upload(client)
+        extract, embed = self.model_patches(open_connections, mock_embedding, "801")
+        with extract, embed:
+            asyncio.run(IngestionWorkerPool(size=1, session_factory=api_session_factory).drain())
+
+        assert open_connections["during_model_calls"] == [0, 0]
+
+    def test_inline_upload(self, client, open_connections, mock_embedding):
+        extract, embed = self.model_patches(open_connections, mock_embedding, "802")
+        with extract, embed:
+            response = client.post("/transactions/upload-receipt?wait=true",
+                                   files={"file": ("a.jpg", b"inline", "image/jpeg")})
+
+        assert response.json()["upi_transaction_id"] == "802"
+        assert open_connections["during_model_calls"] == [0, 0]
+
+    def test_batch_upload(self, client, open_connections, mock_embedding):
+        extract, embed = self.model_patches(open_connections, mock_embedding, "803", target="src.routes.transactions")
+        with extract, embed:
+            response = client.post("/transactions/upload-receipts", files=[("files", ("a.jpg", b"one", "image/jpeg"))])
+
+        assert response.json()[0]["status"] == "success"
+        assert open_connections["during_model_calls"] == [0, 0]
+
+
+class TestClaim:
+    """Only queued jobs and abandoned running jobs are claimed."""
+
+    def test_claims_oldest_queued_and_stale_running(self, api_db_session, api_session_factory):
+        now = datetime.utcnow()
+        api_db_session.add_all([
+            IngestionJob(status="succeeded"),
+            IngestionJob(status="running", started_at=now, attempts=1),
+            IngestionJob(status="running", started_at=now - timedelta(hours=1), attempts=1),
+            IngestionJob(status="queued"),
+        ])
+        api_db_session.commit()
+
+        async def claim_all():
+            claimed = []
+            async with api_session_factory() as db:
+                while (job_id := await claim_next_job(db)) is not None:
+                    claimed.append(job_id)
+            return claimed
+
+        assert asyncio.run(claim_all()) == [3, 4]
+
+        api_db_session.expire_all()
+        stale = api_db_session.get(IngestionJob, 3)
+        assert stale.status == "running" and stale.attempts == 2
+
+
+class TestWorkerScaling:
+    """Jobs are spread over the pool, so throughput scales with the worker count."""
+
+    EXTRACT_DELAY = 0.2
+
+    def test_workers_process_jobs_concurrently(self, client, api_db_session, api_session_factory, mock_embedding):
+        import itertools
+        import threading
+        import time
+
+        for i in range(4):
+            upload(client, content=f"receipt-{i}".encode())
+
+        counter = itertools.count()
+        lock = threading.Lock()
+        in_flight, peak = 0, 0
+
+        def slow_extract(content):
+            nonlocal in_flight, peak
+            with lock:
+                in_flight += 1
+                peak = max(peak, in_flight)
+            time.sleep(self.EXTRACT_DELAY)
+            with lock:
+                in_flight -= 1
+            return receipt_data(f"scale-{next(counter)}")
+
+        pool = IngestionWorkerPool(size=4, session_factory=api_session_factory)
+        with patch("src.ingestion.extract_data_from_image", side_effect=slow_extract), \
+                patch("src.ingestion.generate_rag_chunk_async", return_value=mock_embedding):
+            start = time.perf_counter()
+            asyncio.run(pool.drain())
+            elapsed = time.perf_counter() - start
+
+        assert api_db_session.query(Transaction).count() == 4
+        assert peak > 1
+        # Serially this would take 4 x EXTRACT_DELAY
+        assert elapsed < 4 * self.EXTRACT_DELAY
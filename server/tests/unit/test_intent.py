@@ -0,0 +1,120 @@
+"""
+Unit tests for the local search fast path (src/intent.py) and its use in GET /transactions.
+"""
+from datetime import date
+from unittest.mock import patch
+
+import pytest
+
+from src.intent import SearchIntent, parse_prompt
+from src.models.transaction import Transaction
+
+TODAY = date(2026, 3, 18)  # a Wednesday
+PAYEES = {"zomato": ("Zomato",), "blue tokai": ("BLUE TOKAI", "Blue Tokai")}
+
+
+def parse(prompt):
+    return parse_prompt(prompt, PAYEES, today=TODAY)
+
+
+class TestParsePrompt:
+    """Prompts are answered locally only when every word is understood."""
+
+    def test_category_and_calendar_month(self):
+        assert parse("Show me food expenses last month") == SearchIntent(
+            category="Food", txn_type="DEBIT", start_date=date(2026, 2, 1), end_date=date(2026, 2, 28)
+        )
+
+    @pytest.mark.parametrize("phrase, start, end", [
+        ("today", TODAY, TODAY),
+        ("yesterday", date(2026, 3, 17), date(2026, 3, 17)),
+        ("this week", date(2026, 3, 16), TODAY),
+        ("last week", date(2026, 3, 9), date(2026, 3, 15)),
+        ("this month", date(2026, 3, 1), TODAY),
+        ("last year", date(2025, 1, 1), date(2025, 12, 31)),
+        ("past 30 days", date(2026, 2, 16), TODAY),
+        ("last 2 weeks", date(2026, 3, 4), TODAY),
+        ("last 1 month", date(2026, 2, 18), TODAY),
+    ])
+    def test_relative_dates(self, phrase, start, end):
+        intent = parse(f"transactions {phrase}")
+        assert (intent.start_date, intent.end_date) == (start, end)
+
+    def test_month_window_clamps_to_shorter_months(self):
+        intent = parse_prompt("last 1 month", {}, today=date(2026, 3, 31))
+        assert intent.start_date == date(2026, 2, 28)
+
+    def test_multi_word_payee_maps_to_stored_spellings(self):
+        intent = parse("paid to blue tokai this year")
+        assert intent.payees == ("BLUE TOKAI", "Blue Tokai") and intent.txn_type == "DEBIT"
+
+    def test_ordering_and_count(self):
+        assert parse("top 5 travel").order == "amount_desc" and parse("top 5 travel").count == 5
+        assert parse("most expensive shopping").order == "amount_desc"
+        assert parse("cheapest food").order == "amount_asc"
+        assert parse("oldest transactions").order == "oldest"
+
+    @pytest.mark.parametrize("prompt", [
+        "something like gym",           # unknown word
+        "food and travel",              # "and" is not understood
+        "food travel",                  # two categories
+        "highest lowest",               # conflicting order
+        "spent 500 on food",            # bare number
+        "paid to swiggy",               # payee not in the database
+        "this food",                    # "this" without a period
+        "last 999999999 days",          # date out of range
+        "last 99999 months",
+        "",
+    ])
+    def test_anything_else_falls_back(self, prompt):
+        assert parse(prompt) is None
+
+
+class TestFastPathEndpoint:
+    """GET /transactions?prompt=... skips generate_sql for recognised prompts."""
+
+    @pytest.fixture
+    def ids(self, api_db_session):
+        txns = [
+            Transaction(txn_type="DEBIT", amount=120.0, payee="Zomato", category="Food",
+                        transaction_date=date(2026, 1, 10), source_app="Google Pay"),
+            Transaction(txn_type="DEBIT", amount=450.0, payee="Zomato", category="food",
+                        transaction_date=date(2026, 1, 12), source_app="Google Pay"),
+            Transaction(txn_type="DEBIT", amount=900.0, payee="Uber", category="Travel",
+                        transaction_date=date(2026, 1, 11), source_app="Google Pay"),
+            Transaction(txn_type="CREDIT", amount=60.0, payee="Zomato", category="Food",
+                        transaction_date=date(2026, 1, 13), source_app="Google Pay"),
+        ]
+        api_db_session.add_all(txns)
+        api_db_session.commit()
+        return [txn.id for txn in txns]
+
+    def search(self, client, prompt, **params):
+        with patch("src.routes.transactions.generate_sql") as mock_sql, \
+                patch("src.routes.transactions.generate_embedding_async") as mock_embed:
+            response = client.get("/transactions/", params={"prompt": prompt, **params})
+        mock_sql.assert_not_called()
+        mock_embed.assert_not_called()
+        return [txn["id"] for txn in response.json()]
+
+    def test_category_filter_is_case_insensitive(self, client, ids):
+        assert self.search(client, "food") == [ids[3], ids[1], ids[0]]
+
+    def test_payee_type_and_amount_order(self, client, ids):
+        assert self.search(client, "highest amount paid to zomato") == [ids[1], ids[0]]
+
+    def test_top_n_caps_across_pages(self, client, ids):
+        assert self.search(client, "top 3", lim=2, page=1) == [ids[2], ids[1]]
+        assert self.search(client, "top 3", lim=2, page=2) == [ids[0]]
+
+    def test_fallback_uses_the_llm_and_hit_rate_is_reported(self, client, ids):
+        self.search(client, "food")
+        with patch("src.routes.transactions.generate_sql", return_value="SELECT id FROM transactions "
+                   "ORDER BY amount LIMIT :limit OFFSET :offset") as mock_sql, \
+                patch("src.routes.transactions.generate_embedding_async"):
+            response = client.get("/transactions/", params={"prompt": "dinner with friends"})
+
+        mock_sql.assert_called_once()
+        assert [txn["id"] for txn in response.json()][0] == ids[3]
+        stats = client.get("/metrics").json()["search_fast_path"]
+        assert (stats["hits"], stats["fallbacks"], stats["hit_rate"]) == (1, 1, 0.5)
@@ -0,0 +1,103 @@
+"""
+Unit tests for the queue-based application logger.
+"""
+import json
+import logging
+from logging.handlers import QueueHandler, RotatingFileHandler, WatchedFileHandler
+
+import pytest
+
+from src.logger import Logger
+
+
+@pytest.fixture
+def make_logger(tmp_path, request):
+    created = []
+
+    def factory(**kwargs):
+        instance = Logger(log_dir=tmp_path, name=f"test_logger_{request.node.name}_{len(created)}", **kwargs)
+        created.append(instance)
+        return instance
+
+    yield factory
+    for instance in created:
+        instance.stop()
+        for handler in list(instance.logger.handlers):
+            instance.logger.removeHandler(handler)
+            handler.close()
+
+
+class TestQueueLogging:
+    """Tests for QueueHandler/QueueListener mode."""
+
+    def test_queue_mode_only_attaches_queue_handler(self, make_logger):
+        instance = make_logger(use_queue=True)
+
+        assert [type(h) for h in instance.logger.handlers] == [type(instance.queue_handler)]
+        assert isinstance(instance.queue_handler, QueueHandler)
+
+    def test_records_reach_file_through_listener(self, make_logger, tmp_path):
+        instance = make_logger(use_queue=True)
+
+        instance.logger.info("hello from the queue")
+        instance.logger.debug("console only")
+        instance.stop()
+
+        content = (tmp_path / "app.log").read_text()
+        assert "hello from the queue" in content
+        assert "console only" not in content
+
+    def test_full_queue_drops_and_counts(self, make_logger):
+        instance = make_logger(use_queue=True, queue_size=2)
+        # Stop draining so the queue fills up
+        instance.stop()
+
+        for i in range(5):
+            instance.logger.info("message %d", i)
+
+        assert instance.stats() == {"queued": True, "pending": 2, "dropped": 3}
+
+    def test_direct_mode(self, make_logger):
+        instance = make_logger(use_queue=False)
+
+        assert instance.stats() == {"queued": False}
+        assert len(instance.logger.handlers) == 2
+
+
+class TestSharedLogFile:
+    """Tests for the multi-worker friendly file handler."""
+
+    def test_size_rotation_by_default(self, make_logger):
+        instance = make_logger(use_queue=False)
+
+        assert any(isinstance(h, RotatingFileHandler) for h in instance.logger.handlers)
+
+    def test_external_rotation_is_opt_in(self, make_logger):
+        instance = make_logger(use_queue=False, rotation="external")
+
+        assert any(isinstance(h, WatchedFileHandler) for h in instance.logger.handlers)
+        assert not any(isinstance(h, RotatingFileHandler) for h in instance.logger.handlers)
+
+    def test_workers_append_to_the_same_file(self, make_logger, tmp_path):
+        first = make_logger(use_queue=False, rotation="external")
+        second = make_logger(use_queue=False, rotation="external")
+
+        first.logger.info("from worker one")
+        second.logger.info("from worker two")
+
+        lines = (tmp_path / "app.log").read_text().splitlines()
+        assert len(lines) == 2
+        assert "from worker one" in lines[0] and "from worker two" in lines[1]
+
+
+class TestRequestLog:
+    """The request log holds bare JSON lines."""
+
+    def test_message_only_format(self, make_logger, tmp_path):
+        instance = make_logger(use_queue=False, fmt="%(message)s")
+
+        instance.logger.info(json.dumps({"event": "http_request", "status": 200}))
+        instance.logger.error(json.dumps({"event": "http_request", "status": 500}))
+
+        lines = (tmp_path / "app.log").read_text().splitlines()
+        assert [json.loads(line)["status"] for line in lines] == [200, 500]
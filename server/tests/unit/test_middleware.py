@@ -0,0 +1,110 @@
+"""
+Unit tests for the structured request logging middleware.
+"""
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.middleware import RequestLoggingMiddleware
+
+
+def run_request(app, path="/transactions/upload-receipt", method="POST", chunks=(b"",)):
+    """Drive a single HTTP request through an ASGI app, returning the messages it sent."""
+    scope = {"type": "http", "method": method, "path": path, "headers": []}
+    incoming = [{"type": "http.request", "body": c, "more_body": i < len(chunks) - 1} for i, c in enumerate(chunks)]
+    sent = []
+
+    async def receive():
+        return incoming.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent
+
+
+async def echo_app(scope, receive, send):
+    """Reads the body chunk by chunk and echoes its size back."""
+    received = []
+    while True:
+        message = await receive()
+        received.append(message["body"])
+        if not message.get("more_body"):
+            break
+    await send({"type": "http.response.start", "status": 201, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok:" + str(len(received)).encode()})
+
+
+def logged_records(log):
+    return [json.loads(call.args[0]) for call in log.info.call_args_list + log.error.call_args_list]
+
+
+class TestRequestLoggingMiddleware:
+    """Tests for RequestLoggingMiddleware."""
+
+    def test_logs_structured_line(self):
+        log = MagicMock()
+        app = RequestLoggingMiddleware(echo_app, log=log)
+
+        run_request(app, chunks=(b"a" * 1000, b"b" * 500))
+
+        [record] = logged_records(log)
+        assert datetime.fromisoformat(record["ts"]).utcoffset() == timedelta(0)
+        assert record["event"] == "http_request"
+        assert record["method"] == "POST"
+        assert record["path"] == "/transactions/upload-receipt"
+        assert record["status"] == 201
+        assert record["request_bytes"] == 1500
+        assert record["response_bytes"] == len(b"ok:2")
+        assert record["duration_ms"] >= 0
+
+    def test_body_is_streamed_not_buffered(self):
+        app = RequestLoggingMiddleware(echo_app, log=MagicMock())
+
+        sent = run_request(app, chunks=(b"x", b"y", b"z"))
+
+        # The route still sees three separate chunks
+        assert sent[-1]["body"] == b"ok:3"
+
+    def test_sampling_skips_successful_requests(self):
+        log = MagicMock()
+        app = RequestLoggingMiddleware(echo_app, sample_rate=0.0, log=log)
+
+        for _ in range(5):
+            run_request(app)
+
+        assert logged_records(log) == []
+
+    def test_errors_are_logged_even_when_sampled_out(self):
+        async def failing_app(scope, receive, send):
+            raise RuntimeError("boom")
+
+        log = MagicMock()
+        app = RequestLoggingMiddleware(failing_app, sample_rate=0.0, log=log)
+
+        with pytest.raises(RuntimeError):
+            run_request(app)
+
+        [record] = [json.loads(call.args[0]) for call in log.error.call_args_list]
+        assert record["status"] == 500
+
+    def test_other_paths_are_not_logged(self):
+        log = MagicMock()
+        app = RequestLoggingMiddleware(echo_app, log=log)
+
+        run_request(app, path="/metrics", method="GET")
+
+        assert logged_records(log) == []
+
+    def test_installed_on_app(self, client, caplog):
+        with caplog.at_level(logging.INFO, logger="FastAPI_Requests"):
+            client.get("/transactions/", params={"lim": 1})
+
+        records = [json.loads(r.getMessage()) for r in caplog.records if r.getMessage().startswith("{")]
+        assert records[-1]["path"] == "/transactions/"
+        assert records[-1]["status"] == 200
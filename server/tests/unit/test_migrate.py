@@ -0,0 +1,65 @@
+"""
+Unit tests for the versioned migration runner.
+"""
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from src.migrate import discover_migrations, run_migrations, pending_migrations, MIGRATIONS_DIR
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'migrate.db'}")
+
+
+class TestDiscoverMigrations:
+    """Tests for migration discovery."""
+
+    def test_repo_migrations_are_well_formed(self):
+        migrations = discover_migrations(MIGRATIONS_DIR)
+        versions = [version for version, _ in migrations]
+
+        assert versions, "No migrations found"
+        assert versions == sorted(versions)
+        assert versions[0] == "0001"
+
+    def test_ignores_badly_named_files(self, tmp_path):
+        (tmp_path / "0001_ok.sql").write_text("SELECT 1")
+        (tmp_path / "notes.sql").write_text("SELECT 1")
+        assert [v for v, _ in discover_migrations(tmp_path)] == ["0001"]
+
+    def test_duplicate_versions_raise(self, tmp_path):
+        (tmp_path / "0001_a.sql").write_text("SELECT 1")
+        (tmp_path / "0001_b.sql").write_text("SELECT 1")
+        with pytest.raises(RuntimeError):
+            discover_migrations(tmp_path)
+
+
+class TestRunMigrations:
+    """Tests for applying migrations."""
+
+    def test_applies_in_order_exactly_once(self, engine, tmp_path):
+        migrations = tmp_path / "migrations"
+        migrations.mkdir()
+        (migrations / "0002_add_col.sql").write_text("ALTER TABLE things ADD COLUMN label VARCHAR")
+        (migrations / "0001_create.sql").write_text("CREATE TABLE things (id INTEGER PRIMARY KEY)")
+
+        assert run_migrations(engine, migrations) == ["0001", "0002"]
+        assert run_migrations(engine, migrations) == []
+        assert pending_migrations(engine, migrations) == []
+
+        columns = {c["name"] for c in inspect(engine).get_columns("things")}
+        assert columns == {"id", "label"}
+
+    def test_failed_migration_is_not_recorded(self, engine, tmp_path):
+        migrations = tmp_path / "migrations"
+        migrations.mkdir()
+        (migrations / "0001_create.sql").write_text("CREATE TABLE things (id INTEGER PRIMARY KEY)")
+        (migrations / "0002_broken.sql").write_text("ALTER TABLE missing ADD COLUMN x INTEGER")
+
+        with pytest.raises(Exception):
+            run_migrations(engine, migrations)
+
+        with engine.connect() as conn:
+            versions = [row.version for row in conn.execute(text("SELECT version FROM schema_migrations"))]
+        assert versions == ["0001"]
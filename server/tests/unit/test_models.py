@@ -116,3 +116,16 @@ class TestTransactionModel:
         assert embedding_column is not None
         # The Vector type should be configured for 3072 dimensions
 
+    def test_transaction_embedding_is_deferred(self):
+        """Test that the embedding column is not loaded by default."""
+        from sqlalchemy import inspect
+
+        assert inspect(Transaction).attrs.embedding.deferred
+
+    def test_transaction_date_string_is_parsed(self):
+        """Test that ISO date strings from payloads are stored as dates."""
+        txn = Transaction(txn_type="DEBIT", amount=1.0, transaction_date="2026-01-15")
+        assert txn.transaction_date == date(2026, 1, 15)
+
+        txn.transaction_date = ""
+        assert txn.transaction_date is None
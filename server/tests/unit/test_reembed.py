@@ -0,0 +1,150 @@
+"""
+Unit tests for embedding versions: selective regeneration on update and the re-embedding job (src/reembed.py).
+"""
+import asyncio
+from datetime import date
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.orm import undefer
+
+from src.models.reembed_checkpoint import ReembedCheckpoint
+from src.models.transaction import Transaction
+from src.reembed import reembed_batch, get_checkpoint, reembed_stale
+from src.utils import EMBEDDING_VERSION
+
+
+def fake_embed(model, content, task_type):
+    """One vector per text, the length of the text in every component."""
+    if isinstance(content, str):
+        return {"embedding": [float(len(content))] * 3072}
+    return {"embedding": [[float(len(text))] * 3072 for text in content]}
+
+
+def add_transactions(session, count, version=None, **fields):
+    txns = [
+        Transaction(txn_type="DEBIT", amount=100.0 + i, payee=f"Payee {i}", category="Food",
+                    transaction_date=date(2026, 1, 1), bank_account="SBI",
+                    embedding=[0.0] * 3072, embedding_version=version, **fields)
+        for i in range(count)
+    ]
+    session.add_all(txns)
+    session.commit()
+    return [txn.id for txn in txns]
+
+
+def versions(session):
+    session.expire_all()
+    return [version for (version,) in session.query(Transaction.embedding_version).order_by(Transaction.id)]
+
+
+class TestUpdateRegeneratesOnlyWhenNeeded:
+    """PUT /transactions/{id} re-embeds only when the embedded narrative changes."""
+
+    @pytest.fixture
+    def txn_id(self, api_db_session):
+        return add_transactions(api_db_session, 1, version=EMBEDDING_VERSION)[0]
+
+    def test_category_change_keeps_the_vector(self, client, txn_id):
+        with patch("src.routes.transactions.generate_rag_chunk_async") as mock_chunk:
+            response = client.put(f"/transactions/{txn_id}", json={"category": "Dining", "amount": 100.0})
+
+        assert response.json()["status"] == "success"
+        mock_chunk.assert_not_called()
+
+    def test_narrative_change_regenerates(self, client, api_db_session, txn_id, mock_embedding):
+        with patch("src.routes.transactions.generate_rag_chunk_async", return_value=mock_embedding) as mock_chunk:
+            client.put(f"/transactions/{txn_id}", json={"notes": "team lunch"})
+
+        mock_chunk.assert_called_once()
+        assert "team lunch" in str(mock_chunk.call_args)
+
+    def test_stale_version_is_refreshed_on_update(self, client, api_db_session, mock_embedding):
+        txn_id = add_transactions(api_db_session, 1, version="old-model:narrative-v1")[0]
+
+        with patch("src.routes.transactions.generate_rag_chunk_async", return_value=mock_embedding) as mock_chunk:
+            client.put(f"/transactions/{txn_id}", json={"category": "Dining"})
+
+        mock_chunk.assert_called_once()
+        assert versions(api_db_session) == [EMBEDDING_VERSION]
+
+    def test_create_records_the_version(self, client, api_db_session, mock_embedding):
+        with patch("src.routes.transactions.generate_rag_chunk_async", return_value=mock_embedding):
+            client.post("/transactions/", json={"txn_type": "DEBIT", "amount": 5.0, "payee": "Cafe"})
+
+        assert versions(api_db_session) == [EMBEDDING_VERSION]
+
+
+class TestReembed:
+    """Stale rows are re-embedded in checkpointed batches."""
+
+    def run(self, session_factory, coroutine_fn):
+        async def go():
+            async with session_factory() as db:
+                return await coroutine_fn(db)
+        return asyncio.run(go())
+
+    def test_only_stale_rows_are_reembedded(self, api_db_session, api_session_factory):
+        add_transactions(api_db_session, 3, version=None)
+        add_transactions(api_db_session, 2, version=EMBEDDING_VERSION)
+        add_transactions(api_db_session, 2, version="old-model:narrative-v1")
+
+        with patch("google.generativeai.embed_content", side_effect=fake_embed) as mock_embed:
+            report = self.run(api_session_factory, lambda db: reembed_stale(db, batch_size=2, rows_per_minute=0))
+
+        assert report["stale_rows"] == 0 and report["rows_done"] == 5 and report["finished"]
+        assert versions(api_db_session) == [EMBEDDING_VERSION] * 7
+        # Batched, and the two old-version rows repeat narratives already embedded in the first batch
+        assert mock_embed.call_count == 2
+
+        txn = api_db_session.query(Transaction).options(undefer(Transaction.embedding)).first()
+        assert txn.embedding[0] > 0
+
+    def test_interrupted_run_resumes_from_the_checkpoint(self, api_db_session, api_session_factory):
+        ids = add_transactions(api_db_session, 5)
+
+        with patch("google.generativeai.embed_content", side_effect=fake_embed):
+            self.run(api_session_factory, lambda db: reembed_stale(db, batch_size=2, rows_per_minute=0, max_batches=1))
+
+        checkpoint = api_db_session.get(ReembedCheckpoint, EMBEDDING_VERSION)
+        assert (checkpoint.last_id, checkpoint.rows_done, checkpoint.finished_at) == (ids[1], 2, None)
+
+        with patch("google.generativeai.embed_content", side_effect=fake_embed) as mock_embed:
+            report = self.run(api_session_factory, lambda db: reembed_stale(db, batch_size=2, rows_per_minute=0))
+
+        # Only the remaining 3 rows were sent
+        assert sum(len(call.kwargs["content"]) if isinstance(call.kwargs["content"], list) else 1
+                   for call in mock_embed.call_args_list) == 3
+        assert report["rows_done"] == 5 and report["stale_rows"] == 0
+
+    def test_row_edited_during_the_batch_is_not_overwritten(self, api_db_session, api_session_factory):
+        txn_id = add_transactions(api_db_session, 1)[0]
+
+        def embed_while_user_edits(model, content, task_type):
+            # The API changes the payee (and re-embeds it) after the batch was read
+            api_db_session.query(Transaction).filter_by(id=txn_id).update(
+                {"payee": "Edited", "embedding_version": "edited-by-api"})
+            api_db_session.commit()
+            return fake_embed(model, content, task_type)
+
+        async def one_batch(db):
+            return await reembed_batch(db, await get_checkpoint(db), batch_size=10)
+
+        with patch("google.generativeai.embed_content", side_effect=embed_while_user_edits):
+            self.run(api_session_factory, one_batch)
+
+        assert versions(api_db_session) == ["edited-by-api"]
+
+    def test_rate_limit_spaces_batches(self, api_db_session, api_session_factory):
+        add_transactions(api_db_session, 4)
+        sleeps = []
+
+        async def fake_sleep(seconds):
+            sleeps.append(seconds)
+
+        with patch("google.generativeai.embed_content", side_effect=fake_embed), \
+                patch("src.reembed.asyncio.sleep", side_effect=fake_sleep):
+            self.run(api_session_factory, lambda db: reembed_stale(db, batch_size=2, rows_per_minute=60))
+
+        # 2 rows per batch at 60 rows/minute is one batch every ~2 seconds
+        assert len(sleeps) == 2 and all(1.5 < s <= 2 for s in sleeps)
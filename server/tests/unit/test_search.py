@@ -0,0 +1,98 @@
+"""
+Unit tests for hybrid search (src/search.py) and GET /transactions/search.
+The full-text and vector queries are Postgres-only, see tests/integration/test_query_plans.py.
+"""
+from datetime import date
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from src.models.transaction import Transaction
+from src.search import reciprocal_rank_fusion, to_tsquery_text
+
+
+class TestTsquery:
+    """Search text becomes an any-word prefix tsquery."""
+
+    def test_words_are_or_ed_with_prefix_match(self):
+        assert to_tsquery_text("Blue tokai blue") == "blue:* | tokai:*"
+
+    def test_operators_are_stripped(self):
+        assert to_tsquery_text("coffee & !tea | (x:*)") == "coffee:* | tea:* | x:*"
+
+    def test_no_words(self):
+        assert to_tsquery_text(" '&|! ") is None
+
+
+class TestReciprocalRankFusion:
+    """Rows found by both rankings come first."""
+
+    def test_rows_in_both_lists_win(self):
+        fused = reciprocal_rank_fusion([1, 2, 3], [3, 1, 4], k=60)
+
+        assert [txn_id for txn_id, _ in fused] == [1, 3, 2, 4]
+        assert fused[0][1] == pytest.approx(1 / 61 + 1 / 62)
+
+    def test_ties_prefer_newer_rows(self):
+        assert [txn_id for txn_id, _ in reciprocal_rank_fusion([5], [9])] == [9, 5]
+
+    def test_empty(self):
+        assert reciprocal_rank_fusion([], []) == []
+
+
+class TestSearchEndpoint:
+    """GET /transactions/search fuses both candidate lists and never generates SQL."""
+
+    @pytest.fixture
+    def ids(self, api_db_session):
+        txns = [Transaction(txn_type="DEBIT", amount=float(i), payee=f"Payee {i}", category="Food",
+                            transaction_date=date(2026, 1, i + 1), source_app="Google Pay") for i in range(5)]
+        api_db_session.add_all(txns)
+        api_db_session.commit()
+        return [txn.id for txn in txns]
+
+    def search(self, client, lexical, semantic, mock_embedding, **params):
+        with patch("src.routes.transactions.lexical_candidates", AsyncMock(return_value=lexical)) as mock_lexical, \
+                patch("src.routes.transactions.semantic_candidates", AsyncMock(return_value=semantic)) as mock_semantic, \
+                patch("src.routes.transactions.generate_embedding_async", return_value=mock_embedding) as mock_embed, \
+                patch("src.routes.transactions.generate_sql") as mock_sql:
+            response = client.get("/transactions/search", params={"q": "coffee", **params})
+        mock_sql.assert_not_called()
+        return response, mock_lexical, mock_semantic, mock_embed
+
+    def test_results_follow_the_fused_order(self, client, ids, mock_embedding):
+        response, _, mock_semantic, mock_embed = self.search(
+            client, [ids[0], ids[1], ids[2]], [ids[2], ids[0], ids[3]], mock_embedding
+        )
+
+        assert response.status_code == 200
+        assert [txn["id"] for txn in response.json()] == [ids[0], ids[2], ids[1], ids[3]]
+        # Query-side embedding, passed on to the vector candidates
+        assert mock_embed.call_args[0] == ("coffee", "retrieval_query")
+        assert mock_semantic.call_args[0][1] == mock_embedding
+
+    def test_pagination_and_date_range(self, client, ids, mock_embedding):
+        response, mock_lexical, _, _ = self.search(
+            client, ids, [], mock_embedding, lim=2, page=2, date_range="01-01-2026,31-01-2026"
+        )
+
+        assert [txn["id"] for txn in response.json()] == ids[2:4]
+        assert mock_lexical.call_args[0][3] == (date(2026, 1, 1), date(2026, 1, 31))
+
+    def test_search_errors_are_reported(self, client, mock_embedding):
+        with patch("src.routes.transactions.lexical_candidates", AsyncMock(side_effect=RuntimeError("boom"))), \
+                patch("src.routes.transactions.generate_embedding_async", return_value=mock_embedding):
+            response = client.get("/transactions/search", params={"q": "coffee"})
+
+        assert response.status_code == 400
+
+    def test_query_is_required(self, client):
+        assert client.get("/transactions/search").status_code == 422
+
+    def test_created_transactions_store_their_narrative(self, client, api_db_session, mock_embedding):
+        with patch("src.routes.transactions.generate_rag_chunk_async", return_value=mock_embedding):
+            client.post("/transactions/", json={"txn_type": "DEBIT", "amount": 80.0, "payee": "Blue Tokai",
+                                                "bank_account": "SBI", "transaction_date": "2026-01-15"})
+
+        narrative = api_db_session.query(Transaction.narrative).scalar()
+        assert narrative == "Paid 80.0 to Blue Tokai via SBI on 2026-01-15 at None. Additional notes: ."
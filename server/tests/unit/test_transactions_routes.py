@@ -0,0 +1,737 @@
+"""
+Unit tests for the transactions router.
+"""
+import asyncio
+import re
+import threading
+from datetime import date
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from src.models.transaction import Transaction
+
+
+def receipt_data(upi_id, payee="Zomato"):
+    return {
+        "txn_type": "DEBIT",
+        "amount": 150.0,
+        "payee": payee,
+        "category": "Food",
+        "transaction_date": date(2026, 1, 15),
+        "transaction_time": "12:30 PM",
+        "app_name": "Google Pay",
+        "upi_id": upi_id,
+        "bank_account": "State Bank of India",
+        "notes": "Lunch order"
+    }
+
+
+class TestUploadReceipts:
+    """Tests for the batch receipt upload endpoint."""
+
+    def test_upload_receipts_creates_skips_and_reports_per_file(self, client, api_db_session, mock_embedding):
+        """Test that new receipts are inserted and duplicates are skipped, one result per file."""
+        api_db_session.add(Transaction(txn_type="DEBIT", amount=10.0, payee="Old", upi_transaction_id="111"))
+        api_db_session.commit()
+
+        extractions = {
+            b"new": receipt_data("222"),
+            b"existing": receipt_data("111"),
+            b"new-again": receipt_data("222"),
+            b"broken": None,
+        }
+
+        with patch("src.routes.transactions.extract_data_from_image", side_effect=lambda c: extractions[c]), \
+                patch("src.routes.transactions.generate_rag_chunk_async", return_value=mock_embedding) as mock_chunk:
+            response = client.post("/transactions/upload-receipts", files=[
+                ("files", ("a.jpg", b"new", "image/jpeg")),
+                ("files", ("b.jpg", b"existing", "image/jpeg")),
+                ("files", ("c.jpg", b"new-again", "image/jpeg")),
+                ("files", ("d.jpg", b"broken", "image/jpeg")),
+            ])
+
+        assert response.status_code == 200
+        results = response.json()
+        assert [r["filename"] for r in results] == ["a.jpg", "b.jpg", "c.jpg", "d.jpg"]
+        assert [r["status"] for r in results] == ["success", "skipped", "skipped", "error"]
+        assert results[0]["upi_transaction_id"] == "222"
+
+        # Only the new receipt is embedded and stored
+        assert mock_chunk.call_count == 1
+        assert api_db_session.query(Transaction).count() == 2
+
+    def test_bad_extraction_or_embedding_only_fails_its_file(self, client, api_db_session, mock_embedding):
+        missing_payee = receipt_data("602")
+        del missing_payee["payee"]
+        extractions = {
+            b"good": receipt_data("601"),
+            b"missing-payee": missing_payee,
+            b"bad-date": {**receipt_data("603"), "transaction_date": "15/01/2026"},
+            b"embed-fails": receipt_data("604", payee="Flaky"),
+        }
+
+        async def embed(data):
+            if data["payee"] == "Flaky":
+                raise RuntimeError("embedding quota exceeded")
+            return mock_embedding
+
+        with patch("src.routes.transactions.extract_data_from_image", side_effect=lambda c: extractions[c]), \
+                patch("src.routes.transactions.generate_rag_chunk_async", side_effect=embed):
+            response = client.post("/transactions/upload-receipts", files=[
+                ("files", (f"{name.decode()}.jpg", name, "image/jpeg")) for name in extractions
+            ])
+
+        assert [r["status"] for r in response.json()] == ["success", "error", "error", "error"]
+        assert response.json()[3]["message"] == "Could not generate embedding"
+        assert api_db_session.query(Transaction).one().upi_transaction_id == "601"
+
+    def test_upi_conflict_only_fails_the_colliding_file(self, client, api_db_session, mock_embedding):
+        extractions = {b"one": receipt_data("611"), b"two": receipt_data("612"), b"three": receipt_data("613")}
+
+        async def embed(data):
+            # Another request stores "612" after the batch checked its UPI ids
+            if data["upi_id"] == "612":
+                api_db_session.add(Transaction(txn_type="DEBIT", amount=1.0, payee="Racer", upi_transaction_id="612"))
+                api_db_session.commit()
+            return mock_embedding
+
+        with patch("src.routes.transactions.extract_data_from_image", side_effect=lambda c: extractions[c]), \
+                patch("src.routes.transactions.generate_rag_chunk_async", side_effect=embed):
+            response = client.post("/transactions/upload-receipts", files=[
+                ("files", (f"{name.decode()}.jpg", name, "image/jpeg")) for name in extractions
+            ])
+
+        results = response.json()
+        assert [r["status"] for r in results] == ["success", "error", "success"]
+        assert results[1]["message"] == "Duplicate Transaction ID detected"
+        assert api_db_session.query(Transaction).count() == 3
+
+    @pytest.mark.parametrize("cap", [1, 3])
+    def test_upload_receipts_respects_concurrency_cap(self, client, mock_embedding, cap):
+        """Test that no more than RECEIPT_BATCH_CONCURRENCY extractions run at once."""
+        import threading
+        import time
+
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0, "n": 0}
+
+        def slow_extract(content):
+            with lock:
+                state["running"] += 1
+                state["n"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+                n = state["n"]
+            time.sleep(0.05)
+            with lock:
+                state["running"] -= 1
+            return receipt_data(str(n))
+
+        with patch("src.routes.transactions.RECEIPT_BATCH_CONCURRENCY", cap), \
+                patch("src.routes.transactions.extract_data_from_image", side_effect=slow_extract), \
+                patch("src.routes.transactions.generate_rag_chunk_async", return_value=mock_embedding):
+            response = client.post("/transactions/upload-receipts", files=[
+                ("files", (f"{i}.jpg", bytes([i]), "image/jpeg")) for i in range(6)
+            ])
+
+        assert response.status_code == 200
+        assert all(r["status"] == "success" for r in response.json())
+        assert state["peak"] <= cap
+
+
+def png_receipt(amount):
+    import io
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGB", (540, 1200), "white")
+    ImageDraw.Draw(img).text((100, 300), f"Paid Rs {amount}", fill="black")
+    out = io.BytesIO()
+    img.save(out, format="PNG")
+    return out.getvalue()
+
+
+class TestReceiptHashDedupe:
+    """Re-uploaded images are skipped from their hashes, without calling Gemini."""
+
+    def test_same_image_twice_skips_extraction(self, client, api_db_session, mock_embedding):
+        image = png_receipt(450)
+        with patch("src.ingestion.extract_data_from_image", return_value=receipt_data("333")) as mock_extract, \
+                patch("src.ingestion.generate_rag_chunk_async", return_value=mock_embedding):
+            first = client.post("/transactions/upload-receipt?wait=true", files={"file": ("a.png", image, "image/png")})
+            second = client.post("/transactions/upload-receipt?wait=true", files={"file": ("a.png", image, "image/png")})
+
+        assert first.json()["upi_transaction_id"] == "333"
+        assert second.json()["status"] == "skipped"
+        assert mock_extract.call_count == 1
+
+        stored = api_db_session.query(Transaction).one()
+        assert second.json()["id"] == stored.id
+        assert len(stored.image_sha256) == 64 and len(stored.image_phash) == 64
+
+    def test_batch_skips_repeats_within_batch_and_db(self, client, api_db_session, mock_embedding):
+        import hashlib
+
+        api_db_session.add(Transaction(txn_type="DEBIT", amount=1.0, payee="Old", upi_transaction_id="1",
+                                       image_sha256=hashlib.sha256(b"old-image").hexdigest()))
+        api_db_session.commit()
+
+        with patch("src.routes.transactions.extract_data_from_image", return_value=receipt_data("444")) as mock_extract, \
+                patch("src.routes.transactions.generate_rag_chunk_async", return_value=mock_embedding):
+            response = client.post("/transactions/upload-receipts", files=[
+                ("files", ("a.jpg", b"new-image", "image/jpeg")),
+                ("files", ("b.jpg", b"new-image", "image/jpeg")),
+                ("files", ("c.jpg", b"old-image", "image/jpeg")),
+            ])
+
+        new, repeat, old = response.json()
+        assert [r["status"] for r in (new, repeat, old)] == ["success", "skipped", "skipped"]
+        assert mock_extract.call_count == 1
+        # Both skips point at the transaction they duplicate
+        assert repeat["id"] == new["id"] is not None
+        assert old["id"] == api_db_session.query(Transaction).filter_by(payee="Old").one().id
+
+    def test_batch_repeat_shares_the_first_copys_error(self, client, api_db_session):
+        with patch("src.routes.transactions.extract_data_from_image", return_value=None):
+            response = client.post("/transactions/upload-receipts", files=[
+                ("files", ("a.jpg", b"unreadable", "image/jpeg")),
+                ("files", ("b.jpg", b"unreadable", "image/jpeg")),
+            ])
+
+        assert [(r["status"], r["message"]) for r in response.json()] == [
+            ("error", "Could not extract data from receipt")] * 2
+        assert api_db_session.query(Transaction).count() == 0
+
+    def test_batch_hash_lookup_is_one_query_per_hash_kind(self, client, api_async_engine, mock_embedding):
+        from sqlalchemy import event as sa_event
+
+        statements = []
+        lookups_before_extraction = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        def extract(content):
+            if not lookups_before_extraction:
+                lookups_before_extraction.append(sum("FROM transactions" in s for s in statements))
+            return None
+
+        sa_event.listen(api_async_engine.sync_engine, "before_cursor_execute", record)
+        try:
+            with patch("src.ingestion.RECEIPT_PHASH_MAX_DISTANCE", 0), \
+                    patch("src.routes.transactions.extract_data_from_image", side_effect=extract):
+                client.post("/transactions/upload-receipts", files=[
+                    ("files", (f"{i}.png", png_receipt(100 + i), "image/png")) for i in range(10)
+                ])
+        finally:
+            sa_event.remove(api_async_engine.sync_engine, "before_cursor_execute", record)
+
+        # One sha256 IN (...) query and one phash band query for the whole batch
+        assert lookups_before_extraction == [2]
+
+    def test_recompressed_copy_needs_phash_threshold(self, client, mock_embedding):
+        import io
+        from PIL import Image
+
+        original = png_receipt(450)
+        out = io.BytesIO()
+        Image.open(io.BytesIO(original)).save(out, format="JPEG", quality=70)
+        recompressed = out.getvalue()
+
+        def upload(image, name):
+            return client.post("/transactions/upload-receipt?wait=true", files={"file": (name, image, "image/jpeg")})
+
+        with patch("src.ingestion.extract_data_from_image",
+                   side_effect=[receipt_data("555"), receipt_data("556")]) as mock_extract, \
+                patch("src.ingestion.generate_rag_chunk_async", return_value=mock_embedding):
+            upload(original, "a.png")
+            # Off by default, the copy goes through extraction
+            assert upload(recompressed, "b.jpg").json()["upi_transaction_id"] == "556"
+
+            with patch("src.ingestion.RECEIPT_PHASH_MAX_DISTANCE", 4):
+                third = upload(recompressed[:-2] + b"\xff\xd9", "c.jpg")
+
+        assert third.json()["status"] == "skipped"
+        assert mock_extract.call_count == 2
+
+
+class TestBlockingCallsOffloaded:
+    """Blocking Gemini calls run on the run_blocking pool, never on the event loop thread."""
+
+    @staticmethod
+    def recording(threads, result):
+        def call(*args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return result
+        return call
+
+    def test_receipt_extraction(self, client, mock_embedding):
+        threads = []
+        with patch("src.ingestion.extract_data_from_image", side_effect=self.recording(threads, receipt_data("901"))), \
+                patch("src.ingestion.generate_rag_chunk_async", return_value=mock_embedding):
+            client.post("/transactions/upload-receipt?wait=true", files={"file": ("a.jpg", b"a", "image/jpeg")})
+        with patch("src.routes.transactions.extract_data_from_image",
+                   side_effect=self.recording(threads, receipt_data("902"))), \
+                patch("src.routes.transactions.generate_rag_chunk_async", return_value=mock_embedding):
+            client.post("/transactions/upload-receipts", files=[("files", ("b.jpg", b"b", "image/jpeg"))])
+
+        assert len(threads) == 2 and all(name.startswith("blocking") for name in threads)
+
+    def test_sql_generation(self, client):
+        threads = []
+        with patch("src.routes.transactions.intent_parser.parse", AsyncMock(return_value=None)), \
+                patch("src.routes.transactions.generate_sql", side_effect=self.recording(
+                    threads, "SELECT id FROM transactions LIMIT :limit OFFSET :offset")), \
+                patch("src.routes.transactions.generate_embedding_async"):
+            client.get("/transactions/", params={"prompt": "dinner with friends"})
+
+        assert len(threads) == 1 and threads[0].startswith("blocking")
+
+
+@pytest.mark.slow
+class TestEventLoopLatency:
+    """Load test: listing latency must not degrade while slow Gemini uploads are in flight."""
+
+    GEMINI_DELAY = 0.5
+
+    @pytest.fixture
+    def load_session_factory(self, api_db_session, api_session_factory):
+        """Each concurrent request gets its own aiosqlite connection to the file-backed test DB."""
+        api_db_session.add_all([
+            Transaction(txn_type="DEBIT", amount=float(i), payee=f"Payee {i}", category="Food",
+                        transaction_date=date(2026, 1, 1 + i % 28), source_app="Google Pay")
+            for i in range(20)
+        ])
+        api_db_session.commit()
+        return api_session_factory
+
+    @staticmethod
+    def p99(samples):
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+    def test_list_p99_stays_flat_during_uploads(self, load_session_factory, mock_embedding):
+        import asyncio
+        import gc
+        import itertools
+        import time
+
+        import httpx
+        from src.dependencies import get_async_db
+        from src.main import app
+
+        async def override_get_async_db():
+            async with load_session_factory() as db:
+                yield db
+
+        counter = itertools.count()
+
+        def slow_extract(content):
+            time.sleep(self.GEMINI_DELAY)
+            return receipt_data(f"load-{next(counter)}")
+
+        async def slow_chunk(data):
+            await asyncio.sleep(self.GEMINI_DELAY / 5)
+            return mock_embedding
+
+        async def timed_get(client):
+            start = time.perf_counter()
+            response = await client.get("/transactions/", params={"lim": 10})
+            assert response.status_code == 200
+            return time.perf_counter() - start
+
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                idle = [await timed_get(client) for _ in range(30)]
+
+                uploads = [
+                    asyncio.create_task(client.post(
+                        "/transactions/upload-receipt?wait=true",
+                        files={"file": (f"{i}.jpg", bytes([i]), "image/jpeg")}
+                    ))
+                    for i in range(8)
+                ]
+                await asyncio.sleep(0.01)
+                loaded = []
+                while not all(u.done() for u in uploads):
+                    loaded.extend(await asyncio.gather(*(timed_get(client) for _ in range(5))))
+                upload_responses = await asyncio.gather(*uploads)
+                return idle, loaded, upload_responses
+
+        app.dependency_overrides[get_async_db] = override_get_async_db
+        # Garbage left by earlier tests would otherwise be collected during the measurement
+        gc.collect()
+        try:
+            with patch("src.ingestion.extract_data_from_image", side_effect=slow_extract), \
+                    patch("src.ingestion.generate_rag_chunk_async", side_effect=slow_chunk):
+                idle, loaded, upload_responses = asyncio.run(run())
+        finally:
+            app.dependency_overrides.clear()
+
+        assert all(r.json().get("upi_transaction_id", "").startswith("load-") for r in upload_responses)
+
+        idle_p99, loaded_p99 = self.p99(idle), self.p99(loaded)
+        # A blocked event loop would make every concurrent GET wait out a full Gemini call
+        assert loaded_p99 < self.GEMINI_DELAY / 2, f"p99 idle={idle_p99:.3f}s, during uploads={loaded_p99:.3f}s"
+        assert len(loaded) >= 10
+
+
+class TestPromptSearch:
+    """Tests for natural language search in GET /transactions."""
+
+    PLAIN_SQL = "SELECT * FROM transactions ORDER BY amount DESC LIMIT :limit OFFSET :offset"
+    VECTOR_SQL = "SELECT * FROM transactions ORDER BY embedding <-> :query_vector LIMIT :limit OFFSET :offset"
+
+    @pytest.fixture(autouse=True)
+    def llm_path(self):
+        """These prompts go through generate_sql, the local fast path is covered in test_intent.py."""
+        with patch("src.routes.transactions.intent_parser.parse", AsyncMock(return_value=None)):
+            yield
+
+    @pytest.fixture
+    def seeded(self, api_db_session):
+        api_db_session.add_all([
+            Transaction(txn_type="DEBIT", amount=float(amount), payee=f"Payee {amount}", category="Food",
+                        transaction_date=date(2026, 1, 10), source_app="Google Pay")
+            for amount in (10, 30, 20)
+        ])
+        api_db_session.commit()
+
+    def test_sql_and_embedding_run_concurrently(self, client, seeded, mock_embedding):
+        embedding_started = threading.Event()
+        overlapped = []
+
+        def slow_sql(prompt, check_cache=True):
+            # Only returns early if the embedding request went out while the SQL was still pending
+            overlapped.append(embedding_started.wait(timeout=5))
+            return self.VECTOR_SQL
+
+        async def slow_embedding(text):
+            embedding_started.set()
+            return mock_embedding
+
+        with patch("src.routes.transactions.generate_sql", side_effect=slow_sql), \
+                patch("src.routes.transactions.generate_embedding_async", side_effect=slow_embedding), \
+                patch("src.routes.transactions.PROMPT_EMBEDDING_DELAY_MS", 0), \
+                patch("src.routes.transactions._run_generated_sql", return_value=[]) as mock_run:
+            response = client.get("/transactions/", params={"prompt": "something like gym"})
+
+        assert response.status_code == 200
+        assert overlapped == [True]
+        params = mock_run.call_args[0][2]
+        assert params["query_vector"] == str(mock_embedding)
+        assert mock_run.call_args.kwargs["ef_search"] == 100
+
+    def test_embedding_discarded_when_sql_does_not_use_it(self, client, seeded, mock_embedding):
+        with patch("src.routes.transactions.generate_sql", return_value=self.PLAIN_SQL), \
+                patch("src.routes.transactions._run_generated_sql", return_value=[]) as mock_run, \
+                patch("src.routes.transactions.generate_embedding_async", return_value=mock_embedding) as mock_embed:
+            response = client.get("/transactions/", params={"prompt": "highest amount"})
+
+        assert response.status_code == 200
+        assert "query_vector" not in mock_run.call_args[0][2]
+        assert mock_run.call_args.kwargs["ef_search"] is None
+        # The SQL arrived before the embedding was due, so it was never requested
+        mock_embed.assert_not_called()
+
+    def test_slow_sql_without_vector_abandons_the_issued_embedding(self, client, seeded, mock_embedding):
+        import time
+
+        def slow_sql(prompt, check_cache=True):
+            time.sleep(0.2)
+            return self.PLAIN_SQL
+
+        with patch("src.routes.transactions.generate_sql", side_effect=slow_sql), \
+                patch("src.routes.transactions.PROMPT_EMBEDDING_DELAY_MS", 50), \
+                patch("src.routes.transactions._run_generated_sql", return_value=[]) as mock_run, \
+                patch("src.routes.transactions.generate_embedding_async", return_value=mock_embedding) as mock_embed:
+            response = client.get("/transactions/", params={"prompt": "highest amount"})
+
+        assert response.status_code == 200
+        mock_embed.assert_called_once()
+        assert "query_vector" not in mock_run.call_args[0][2]
+
+    def test_cached_sql_without_vector_never_embeds(self, client, seeded, mock_embedding):
+        from src.cache import sql_cache
+        from src.utils import date as utils_date
+
+        sql_cache.put("highest amount", utils_date.today().strftime("%Y-%m-%d"), self.PLAIN_SQL)
+
+        with patch("src.routes.transactions.generate_sql") as mock_sql, \
+                patch("src.routes.transactions.generate_embedding_async", return_value=mock_embedding) as mock_embed:
+            response = client.get("/transactions/", params={"prompt": "Highest amount", "lim": 2, "page": 1})
+            second_page = client.get("/transactions/", params={"prompt": "Highest amount", "lim": 2, "page": 2})
+
+        assert response.status_code == 200
+        assert [t["amount"] for t in response.json()] == [30.0, 20.0]
+        assert [t["amount"] for t in second_page.json()] == [10.0]
+        mock_sql.assert_not_called()
+        mock_embed.assert_not_called()
+
+    def test_ef_search_query_param_overrides_default(self, client, seeded, mock_embedding):
+        with patch("src.routes.transactions.generate_sql", return_value=self.VECTOR_SQL), \
+                patch("src.routes.transactions.generate_embedding_async", return_value=mock_embedding), \
+                patch("src.routes.transactions._run_generated_sql", return_value=[]) as mock_run:
+            response = client.get("/transactions/", params={"prompt": "like gym", "ef_search": 400})
+
+        assert response.status_code == 200
+        assert mock_run.call_args.kwargs["ef_search"] == 400
+
+    def test_ef_search_is_set_locally_on_postgres(self):
+        import asyncio
+        from unittest.mock import AsyncMock, MagicMock
+        from src.routes.transactions import _run_generated_sql
+
+        db = MagicMock()
+        db.get_bind.return_value.dialect.name = "postgresql"
+        db.execute = AsyncMock()
+        db.execute.return_value.fetchall = MagicMock(return_value=[])
+
+        asyncio.run(_run_generated_sql(
+            db, self.VECTOR_SQL, {"query_vector": "[0.1]", "limit": 10, "offset": 0}, ef_search=200
+        ))
+
+        set_config_stmt, set_config_params = db.execute.call_args_list[0][0]
+        assert "set_config('hnsw.ef_search'" in str(set_config_stmt)
+        assert set_config_params == {"ef_search": "200"}
+
+
+class TestKeysetPagination:
+    """Tests for cursor pagination of GET /transactions listings."""
+
+    @pytest.fixture
+    def seeded(self, api_db_session):
+        dates = [date(2026, 1, 5), date(2026, 1, 5), date(2026, 1, 4), None,
+                 date(2026, 1, 7), date(2026, 1, 5), date(2026, 1, 1)]
+        api_db_session.add_all([
+            Transaction(txn_type="DEBIT", amount=float(i), payee=f"Payee {i}", category="Food",
+                        transaction_date=d, source_app="Google Pay")
+            for i, d in enumerate(dates)
+        ])
+        api_db_session.commit()
+
+    def walk(self, client, **params):
+        pages, cursor = [], None
+        while True:
+            query = dict(params, **({"cursor": cursor} if cursor else {}))
+            response = client.get("/transactions/", params=query)
+            assert response.status_code == 200
+            pages.append([t["id"] for t in response.json()])
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                return pages
+
+    def test_cursor_walk_matches_full_listing(self, client, seeded):
+        full = [t["id"] for t in client.get("/transactions/", params={"lim": -1}).json()]
+        pages = self.walk(client, lim=3)
+
+        assert [txn_id for page in pages for txn_id in page] == full
+        assert all(len(page) <= 3 for page in pages)
+        # Newest first, same-day rows by id descending, undated rows last
+        assert full == [5, 6, 2, 1, 3, 7, 4]
+
+    def test_insert_mid_scroll_does_not_shift_results(self, client, seeded, api_db_session):
+        first = client.get("/transactions/", params={"lim": 3})
+        cursor = first.headers["X-Next-Cursor"]
+
+        api_db_session.add(Transaction(txn_type="DEBIT", amount=99.0, payee="New", category="Food",
+                                       transaction_date=date(2026, 2, 1), source_app="Google Pay"))
+        api_db_session.commit()
+
+        second = client.get("/transactions/", params={"lim": 3, "cursor": cursor})
+        assert [t["id"] for t in second.json()] == [1, 3, 7]
+
+    def test_cursor_with_date_range(self, client, seeded):
+        pages = self.walk(client, lim=2, date_range="01-01-2026,05-01-2026")
+        assert [txn_id for page in pages for txn_id in page] == [6, 2, 1, 3, 7]
+
+    def test_invalid_cursor_is_rejected(self, client, seeded):
+        response = client.get("/transactions/", params={"cursor": "not-a-cursor"})
+        assert response.status_code == 400
+
+    def test_page_lim_still_supported(self, client, seeded):
+        response = client.get("/transactions/", params={"lim": 2, "page": 2})
+        assert [t["id"] for t in response.json()] == [2, 1]
+
+
+class TestExport:
+    """Tests for the streaming export endpoint."""
+
+    @pytest.fixture
+    def seeded(self, api_db_session, api_session_factory, mock_embedding):
+        api_db_session.add_all([
+            Transaction(txn_type="DEBIT", amount=float(i), payee=f"Payee, {i}", category="Food",
+                        transaction_date=date(2026, 1, 1 + i), source_app="Google Pay",
+                        upi_transaction_id=str(1000 + i), embedding=mock_embedding)
+            for i in range(5)
+        ])
+        api_db_session.commit()
+
+        with patch("src.routes.transactions.AsyncSessionLocal", api_session_factory), \
+                patch("src.routes.transactions.EXPORT_BATCH_SIZE", 2):
+            yield
+
+    def test_ndjson_export(self, client, seeded):
+        import json
+
+        response = client.get("/transactions/export")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [r["amount"] for r in rows] == [4.0, 3.0, 2.0, 1.0, 0.0]
+        assert rows[0]["transaction_date"] == "2026-01-05"
+        assert "embedding" not in rows[0]
+
+    def test_csv_export_with_date_range(self, client, seeded):
+        import csv
+        import io
+
+        response = client.get("/transactions/export", params={"format": "csv", "date_range": "02-01-2026,03-01-2026"})
+
+        assert response.status_code == 200
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert [r["payee"] for r in rows] == ["Payee, 2", "Payee, 1"]
+        assert "embedding" not in rows[0]
+
+    @pytest.mark.parametrize("export_format", ["ndjson", "csv"])
+    def test_export_is_streamed_in_batches(self, seeded, export_format):
+        import asyncio
+        from src.routes.transactions import _stream_export
+
+        async def collect():
+            return [chunk async for chunk in _stream_export(export_format)]
+
+        chunks = asyncio.run(collect())
+
+        # 5 rows at EXPORT_BATCH_SIZE=2 -> one chunk per server-side cursor batch
+        assert len(chunks) == 3
+        assert sum(chunk.count("\n") for chunk in chunks) == 5 + (export_format == "csv")
+
+    def test_unknown_format_is_rejected(self, client, seeded):
+        assert client.get("/transactions/export", params={"format": "xml"}).status_code == 422
+
+
+class TestDeferredEmbedding:
+    """Tests that list/detail queries never load the embedding column."""
+
+    def test_listing_does_not_select_embedding(self, client, api_db_session, api_async_engine, mock_embedding):
+        from sqlalchemy import event
+
+        api_db_session.add(Transaction(txn_type="DEBIT", amount=1.0, payee="A", category="Food",
+                                       transaction_date=date(2026, 1, 1), source_app="Google Pay",
+                                       embedding=mock_embedding))
+        api_db_session.commit()
+        api_db_session.expunge_all()
+
+        statements = []
+        engine = api_async_engine.sync_engine
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            response = client.get("/transactions/")
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        assert response.status_code == 200
+        assert len(response.json()) == 1
+        selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+        assert selects
+        # The vector column itself, embedding_version is a plain string
+        assert not any(re.search(r"\bembedding\b", s) for s in selects)
+
+
+class TestSplitSettlement:
+    """Settlement is an atomic conditional UPDATE: never lost, never applied twice."""
+
+    @pytest.fixture
+    def seeded(self, api_db_session):
+        from src.models.event import Event
+        from src.models.split import Split
+
+        trip = Event(event_name="Trip")
+        other = Event(event_name="Other")
+        api_db_session.add_all([trip, other])
+        api_db_session.flush()
+        txn = Transaction(txn_type="DEBIT", amount=1000.0, payee="Hotel", category="Travel",
+                          transaction_date=date(2026, 3, 1), event_id=trip.id)
+        dinner = Transaction(txn_type="DEBIT", amount=300.0, payee="Cafe", category="Food",
+                             transaction_date=date(2026, 3, 2), event_id=trip.id)
+        elsewhere = Transaction(txn_type="DEBIT", amount=200.0, payee="Cab", category="Travel",
+                                transaction_date=date(2026, 3, 3), event_id=other.id)
+        api_db_session.add_all([txn, dinner, elsewhere])
+        api_db_session.flush()
+        api_db_session.add_all(
+            [Split(transaction_id=txn.id, payee=f"Friend {i}", amount=10.0, is_settled=False) for i in range(20)]
+            + [Split(transaction_id=dinner.id, payee="friend 0", amount=50.0, is_settled=None),
+               Split(transaction_id=elsewhere.id, payee="Friend 0", amount=70.0, is_settled=False)]
+        )
+        api_db_session.commit()
+        return {"trip": trip.id, "txn": txn.id, "dinner": dinner.id, "elsewhere": elsewhere.id}
+
+    @staticmethod
+    def amount(session, txn_id):
+        session.expire_all()
+        return session.get(Transaction, txn_id).amount
+
+    @staticmethod
+    def split_ids(session, txn_id):
+        from src.models.split import Split
+        return [s.id for s in session.query(Split).filter_by(transaction_id=txn_id).order_by(Split.id)]
+
+    def test_settling_twice_subtracts_once(self, client, api_db_session, seeded):
+        split_id = self.split_ids(api_db_session, seeded["txn"])[0]
+
+        first = client.put("/transactions/split", json={"id": split_id, "is_settled": True}).json()
+        second = client.put("/transactions/split", json={"id": split_id, "is_settled": True}).json()
+
+        assert first["message"] == "Split settled successfully"
+        assert second["message"] == "Split already settled"
+        assert self.amount(api_db_session, seeded["txn"]) == 990.0
+
+    def test_unsettling_restores_amount(self, client, api_db_session, seeded):
+        split_id = self.split_ids(api_db_session, seeded["txn"])[0]
+
+        client.put("/transactions/split", json={"id": split_id, "is_settled": True})
+        client.put("/transactions/split", json={"id": split_id, "is_settled": False, "notes": "paid back later"})
+        client.put("/transactions/split", json={"id": split_id, "is_settled": False})
+
+        assert self.amount(api_db_session, seeded["txn"]) == 1000.0
+
+    def test_unknown_split(self, client, seeded):
+        assert client.put("/transactions/split", json={"id": 999, "is_settled": True}).json()["status"] == "error"
+
+    def test_bulk_settle_by_payee_in_event(self, client, api_db_session, seeded):
+        body = client.put("/transactions/split/settle", json={"payee": "FRIEND 0", "event_id": seeded["trip"]}).json()
+
+        assert body["status"] == "success"
+        assert len(body["settled_ids"]) == 2 and body["amount"] == 60.0
+        assert self.amount(api_db_session, seeded["txn"]) == 990.0
+        assert self.amount(api_db_session, seeded["dinner"]) == 250.0
+        # Same payee in another event is untouched
+        assert self.amount(api_db_session, seeded["elsewhere"]) == 200.0
+
+        again = client.put("/transactions/split/settle", json={"payee": "Friend 0", "event_id": seeded["trip"]}).json()
+        assert again["settled_ids"] == []
+
+    def test_bulk_settle_unknown_event(self, client, seeded):
+        body = client.put("/transactions/split/settle", json={"payee": "Friend 0", "event_id": 999}).json()
+        assert body == {"status": "error", "message": "Event not found"}
+
+    def test_concurrent_settles_from_many_threads(self, client, api_db_session, seeded):
+        from concurrent.futures import ThreadPoolExecutor
+
+        split_ids = self.split_ids(api_db_session, seeded["txn"])
+        # Let the engine's one-time first-connect setup run before threads with separate event loops race it
+        client.get("/analytics/")
+
+        def settle(split_id):
+            return client.put("/transactions/split", json={"id": split_id, "is_settled": True}).json()
+
+        # Every split settled by several threads at once: each must count exactly once
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(settle, split_ids * 4))
+
+        assert all(r["status"] == "success" for r in results)
+        assert sum(r["message"] == "Split settled successfully" for r in results) == len(split_ids)
+        assert self.amount(api_db_session, seeded["txn"]) == 1000.0 - 10.0 * len(split_ids)
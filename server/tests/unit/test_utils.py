@@ -2,6 +2,8 @@
 Unit tests for utility functions in utils.py.
 """
 import json
+from datetime import date
+
 import pytest
 from unittest.mock import patch, MagicMock
 
@@ -146,9 +148,31 @@ class TestUtilsHelperFunctions:
             with patch('google.generativeai.GenerativeModel', return_value=mock_model):
                 from src.utils import generate_sql
 
-                result = generate_sql("test", 10, 1)
+                result = generate_sql("test")
 
                 assert "```" not in result
                 assert "SELECT" in result
 
 
+
+
+class TestCursorEncoding:
+    """Tests for the opaque keyset pagination cursor."""
+
+    @pytest.mark.parametrize("txn_date, txn_id", [
+        (date(2026, 1, 15), 42),
+        (None, 7),
+    ])
+    def test_round_trip(self, txn_date, txn_id):
+        from src.utils import encode_cursor, decode_cursor
+
+        assert decode_cursor(encode_cursor(txn_date, txn_id)) == (txn_date, txn_id)
+
+    @pytest.mark.parametrize("cursor", ["garbage", "eyJ9", ""])
+    def test_invalid_cursor_raises_400(self, cursor):
+        from fastapi import HTTPException
+        from src.utils import decode_cursor
+
+        with pytest.raises(HTTPException) as exc:
+            decode_cursor(cursor)
+        assert exc.value.status_code == 400